@@ -24,6 +24,9 @@ from django.views.decorators.cache import never_cache
 import secrets
 from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.db import transaction
+from users.email_assets import inline_logo
+from users.outbox import enqueue_email
 
 def _ensure_learner(user):
     if not (hasattr(user, "has_role") and user.has_role(Role.Names.LEARNER)):
@@ -352,36 +355,14 @@ def share_certificate_email(request, reg_id: int):
     logo_url = getattr(settings, "EMAIL_LOGO_URL", "") or None
     logo_cid = None
     logo_base64 = None
-    img_bytes = None
 
-    from django.contrib.staticfiles import finders
-    import os
-    import base64
-    
-    logo_fs_path = None
-    for candidate in [
-        "images/LICQual-Logo.jpg",
-        "images/LICQual Logo .jpg",
-        "images/LICQual Logo.jpg",
-        "images/licqual-logo.jpg",
-        "images/ictqual-logo.jpg",
-    ]:
-        p = finders.find(candidate)
-        if p and os.path.exists(p):
-            logo_fs_path = p
-            break
-
-    if logo_fs_path and os.path.exists(logo_fs_path):
-        try:
-            with open(logo_fs_path, "rb") as f:
-                img_bytes = f.read()
-        except Exception as e:
-            logger.error(f"Could not load logo for certificate email: {e}", exc_info=True)
-            img_bytes = None
+    # Logo bytes and MIME part come from the process-level email asset cache
+    logo = inline_logo()
+    img_bytes = logo.data if logo else None
 
     # Prefer CID when we have logo bytes (same approach as welcome email)
-    if img_bytes and len(img_bytes) > 0:
-        logo_cid = "licqual-logo"
+    if img_bytes:
+        logo_cid = logo.content_id
         final_logo_url = ""
         logo_base64 = None
     else:
@@ -389,23 +370,6 @@ def share_certificate_email(request, reg_id: int):
         if logo_url and (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
             final_logo_url = logo_url
 
-        # If no hosted URL, fall back to base64 (no attachments)
-        if not final_logo_url and img_bytes and len(img_bytes) > 0:
-            try:
-                if img_bytes.startswith(b"\xff\xd8"):
-                    img_mime_type = "image/jpeg"
-                elif img_bytes.startswith(b"\x89PNG"):
-                    img_mime_type = "image/png"
-                elif img_bytes.startswith(b"GIF"):
-                    img_mime_type = "image/gif"
-                else:
-                    img_mime_type = "image/jpeg"
-                encoded = base64.b64encode(img_bytes).decode("utf-8")
-                logo_base64 = f"data:{img_mime_type};base64,{encoded}"
-            except Exception as e:
-                logger.warning(f"Could not encode logo as base64: {e}")
-                logo_base64 = None
-    
     ctx = {
         "learner_name": learner_name,
         "business_name": business_name,
@@ -439,26 +403,8 @@ def share_certificate_email(request, reg_id: int):
     # Only attach inline image if we're using CID (not hosted URL)
     # Hosted URLs don't need attachments - they're loaded directly from the web
     if logo_cid and img_bytes and not final_logo_url:
-        try:
-            from email.mime.image import MIMEImage
-            if img_bytes.startswith(b'\xff\xd8'):
-                img_type = "jpeg"
-            elif img_bytes.startswith(b'\x89PNG'):
-                img_type = "png"
-            elif img_bytes.startswith(b'GIF'):
-                img_type = "gif"
-            else:
-                img_type = "jpeg"
-            
-            img = MIMEImage(img_bytes, _subtype=img_type)
-            img.add_header("Content-ID", f"<{logo_cid}>")
-            img.add_header("Content-Disposition", "inline", filename="licqual-logo.jpg")
-            msg.attach(img)
-            logger.info("Attached logo as CID inline image")
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Could not attach logo image to certificate email: {e}")
+        msg.attach(logo.mime_part())
+        logger.info("Attached logo as CID inline image")
     elif final_logo_url:
         logger.info("Using hosted logo URL - no attachment needed")
 
@@ -466,14 +412,14 @@ def share_certificate_email(request, reg_id: int):
     filename = f"{safe_name}.pdf"
     msg.attach(filename, pdf_bytes, "application/pdf")
     try:
-        msg.send(fail_silently=False)
+        with transaction.atomic():
+            enqueue_email(msg, kind="certificate_share")
+            # NEW: record that the certificate has been shared (together with the queued email)
+            LearnerRegistration.objects.filter(pk=reg.pk).update(certificate_shared_at=timezone.now())
     except Exception:
         messages.error(request, "Failed to send the email to the learner.")
         return redirect(get_redirect_url())
 
-    # NEW: record that the certificate has been shared (only after successful email send)
-    LearnerRegistration.objects.filter(pk=reg.pk).update(certificate_shared_at=timezone.now())
-
 
     messages.success(request, f"Certificate shared with {reg.learner.email}.")
     return redirect(get_redirect_url())
@@ -0,0 +1,12 @@
+# main/celery.py
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
+
+app = Celery("main")
+
+# All CELERY_* settings in main/settings.py configure this app
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -1,5 +1,6 @@
 from pathlib import Path
 from decouple import Config, RepositoryEnv, Csv
+from celery.schedules import crontab
 
 # Get the base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -179,6 +180,28 @@ else:
 
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Licqual@licqual.co.uk')
 
+# SES sending: recipients per second (the account's send rate; 0 disables pacing),
+# sender threads per batch, and retries (with exponential backoff) on throttling
+AWS_SES_MAX_SEND_RATE = config('AWS_SES_MAX_SEND_RATE', cast=float, default=14)
+AWS_SES_SEND_WORKERS = config('AWS_SES_SEND_WORKERS', cast=int, default=4)
+AWS_SES_MAX_RETRIES = config('AWS_SES_MAX_RETRIES', cast=int, default=4)
+AWS_SES_RETRY_BASE_DELAY = config('AWS_SES_RETRY_BASE_DELAY', cast=float, default=0.5)
+
+# Email outbox (users/outbox.py): transactional email is queued in the database and
+# sent by the drain_email_outbox task/command
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', cast=int, default=6)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = config('EMAIL_OUTBOX_RETRY_BASE_SECONDS', cast=int, default=60)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = config('EMAIL_OUTBOX_RETRY_MAX_SECONDS', cast=int, default=3600)
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', cast=int, default=300)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', cast=int, default=100)
+# Sent and dead-lettered emails (already stripped of their content) and unused stored files are deleted after this many days
+EMAIL_OUTBOX_RETENTION_DAYS = config('EMAIL_OUTBOX_RETENTION_DAYS', cast=int, default=30)
+
+
+# Bulk account creation (users/accounts.py): processes used to hash generated passwords
+# (0 = one per CPU) and the number of passwords below which they are hashed inline
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', cast=int, default=0)
+PASSWORD_HASH_PARALLEL_MIN = config('PASSWORD_HASH_PARALLEL_MIN', cast=int, default=32)
 
 # Required by forgot/reset flow (seconds)
 PASSWORD_RESET_TIMEOUT = config('PASSWORD_RESET_TIMEOUT', cast=int, default=3600)  # 1 hour
@@ -230,10 +253,54 @@ if DEBUG and not (RECAPTCHA_PUBLIC_KEY and RECAPTCHA_PRIVATE_KEY):
 
 CERTIFICATE_FONT_PATH = str(BASE_DIR / "static" / "fonts" / "Inter-SemiBold.ttf")
 
+# Rasterized certificate template pages are cached in memory (byte budget) and,
+# if a directory is configured, on disk so new worker processes start warm.
+CERTIFICATE_TEMPLATE_CACHE_MAX_BYTES = config('CERTIFICATE_TEMPLATE_CACHE_MAX_BYTES', cast=int, default=64 * 1024 * 1024)
+CERTIFICATE_TEMPLATE_CACHE_DIR = config('CERTIFICATE_TEMPLATE_CACHE_DIR', default='') or None
+# Max number of (font file, size) pairs kept loaded by superadmin.certificate_fonts.font_registry
+CERTIFICATE_FONT_CACHE_SIZE = config('CERTIFICATE_FONT_CACHE_SIZE', cast=int, default=256)
+# Rendered certificate PDFs, keyed by a fingerprint of their inputs (see superadmin.certificate_cache)
+CERTIFICATE_RENDER_CACHE_DIR = config('CERTIFICATE_RENDER_CACHE_DIR', default=str(BASE_DIR / ".cache" / "certificates"))
+CERTIFICATE_RENDER_CACHE_MAX_BYTES = config('CERTIFICATE_RENDER_CACHE_MAX_BYTES', cast=int, default=512 * 1024 * 1024)
+# Processes used by superadmin.certificate_render.render_certificates for bulk downloads (0 = CPU count)
+CERTIFICATE_RENDER_WORKERS = config('CERTIFICATE_RENDER_WORKERS', cast=int, default=0)
+# Batches with fewer certificates left to render than this are rendered in-process instead
+CERTIFICATE_RENDER_PARALLEL_MIN = config('CERTIFICATE_RENDER_PARALLEL_MIN', cast=int, default=24)
+# Default certificate PDF backend: 'raster' (full-page images) or 'vector' (template PDF + text overlay); Course.certificate_output overrides it
+CERTIFICATE_OUTPUT_MODE = config('CERTIFICATE_OUTPUT_MODE', default='raster')
+# Compiled per-(course, business) certificate layouts kept in memory (see superadmin.certificate_layout)
+CERTIFICATE_LAYOUT_CACHE_SIZE = config('CERTIFICATE_LAYOUT_CACHE_SIZE', cast=int, default=128)
+# Verification QR codes at their final pixel size, in memory and optionally on disk (see superadmin.certificate_cache)
+CERTIFICATE_QR_CACHE_SIZE = config('CERTIFICATE_QR_CACHE_SIZE', cast=int, default=2048)
+CERTIFICATE_QR_CACHE_DIR = config('CERTIFICATE_QR_CACHE_DIR', default='') or None
+# Where certificate pipeline timing records go (see superadmin.timing): comma-separated sink classes.
+# Also available: superadmin.timing.JsonLinesSink (writes CERTIFICATE_TIMING_FILE) and
+# superadmin.timing.PrometheusSink (served at superadmin:certificate_timing_metrics)
+CERTIFICATE_TIMING_SINKS = config('CERTIFICATE_TIMING_SINKS', default='superadmin.timing.LoggingSink', cast=Csv())
+CERTIFICATE_TIMING_FILE = config('CERTIFICATE_TIMING_FILE', default='') or None
+CERTIFICATE_METRICS_TOKEN = config('CERTIFICATE_METRICS_TOKEN', default='')
+
 
 # Celery core settings
-CELERY_BROKER_URL = "redis://localhost:6379/0"
-CELERY_RESULT_BACKEND = "redis://localhost:6379/1"
+# Run tasks in-process instead of through the broker (local dev and tests, no Redis needed)
+CELERY_TASK_ALWAYS_EAGER = config("CELERY_TASK_ALWAYS_EAGER", cast=bool, default=DEBUG)
+CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="memory://" if CELERY_TASK_ALWAYS_EAGER else "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="cache+memory://" if CELERY_TASK_ALWAYS_EAGER else "redis://localhost:6379/1")
+CELERY_TASK_IGNORE_RESULT = True
+# Bulk issuance tasks render PDFs; hand them out one at a time so long renders spread across workers
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+# Periodic tasks, run by `celery -A main beat`
+CELERY_BEAT_SCHEDULE = {
+    "rollup-registration-stats": {
+        "task": "superadmin.tasks.rollup_registration_stats",
+        "schedule": crontab(hour=0, minute=15),
+    },
+    "purge-email-outbox": {
+        "task": "users.tasks.purge_email_outbox",
+        "schedule": crontab(hour=3, minute=30),
+    },
+}
 
 
 
@@ -1,3 +1,46 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from superadmin.models import Business, BusinessCourseDiscount, BusinessDiscount, Course
+
+from .models import CoursePricing
+from .pricebook import PriceBook
+from .views import get_discounted_price
+
+
+class PriceBookTests(TestCase):
+    def test_lookups_follow_discount_precedence_from_three_queries(self):
+        priced = Course.objects.create(title="Priced", course_number="LQ-1")
+        other = Course.objects.create(title="Other", course_number="LQ-2")
+        unpriced = Course.objects.create(title="Unpriced", course_number="LQ-3")
+        CoursePricing.objects.create(course=priced, currency="GBP", affiliate_price=Decimal("50.00"), learner_price=Decimal("80.00"))
+        CoursePricing.objects.create(course=other, affiliate_price=Decimal("30.00"))
+
+        plain = Business.objects.create(name="Plain", email="plain@example.com")
+        wide = Business.objects.create(name="Wide", email="wide@example.com")
+        BusinessDiscount.objects.create(
+            business=wide, affiliate_discount_percentage=Decimal("10"), learner_discount_percentage=Decimal("25"),
+        )
+        per_course = Business.objects.create(name="PerCourse", email="per-course@example.com")
+        BusinessDiscount.objects.create(business=per_course, affiliate_discount_percentage=Decimal("50"))
+        BusinessCourseDiscount.objects.create(business=per_course, course=priced, affiliate_discount_percentage=Decimal("20"))
+
+        pairs = [(b, c) for b in (plain, wide, per_course) for c in (priced, other, unpriced)]
+        with self.assertNumQueries(3):
+            book = PriceBook.for_pairs(pairs)
+        with self.assertNumQueries(0):
+            prices = {(b.name, c.title): book.price(b, c)[0] for b, c in pairs}
+            learner_price = book.price(wide, priced, "learner")
+
+        self.assertEqual(prices[("Plain", "Priced")], Decimal("50.00"))
+        self.assertEqual(prices[("Plain", "Unpriced")], Decimal("20.00"))
+        self.assertEqual(prices[("Wide", "Priced")], Decimal("45.00"))
+        self.assertEqual(prices[("Wide", "Unpriced")], Decimal("18.00"))
+        self.assertEqual(prices[("PerCourse", "Priced")], Decimal("40.00"))
+        # A business with per-course discounts never falls back to its business-wide one
+        self.assertEqual(prices[("PerCourse", "Other")], Decimal("30.00"))
+        self.assertEqual(learner_price, (Decimal("60.00"), Decimal("80.00"), Decimal("25"), "GBP"))
+        self.assertEqual(get_discounted_price(per_course, priced), book.price(per_course, priced))
+        with self.assertRaises(LookupError):
+            PriceBook.for_pairs([(plain, priced)]).price(wide, priced)
@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404, redirect, render
-from superadmin.models import Course, BusinessDiscount, BusinessCourseDiscount
+from superadmin.models import Course
 from .models import CoursePricing, InvoicePayment, InvoicedItem
 from .forms import CoursePricingForm
 from datetime import timedelta
@@ -16,9 +16,7 @@ from django.views.decorators.http import require_POST
 from django.db import transaction
 from django.db.models import Prefetch
 
-DEFAULT_CURRENCY = "USD"
-DEFAULT_AFFILIATE = Decimal("20.00")
-DEFAULT_LEARNER = Decimal("40.00")
+from .pricebook import DEFAULT_AFFILIATE, DEFAULT_CURRENCY, DEFAULT_LEARNER, PriceBook
 
 
 def get_discounted_price(business, course, price_type='affiliate'):
@@ -32,47 +30,10 @@ def get_discounted_price(business, course, price_type='affiliate'):
     
     Returns:
         tuple: (final_price, base_price, discount_percentage, currency)
-    """
-    try:
-        pricing = CoursePricing.objects.get(course=course)
-        base_price = getattr(pricing, f"{price_type}_price")
-        currency = pricing.currency
-    except CoursePricing.DoesNotExist:
-        base_price = DEFAULT_AFFILIATE if price_type == 'affiliate' else DEFAULT_LEARNER
-        currency = DEFAULT_CURRENCY
-    
-    # Check for per-course business discount first
-    discount_percentage = Decimal("0.00")
-    final_price = base_price
-    try:
-        course_discount = BusinessCourseDiscount.objects.get(business=business, course=course)
-        discount_percentage = (
-            course_discount.affiliate_discount_percentage
-            if price_type == 'affiliate'
-            else course_discount.learner_discount_percentage
-        )
-    except BusinessCourseDiscount.DoesNotExist:
-        # Fallback to legacy business-wide discount ONLY if the business has no per-course discounts at all.
-        has_any_course_discount = BusinessCourseDiscount.objects.filter(business=business).exists()
-        if not has_any_course_discount:
-            try:
-                discount = BusinessDiscount.objects.get(business=business)
-                discount_percentage = (
-                    discount.affiliate_discount_percentage
-                    if price_type == 'affiliate'
-                    else discount.learner_discount_percentage
-                )
-            except BusinessDiscount.DoesNotExist:
-                discount_percentage = Decimal("0.00")
 
-    if discount_percentage and discount_percentage > 0:
-        discount_amount = (base_price * discount_percentage) / 100
-        final_price = max(Decimal("0.00"), base_price - discount_amount)
-    else:
-        final_price = base_price
-        discount_percentage = Decimal("0.00")
-    
-    return final_price, base_price, discount_percentage, currency
+    For many lookups, load a PriceBook once instead (same rules, three queries in total).
+    """
+    return PriceBook.for_pairs([(business, course)]).price(business, course, price_type)
 
 
 def _ensure_pricing_for_courses(courses):
@@ -178,6 +139,11 @@ def invoices(request):
     for r in regs:
         grouped[r.business_id][r.course_id].append(r)
 
+    # Prices for every (business, course) line in three queries
+    prices = PriceBook.for_pairs(
+        (biz_id, course_id) for biz_id, courses_map in grouped.items() for course_id in courses_map
+    )
+
     invoices = []
     for biz_id, courses_map in grouped.items():
         # Get the Business instance from any reg in this group
@@ -192,7 +158,7 @@ def invoices(request):
             count = len(reg_list)
 
             # Pricing: use discounted affiliate price
-            final_price, base_price, discount_percentage, currency = get_discounted_price(business, course, 'affiliate')
+            final_price, base_price, discount_percentage, currency = prices.price(business, course, 'affiliate')
             unit_fee = final_price
             amount = unit_fee * count
 
@@ -724,6 +690,7 @@ def issue_invoices_now(request):
         by_biz = defaultdict(list)
         for r in regs_qs:
             by_biz[r.business_id].append(r)
+        prices = PriceBook.for_registrations(r for reg_list in by_biz.values() for r in reg_list)
 
         for biz_id, reg_list in by_biz.items():
             business = reg_list[0].business
@@ -743,7 +710,7 @@ def issue_invoices_now(request):
 
             items = []
             for r in reg_list:
-                final_price, base_price, discount_percentage, currency = get_discounted_price(business, r.course, 'affiliate')
+                final_price, base_price, discount_percentage, currency = prices.price(business, r.course, 'affiliate')
 
                 items.append(
                     InvoicedItem(
@@ -4,4 +4,6 @@ class SuperadminConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "superadmin"
 
- 
\ No newline at end of file
+    def ready(self):
+        # Ensure signals are registered
+        import superadmin.signals  # noqa
@@ -0,0 +1,212 @@
+"""
+Bulk learner registration.
+
+register_learners used to handle a CSV one row at a time: a transaction, a
+user lookup, create_user, roles.add, get_or_create on the registration and a
+queued email per learner, i.e. a dozen queries per row. Here the whole upload
+is validated first (parse_learner_rows) and then registered with a fixed
+number of queries however many rows there are (register_learners_bulk):
+existing users are resolved in one query, new users' passwords are hashed
+before the transaction opens (on a process pool for large uploads) and the
+users are created by users.accounts.create_accounts, and role links,
+registrations (with learner numbers allocated in bulk) and registration
+emails are each written with one bulk insert.
+
+Every input row gets a LearnerRow back describing what happened to it, which
+the view offers as a downloadable report (save_registration_report).
+"""
+import csv
+import io
+from dataclasses import asdict, dataclass
+
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.crypto import get_random_string
+
+from users.accounts import NewAccount, create_accounts, hash_passwords
+from users.models import CustomUser, Role
+
+from .models import LearnerRegistration, RegistrationReport
+
+
+@dataclass
+class LearnerRow:
+    class Status:
+        CREATED = "created"          # new account and registration
+        REGISTERED = "registered"    # existing account, new registration
+        EXISTING = "existing"        # already registered for this course/business
+        DUPLICATE = "duplicate"      # same email earlier in the upload
+        ERROR = "error"              # invalid row, nothing done
+
+    line: int
+    name: str
+    email: str
+    dob: str = ""
+    status: str = ""
+    error: str = ""
+
+    @property
+    def is_valid(self) -> bool:
+        return self.status not in (self.Status.ERROR, self.Status.DUPLICATE)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+REPORT_FIELDS = ("line", "name", "email", "dob", "status", "error")
+
+
+def save_registration_report(*, course, user, rows) -> RegistrationReport:
+    """Store the CSV report of `rows`, replacing the user's previous one for the course."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(row.as_dict() for row in rows)
+    with transaction.atomic():
+        RegistrationReport.objects.filter(course=course, created_by=user).delete()
+        return RegistrationReport.objects.create(course=course, created_by=user, content=out.getvalue())
+
+
+def parse_learner_rows(names, emails, dobs) -> list:
+    """
+    Pair up the submitted names/emails/dobs (padding to the longest list),
+    skip blank rows and mark invalid rows and repeated emails up front.
+    `line` is the 1-based position of the row in the submission.
+    """
+    rows = []
+    seen = set()
+    total = max(len(names), len(emails), len(dobs))
+    for i in range(total):
+        name = (names[i] if i < len(names) else "").strip()
+        email = (emails[i] if i < len(emails) else "").strip().lower()
+        dob = (dobs[i] if i < len(dobs) else "").strip()
+
+        # Skip completely empty rows
+        if not name and not email and not dob:
+            continue
+
+        row = LearnerRow(line=i + 1, name=name, email=email, dob=dob)
+        if not name or not email:
+            row.status = LearnerRow.Status.ERROR
+            row.error = "Missing name" if not name else "Missing email"
+        else:
+            try:
+                validate_email(email)
+            except Exception:
+                row.status = LearnerRow.Status.ERROR
+                row.error = "Invalid email format"
+        if row.is_valid and email in seen:
+            row.status = LearnerRow.Status.DUPLICATE
+            row.error = "Email appears earlier in the upload"
+        if row.is_valid:
+            seen.add(email)
+        rows.append(row)
+    return rows
+
+
+@dataclass
+class BulkRegistrationResult:
+    rows: list
+    registrations: list     # the newly created LearnerRegistration objects
+    created_users: int = 0
+
+    def count(self, status: str) -> int:
+        return sum(1 for row in self.rows if row.status == status)
+
+    @property
+    def registered_count(self) -> int:
+        return len(self.registrations)
+
+    @property
+    def existing_count(self) -> int:
+        return self.count(LearnerRow.Status.EXISTING)
+
+    @property
+    def error_count(self) -> int:
+        return self.count(LearnerRow.Status.ERROR) + self.count(LearnerRow.Status.DUPLICATE)
+
+
+def register_learners_bulk(*, course, business, rows, portal_url=None, send_emails=True) -> BulkRegistrationResult:
+    """
+    Register every valid row for `course` under `business` in one transaction.
+    Updates each row's status in place. New accounts get a random password,
+    which is included in their (queued) registration email.
+    """
+    from users.outbox import enqueue_emails
+    from .views import build_registration_email
+
+    valid = [row for row in rows if row.is_valid]
+    if not valid:
+        return BulkRegistrationResult(rows=rows, registrations=[])
+
+    # Existing accounts, matched case-insensitively like the email constraint
+    users_by_email = {
+        user.email.lower(): user
+        for user in CustomUser.objects.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=[row.email for row in valid])
+    }
+
+    new_rows = [row for row in valid if row.email not in users_by_email]
+    passwords = {row.email: get_random_string(12) for row in new_rows}
+    # Hashed before the transaction opens (on spawned processes for large uploads)
+    new_accounts = [
+        NewAccount(email=row.email, full_name=row.name, password=passwords[row.email], password_hash=password_hash)
+        for row, password_hash in zip(new_rows, hash_passwords(passwords[row.email] for row in new_rows))
+    ]
+
+    with transaction.atomic():
+        learner_role, _ = Role.objects.get_or_create(name=Role.Names.LEARNER)
+        users_by_email.update(create_accounts(new_accounts, roles=[learner_role]))
+
+        # Ensure learner role for existing accounts (existing links are left alone)
+        CustomUser.roles.through.objects.bulk_create(
+            [
+                CustomUser.roles.through(customuser_id=user.pk, role_id=learner_role.pk)
+                for email, user in users_by_email.items()
+                if email not in passwords
+            ],
+            ignore_conflicts=True,
+        )
+
+        registered_ids = set(
+            LearnerRegistration.objects.filter(
+                course=course,
+                business=business,
+                learner_id__in=[users_by_email[row.email].pk for row in valid],
+            ).values_list("learner_id", flat=True)
+        )
+        to_register = []
+        for row in valid:
+            user = users_by_email[row.email]
+            if user.pk in registered_ids:
+                row.status = LearnerRow.Status.EXISTING
+            else:
+                row.status = LearnerRow.Status.CREATED if row.email in passwords else LearnerRow.Status.REGISTERED
+                to_register.append(user)
+
+        registrations = []
+        if to_register:
+            numbers = LearnerRegistration.allocate_learner_numbers(len(to_register))
+            registrations = LearnerRegistration.objects.bulk_create([
+                LearnerRegistration(course=course, business=business, learner=user, learner_number=number)
+                for user, number in zip(to_register, numbers)
+            ])
+
+        if send_emails:
+            # Queued with the registrations; delivered by the email outbox worker
+            enqueue_emails(
+                [
+                    build_registration_email(
+                        user=users_by_email[row.email],
+                        course=course,
+                        business=business,
+                        portal_url=portal_url,
+                        plain_password=passwords.get(row.email),  # None for existing users
+                    )
+                    for row in valid
+                ],
+                kind="registration",
+            )
+
+    return BulkRegistrationResult(rows=rows, registrations=registrations, created_users=len(new_accounts))
@@ -0,0 +1,350 @@
+"""
+Certificate Rendering Caches
+Process-wide caches used by the certificate renderer in superadmin/views.py.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class TemplatePageCache:
+    """
+    Byte-budget LRU of rasterized certificate template pages.
+
+    Entries are keyed by (template path, mtime, page number, scale factor) so
+    replacing the template file on disk invalidates them automatically.
+    Callers always receive a copy they are free to draw on.
+
+    If disk_dir is set, rasterized pages are also written there as raw RGB
+    files so a fresh worker process can skip PDF rasterization entirely.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str | None = None):
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.disk_dir = str(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _image_bytes(img: Image.Image) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def _disk_path(self, key: tuple) -> str | None:
+        if not self.disk_dir:
+            return None
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"template-{digest}.rgb")
+
+    def _read_disk(self, key: tuple) -> Image.Image | None:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                header = f.readline().decode("ascii").split()
+                width, height = int(header[0]), int(header[1])
+                data = f.read()
+            return Image.frombytes("RGB", (width, height), data)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable template cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key: tuple, img: Image.Image) -> None:
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(f"{img.width} {img.height}\n".encode("ascii"))
+                f.write(img.tobytes())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write template cache file {path}: {e}")
+
+    def _store(self, key: tuple, img: Image.Image) -> None:
+        size = self._image_bytes(img)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._image_bytes(evicted)
+
+    def get(self, template_path: str, page_num: int, scale: float, loader) -> Image.Image:
+        """
+        Return a copy of the rasterized page, calling loader(template_path, page_num)
+        only when neither the memory nor the disk cache has it.
+        """
+        key = (os.path.abspath(template_path), os.path.getmtime(template_path), int(page_num), float(scale))
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return img.copy()
+            self.misses += 1
+
+        img = self._read_disk(key)
+        if img is None:
+            img = loader(template_path, page_num)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            self._write_disk(key, img)
+        self._store(key, img)
+        return img.copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+template_page_cache = TemplatePageCache(
+    max_bytes=getattr(settings, "CERTIFICATE_TEMPLATE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    disk_dir=getattr(settings, "CERTIFICATE_TEMPLATE_CACHE_DIR", None),
+)
+
+
+class QRCodeCache:
+    """
+    LRU of QR code images keyed by (encoded data, pixel size). The data is a
+    certificate's verification URL, which never changes once the number is
+    assigned, so after first issuance every render is a cache hit.
+
+    Images are 1-bit (a few KB each) and returned shared, not copied: callers
+    only paste them.
+    If disk_dir is set, codes are also kept there as PNG files so fresh worker
+    processes skip QR encoding.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: str | None = None):
+        self.max_entries = max(0, int(max_entries or 0))
+        self.disk_dir = str(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: tuple) -> str | None:
+        if not self.disk_dir:
+            return None
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"qr-{digest}.png")
+
+    def _read_disk(self, key: tuple) -> Image.Image | None:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with Image.open(path) as img:
+                return img.convert("1")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable QR cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key: tuple, img: Image.Image) -> None:
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            img.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write QR cache file {path}: {e}")
+
+    def get(self, data: str, size: int, generate) -> Image.Image:
+        """Return the QR image for data at size, calling generate(data, size) on a miss."""
+        key = (str(data), int(size))
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+
+        img = self._read_disk(key)
+        if img is None:
+            img = generate(*key)
+            self._write_disk(key, img)
+        if self.max_entries:
+            with self._lock:
+                self._entries[key] = img
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return img
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+qr_code_cache = QRCodeCache(
+    max_entries=getattr(settings, "CERTIFICATE_QR_CACHE_SIZE", 2048),
+    disk_dir=getattr(settings, "CERTIFICATE_QR_CACHE_DIR", None),
+)
+
+
+class RenderedCertificateCache:
+    """
+    On-disk cache of rendered certificate PDFs.
+
+    Files live at <cache_dir>/<registration id>/<fingerprint>.pdf where the
+    fingerprint is a hash of every input the renderer reads, so any real
+    change (name, course, business, dates, number, template) simply misses.
+    Stale fingerprints are dropped by invalidate() or by size-based eviction
+    of the least recently used files once max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self._lock = threading.Lock()
+        self._approx_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(inputs) -> str:
+        import json
+        payload = json.dumps(inputs, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, reg_id, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, str(int(reg_id)), f"{fingerprint}.pdf")
+
+    def path_for(self, reg_id, fingerprint: str) -> str | None:
+        """Return the cached file path (touching it for LRU) or None on a miss."""
+        path = self._path(reg_id, fingerprint)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def get(self, reg_id, fingerprint: str) -> bytes | None:
+        path = self.path_for(reg_id, fingerprint)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, reg_id, fingerprint: str, data: bytes) -> str | None:
+        if not data or len(data) > self.max_bytes:
+            return None
+        path = self._path(reg_id, fingerprint)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write rendered certificate cache file {path}: {e}")
+            return None
+
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_total()
+            else:
+                self._approx_bytes += len(data)
+            if self._approx_bytes > self.max_bytes:
+                self._approx_bytes = self._evict()
+        return path
+
+    def invalidate(self, reg_ids) -> None:
+        """Drop every cached render of the given registrations."""
+        import shutil
+        for reg_id in reg_ids:
+            shutil.rmtree(os.path.join(self.cache_dir, str(int(reg_id))), ignore_errors=True)
+        with self._lock:
+            self._approx_bytes = None
+
+    def _files(self):
+        out = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _scan_total(self) -> int:
+        return sum(size for _mtime, size, _path in self._files())
+
+    def _evict(self) -> int:
+        """Delete least recently used files until under 90% of max_bytes; returns the new total."""
+        files = sorted(self._files())
+        total = sum(size for _mtime, size, _path in files)
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_bytes": self.max_bytes,
+            "cache_dir": self.cache_dir,
+        }
+
+
+rendered_certificate_cache = RenderedCertificateCache(
+    cache_dir=getattr(settings, "CERTIFICATE_RENDER_CACHE_DIR", os.path.join(settings.BASE_DIR, ".cache", "certificates")),
+    max_bytes=getattr(settings, "CERTIFICATE_RENDER_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+)
@@ -3,6 +3,8 @@ Certificate Font Configuration
 Defines fonts to be used for different certificate elements.
 """
 
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from django.conf import settings
 
@@ -81,6 +83,89 @@ CERTIFICATE_FONTS = {
 }
 
 
+class FontRegistry:
+    """
+    Bounded LRU of loaded PIL fonts keyed by (path, size).
+
+    Certificate rendering asks for the same handful of TTF files at a few sizes
+    over and over; this keeps the parsed FreeType faces around instead of
+    reading them from disk each time. hits/misses are kept for profiling.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, int(max_entries))
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, size):
+        """
+        Return ImageFont.truetype(path, size), loading it only on first use.
+        Load errors propagate to the caller and are not cached.
+        """
+        from PIL import ImageFont
+
+        key = (str(path), int(size))
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        font = ImageFont.truetype(key[0], size=key[1])
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_entries:
+                self._fonts.popitem(last=False)
+        return font
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._fonts),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+font_registry = FontRegistry(getattr(settings, "CERTIFICATE_FONT_CACHE_SIZE", 256))
+
+
+def get_cached_font(path, size):
+    """
+    Load a TrueType font through the shared font_registry.
+    
+    Args:
+        path (str | Path): Font file path
+        size (int): Font size in pixels
+        
+    Returns:
+        PIL.ImageFont.FreeTypeFont: Shared (do not mutate) font object
+    """
+    return font_registry.get(path, size)
+
+
+def font_cache_stats():
+    """
+    Get hit/miss counters of the shared font registry (for profiling).
+    
+    Returns:
+        dict: 'entries', 'max_entries', 'hits' and 'misses'
+    """
+    return font_registry.stats()
+
+
 def get_font_path(font_key):
     """
     Get the file path for a specific font.
@@ -139,12 +224,10 @@ def load_font_for_pil(font_key, size=None):
     Returns:
         PIL.ImageFont.FreeTypeFont: Loaded font object
     """
-    from PIL import ImageFont
-    
     config = get_font_config(font_key)
     font_size = size if size is not None else config["size"]
     
-    return ImageFont.truetype(config["path"], font_size)
+    return get_cached_font(config["path"], font_size)
 
 
 def load_font_for_reportlab(font_key):
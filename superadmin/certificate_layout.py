@@ -0,0 +1,122 @@
+"""
+Certificate Layout Plans
+Everything on a certificate except the learner's own details (name, certificate
+number, dates and QR code) depends only on the course, the business and the
+template: wrapped and fitted titles, the business name banner, the transcript
+table and its page breaks, the summary lines. A CertificateLayoutPlan holds
+that part as recorded drawing operations (see certificate_vector.RecordingDraw)
+plus the anchor positions of the per-learner fields, so rendering a learner's
+certificate only replays the plan and draws those few fields.
+
+Plans are compiled by superadmin/views.py (compile_certificate_layout) and
+kept in the process-wide certificate_layout_cache, keyed by
+(course, business, template version). Saving or deleting a Course,
+QualificationSection, QualificationUnit or Business drops the affected plans
+(superadmin/signals.py); each entry also stores a digest of the layout inputs,
+so a plan compiled from stale data in another process is never used.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class PlannedPage:
+    template_page: int  # 1-based template page the ops are drawn on
+    ops: tuple
+
+
+@dataclass(frozen=True)
+class CertificateLayoutPlan:
+    """
+    Pages in output order (page 1, then one page per transcript slice; the last
+    one carries the summary block) and where the per-learner fields go on the
+    last transcript page.
+    """
+    pages: tuple
+    transcript_name_xy: tuple
+    qualification_date_anchor: tuple  # (x, centre y)
+    certificate_number_anchor: tuple  # (x, centre y)
+    issue_date_anchor: tuple  # (x, centre y)
+    transcript_qr_xy: tuple
+
+
+def layout_inputs(spec) -> dict:
+    """The parts of a CertificateRenderSpec a layout plan depends on."""
+    return {
+        "course_title": spec.course_title,
+        "course_number": spec.course_number,
+        "business_name": spec.business_name,
+        "sections": [asdict(section) for section in spec.sections],
+    }
+
+
+def layout_digest(spec, template_version) -> str:
+    payload = json.dumps([layout_inputs(spec), template_version], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LayoutPlanCache:
+    """
+    Bounded LRU of compiled layout plans keyed by (course id, business id,
+    template version). An entry is only returned if its digest matches the
+    spec being rendered; otherwise the plan is recompiled and replaced.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, int(max_entries or 0))
+        self._entries: "OrderedDict[tuple, tuple[str, CertificateLayoutPlan]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, spec, template_version, compile_plan) -> CertificateLayoutPlan:
+        """Return the plan for spec, calling compile_plan(spec) on a miss."""
+        key = (spec.course_id, spec.business_id, template_version)
+        digest = layout_digest(spec, template_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        plan = compile_plan(spec)
+        if self.max_entries and spec.course_id is not None:
+            with self._lock:
+                self._entries[key] = (digest, plan)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return plan
+
+    def invalidate(self, *, course_id=None, business_id=None) -> None:
+        """Drop every plan of the given course and/or business."""
+        with self._lock:
+            for key in list(self._entries):
+                if (course_id is not None and key[0] == course_id) or (business_id is not None and key[1] == business_id):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+certificate_layout_cache = LayoutPlanCache(
+    max_entries=getattr(settings, "CERTIFICATE_LAYOUT_CACHE_SIZE", 128),
+)
@@ -0,0 +1,286 @@
+"""
+Certificate Render Specs and Batch Rendering
+A CertificateRenderSpec is the plain data the certificate renderer draws
+(superadmin/views.py: build_certificate_render_spec / render_certificate_spec).
+Specs need no database access to render, so bulk operations can build them all
+up front and render them on a process pool.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+
+from . import timing
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CertificateUnitSpec:
+    order: int
+    unit_ref: str
+    unit_title: str
+    credits: int
+    glh_hours: int
+
+
+@dataclass(frozen=True)
+class CertificateSectionSpec:
+    order: int
+    credits: int
+    glh_hours: int
+    tqt_hours: int
+    remarks: str
+    units: tuple
+
+
+@dataclass(frozen=True)
+class CertificateRenderSpec:
+    registration_id: int
+    learner_name: str
+    course_title: str
+    course_number: str
+    business_name: str
+    certificate_number: str
+    issue_date: date
+    verify_url: str
+    sections: tuple
+    output: str = "raster"  # "raster" or "vector", see certificate_vector
+    course_id: int | None = None  # layout plan cache key, see certificate_layout
+    business_id: int | None = None
+
+
+@dataclass
+class RenderedCertificate:
+    """One result of render_certificates: pdf_bytes on success, error otherwise."""
+    registration: object
+    pdf_bytes: bytes | None = None
+    error: Exception | None = None
+
+
+def build_render_specs(regs) -> list:
+    """
+    Build CertificateRenderSpecs for many registrations with a fixed number of
+    queries: courses/businesses, learners and course sections (with units) are
+    loaded once for the whole batch, and not at all if already loaded on the
+    registrations (select_related).
+
+    Returns:
+        list: (registration, spec or None, exception or None) in input order
+    """
+    from django.db.models import Prefetch, prefetch_related_objects
+    from users.models import CustomUser
+    from .models import LearnerRegistration, QualificationSection, QualificationUnit
+    from .views import build_certificate_render_spec
+
+    regs = list(regs)
+    prefetch_related_objects(regs, "course", "business")
+
+    learners = {reg.learner_id: reg.learner for reg in regs if LearnerRegistration.learner.is_cached(reg)}
+    missing = {reg.learner_id for reg in regs if reg.learner_id not in learners}
+    if missing:
+        learners.update(CustomUser.objects.only("full_name", "email").in_bulk(missing))
+
+    sections_by_course = {}
+    for section in (
+        QualificationSection.objects
+        .filter(course_id__in={reg.course_id for reg in regs})
+        .prefetch_related(Prefetch("units", queryset=QualificationUnit.objects.order_by("order", "id")))
+        .order_by("course_id", "order", "id")
+    ):
+        sections_by_course.setdefault(section.course_id, []).append(section)
+
+    out = []
+    for reg in regs:
+        try:
+            spec = build_certificate_render_spec(
+                reg,
+                learner=learners.get(reg.learner_id),
+                sections=sections_by_course.get(reg.course_id, []),
+            )
+            out.append((reg, spec, None))
+        except Exception as e:
+            out.append((reg, None, e))
+    return out
+
+
+def load_certificate_render_spec(reg) -> CertificateRenderSpec:
+    """
+    Load everything one registration's certificate needs and return it as an
+    immutable CertificateRenderSpec, in a fixed number of queries however many
+    sections and units the course has (see build_render_specs).
+
+    Args:
+        reg: A LearnerRegistration, or its id (then fetched with course,
+             business and learner in one query)
+
+    Raises:
+        LearnerRegistration.DoesNotExist, ValueError: as build_certificate_render_spec
+    """
+    from .models import LearnerRegistration
+
+    with timing.span("spec_load"):
+        if not isinstance(reg, LearnerRegistration):
+            reg = LearnerRegistration.objects.select_related("course", "business", "learner").get(pk=reg)
+        [(reg, spec, error)] = build_render_specs([reg])
+    if error is not None:
+        raise error
+    return spec
+
+
+def _init_render_worker():
+    import django
+    django.setup()
+
+
+# Render pools by size, started on first use and kept for the life of the process:
+# spawned workers each pay for django.setup() and cold font/template caches, far
+# more than rendering a handful of certificates in-process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _render_pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn (not fork): the parent may hold DB connections, locks and threads
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+            )
+            _pools[workers] = pool
+        return pool
+
+
+def _discard_render_pool(workers: int, pool) -> None:
+    """Drop a broken pool so the next batch starts a fresh one."""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_in_worker(spec: CertificateRenderSpec) -> bytes:
+    from .views import render_certificate_spec
+    with timing.trace("certificate.render", registration_id=spec.registration_id):
+        return render_certificate_spec(spec)
+
+
+def render_certificates(regs, workers: int | None = None, use_cache: bool = True):
+    """
+    Render certificate PDFs for many registrations, yielding RenderedCertificate
+    results in completion order (failures are yielded, not raised).
+
+    Specs are built up front in the calling process; cache hits are yielded
+    immediately and the rest are rendered on the process's long-lived pool of
+    `workers` processes (default CERTIFICATE_RENDER_WORKERS, else the CPU
+    count). With one worker, or (unless `workers` is given) fewer than
+    CERTIFICATE_RENDER_PARALLEL_MIN certificates to render, everything runs
+    in-process.
+    """
+    from .certificate_cache import rendered_certificate_cache
+    from .views import _certificate_spec_fingerprint
+
+    pending = []
+    for reg, spec, error in build_render_specs(regs):
+        if error is not None:
+            logger.warning(f"Batch render: could not prepare certificate for reg {reg.id}: {error}")
+            yield RenderedCertificate(reg, error=error)
+            continue
+        fingerprint = _certificate_spec_fingerprint(spec) if use_cache else None
+        if fingerprint:
+            cached = rendered_certificate_cache.get(reg.id, fingerprint)
+            if cached:
+                yield RenderedCertificate(reg, pdf_bytes=cached)
+                continue
+        pending.append((reg, spec, fingerprint))
+
+    if not pending:
+        return
+
+    def _done(reg, fingerprint, pdf_bytes):
+        if fingerprint and pdf_bytes:
+            rendered_certificate_cache.put(reg.id, fingerprint, pdf_bytes)
+        return RenderedCertificate(reg, pdf_bytes=pdf_bytes)
+
+    if workers is None:
+        workers = getattr(settings, "CERTIFICATE_RENDER_WORKERS", None) or os.cpu_count() or 1
+        if len(pending) < getattr(settings, "CERTIFICATE_RENDER_PARALLEL_MIN", 24):
+            workers = 1
+    workers = max(1, int(workers))
+
+    def _in_process(items):
+        for reg, spec, fingerprint in items:
+            try:
+                yield _done(reg, fingerprint, _render_in_worker(spec))
+            except Exception as e:
+                logger.warning(f"Batch render: certificate generation failed for reg {reg.id}: {e}")
+                yield RenderedCertificate(reg, error=e)
+
+    if workers == 1 or len(pending) == 1:
+        yield from _in_process(pending)
+        return
+
+    pool = _render_pool(workers)
+    # Keep only a couple of renders per worker in flight so finished PDFs
+    # don't pile up in memory while a slow consumer (e.g. a streaming download) catches up
+    queue = iter(pending)
+    in_flight = {}
+    refused = []  # taken from the queue but refused by a broken pool
+    broken = False
+
+    def _pool_broken():
+        nonlocal broken
+        if not broken:
+            broken = True
+            logger.warning("Batch render: render pool broke, rendering the rest in-process")
+            _discard_render_pool(workers, pool)
+
+    def _submit_next():
+        if broken:
+            return
+        item = next(queue, None)
+        if item is not None:
+            reg, spec, fingerprint = item
+            try:
+                in_flight[pool.submit(_render_in_worker, spec)] = (reg, fingerprint)
+            except (BrokenProcessPool, RuntimeError):
+                _pool_broken()
+                refused.append(item)
+
+    try:
+        for _ in range(workers * 2):
+            _submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                reg, fingerprint = in_flight.pop(future)
+                try:
+                    result = _done(reg, fingerprint, future.result())
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        _pool_broken()
+                    logger.warning(f"Batch render: certificate generation failed for reg {reg.id}: {e}")
+                    result = RenderedCertificate(reg, error=e)
+                _submit_next()
+                yield result
+
+        # Once the pool breaks, the renders it lost are reported as failed above
+        # and the rest finish in-process instead of ending the stream early
+        yield from _in_process(refused)
+        yield from _in_process(queue)
+    finally:
+        # A consumer that stops early (e.g. a cancelled download) must not leave
+        # its queued renders occupying the shared pool
+        for future in in_flight:
+            future.cancel()
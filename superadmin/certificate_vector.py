@@ -0,0 +1,245 @@
+"""
+Vector Certificate Output
+Lets the certificate renderer in superadmin/views.py produce a PDF that keeps
+the template page as its original vector PDF and overlays text, rules and the
+QR code as PDF objects, instead of saving full-page raster images.
+
+The renderer draws exactly as it does in raster mode, in the same scaled pixel
+coordinates (PAGE1_CONFIG / TRANSCRIPT_CONFIG * CERTIFICATE_SCALE_FACTOR):
+VectorPage stands in for the rasterized template page and RecordingDraw for
+ImageDraw. Measurements (textbbox) still come from Pillow/FreeType so wrapping,
+fitting and centring are identical; only the final drawing is replayed onto the
+template with PyMuPDF, dividing every coordinate by the scale factor.
+
+Recorded operations are also what certificate layout plans are made of
+(certificate_layout); replay_ops applies them to either kind of page.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageColor, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+RASTER = "raster"
+VECTOR = "vector"
+
+
+class VectorPage:
+    """
+    Placeholder for one template page in vector mode. Has the pixel size the
+    rasterized page would have and records what is drawn / pasted onto it.
+    """
+
+    def __init__(self, template_page_index: int, size: tuple[int, int]):
+        self.template_page_index = template_page_index
+        self.size = size
+        self.width, self.height = size
+        self.ops = []
+
+    def paste(self, im: Image.Image, box) -> None:
+        self.ops.append(("image", (int(box[0]), int(box[1])), im.copy()))
+
+
+class RecordingDraw:
+    """
+    The subset of ImageDraw used by the certificate renderer. textbbox is measured
+    with Pillow; text/rectangle/line calls are recorded on the VectorPage.
+    """
+
+    def __init__(self, page: VectorPage):
+        self.page = page
+        self._measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    def textbbox(self, xy, text, font=None, *args, **kwargs):
+        return self._measure.textbbox(xy, text, font=font, *args, **kwargs)
+
+    def text(self, xy, text, fill=None, font=None, stroke_width=0, stroke_fill=None, **kwargs):
+        if not text:
+            return
+        self.page.ops.append(("text", (xy[0], xy[1]), str(text), font, fill, stroke_width, stroke_fill))
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        x1, y1, x2, y2 = xy
+        self.page.ops.append(("rectangle", (x1, y1, x2, y2), fill, outline, width))
+
+    def line(self, xy, fill=None, width=0):
+        (x1, y1), (x2, y2) = xy
+        self.page.ops.append(("line", (x1, y1, x2, y2), fill, width))
+
+
+def page_draw(page):
+    """ImageDraw.Draw(page) for raster pages, RecordingDraw for VectorPage."""
+    if isinstance(page, VectorPage):
+        return RecordingDraw(page)
+    return ImageDraw.Draw(page)
+
+
+def replay_ops(page, ops) -> None:
+    """
+    Apply recorded operations to a page: appended as-is to a VectorPage, drawn
+    with ImageDraw onto a raster page (giving exactly what drawing them
+    directly would have).
+    """
+    if isinstance(page, VectorPage):
+        page.ops.extend(ops)
+        return
+    draw = ImageDraw.Draw(page)
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, xy, text, font, fill, stroke_width, stroke_fill = op
+            draw.text(xy, text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)
+        elif kind == "rectangle":
+            _, xy, fill, outline, width = op
+            draw.rectangle(xy, fill=fill, outline=outline, width=width)
+        elif kind == "line":
+            _, (x1, y1, x2, y2), fill, width = op
+            draw.line([(x1, y1), (x2, y2)], fill=fill, width=width)
+        elif kind == "image":
+            _, xy, im = op
+            page.paste(im, xy)
+
+
+@lru_cache(maxsize=8)
+def _template_page_sizes(template_path: str, mtime: float, scale: float) -> tuple:
+    import fitz  # PyMuPDF
+
+    with fitz.open(template_path) as doc:
+        # Same rounding as page.get_pixmap(matrix=Matrix(scale, scale))
+        return tuple(tuple((page.rect * fitz.Matrix(scale, scale)).irect)[2:] for page in doc)
+
+
+def template_page_size(template_path: str, page_num: int, scale: float) -> tuple[int, int]:
+    """Pixel size of template page page_num (1-based) rasterized at scale."""
+    sizes = _template_page_sizes(os.path.abspath(template_path), os.path.getmtime(template_path), float(scale))
+    return sizes[page_num - 1] if page_num <= len(sizes) else sizes[0]
+
+
+def open_vector_page(template_path: str, page_num: int, scale: float) -> VectorPage:
+    """
+    VectorPage for template page page_num (1-based), sized like the rasterized
+    page at scale. Pages past the end of the template become blank pages the
+    size of page 1, as in raster mode.
+    """
+    sizes = _template_page_sizes(os.path.abspath(template_path), os.path.getmtime(template_path), float(scale))
+    index = page_num - 1 if page_num <= len(sizes) else None
+    return VectorPage(index, template_page_size(template_path, page_num, scale))
+
+
+def _rgb(color) -> tuple:
+    if color is None:
+        return None
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)
+    if isinstance(color, int):
+        color = (color, color, color)
+    return tuple(c / 255.0 for c in color[:3])
+
+
+def _font_name(path: str) -> str:
+    return "F" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:10]
+
+
+def _font_file(font):
+    """The font's file, or None for one without (Pillow's load_default(), loaded from memory)."""
+    path = getattr(font, "path", None)
+    if isinstance(path, (str, os.PathLike)) and os.path.exists(path):
+        return os.fspath(path)
+    return None
+
+
+def _font_ascent(font) -> int:
+    if hasattr(font, "getmetrics"):
+        return font.getmetrics()[0]
+    # Bitmap fonts have no metrics; their text box starts at the top of the line
+    return font.getbbox("A")[3]
+
+
+def write_vector_pdf(pages: list, template_path: str, scale: float) -> bytes:
+    """
+    Build the certificate PDF: each VectorPage becomes a copy of its template
+    page with the recorded operations drawn on top as vector objects.
+    """
+    import fitz  # PyMuPDF
+
+    src = fitz.open(template_path)
+    out = fitz.open()
+    try:
+        for vpage in pages:
+            if vpage.template_page_index is not None:
+                out.insert_pdf(src, from_page=vpage.template_page_index, to_page=vpage.template_page_index)
+                pdf_page = out[-1]
+            else:
+                pdf_page = out.new_page(width=vpage.width / scale, height=vpage.height / scale)
+            _replay(pdf_page, vpage.ops, scale)
+
+        try:
+            out.subset_fonts()
+        except Exception as e:
+            logger.warning(f"Could not subset certificate fonts, embedding them whole: {e}")
+        return out.tobytes(garbage=4, deflate=True)
+    finally:
+        out.close()
+        src.close()
+
+
+def _replay(pdf_page, ops: list, scale: float) -> None:
+    import fitz  # PyMuPDF
+
+    fonts = set()
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, (x, y), text, font, fill, stroke_width, stroke_fill = op
+            fontfile = _font_file(font)
+            if fontfile is None:
+                # The registry fell back to Pillow's default font (font file missing): use a built-in PDF font
+                name = "helv"
+            else:
+                name = _font_name(fontfile)
+                if name not in fonts:
+                    pdf_page.insert_font(fontname=name, fontfile=fontfile)
+                    fonts.add(name)
+            # Pillow anchors text at the ascender line ("la"); PDF text sits on the baseline
+            ascent = _font_ascent(font)
+            fontsize = (getattr(font, "size", None) or 10) / scale  # bitmap fonts have no size; Pillow's is ~10px
+            kwargs = {"fontsize": fontsize, "fontname": name, "color": _rgb(fill)}
+            if stroke_width:
+                kwargs.update(
+                    render_mode=2,
+                    fill=_rgb(fill),
+                    color=_rgb(stroke_fill if stroke_fill is not None else fill),
+                    border_width=(2 * stroke_width / scale) / fontsize,
+                )
+            pdf_page.insert_text(fitz.Point(x / scale, (y + ascent) / scale), text, **kwargs)
+
+        elif kind == "rectangle":
+            _, (x1, y1, x2, y2), fill, outline, width = op
+            # Pillow rectangles include their end pixels and draw outlines inside the box
+            if fill is not None:
+                rect = fitz.Rect(x1 / scale, y1 / scale, (x2 + 1) / scale, (y2 + 1) / scale)
+                pdf_page.draw_rect(rect, color=None, fill=_rgb(fill), width=0, overlay=True)
+            if outline is not None and width:
+                inset = width / 2
+                rect = fitz.Rect((x1 + inset) / scale, (y1 + inset) / scale, (x2 + 1 - inset) / scale, (y2 + 1 - inset) / scale)
+                pdf_page.draw_rect(rect, color=_rgb(outline), fill=None, width=width / scale, overlay=True)
+
+        elif kind == "line":
+            _, (x1, y1, x2, y2), fill, width = op
+            width = width or 1
+            # Pillow lines cover whole pixels; stroke through their centres
+            p1 = fitz.Point((x1 + 0.5) / scale, (y1 + 0.5) / scale)
+            p2 = fitz.Point((x2 + 0.5) / scale, (y2 + 0.5) / scale)
+            pdf_page.draw_line(p1, p2, color=_rgb(fill), width=width / scale, overlay=True)
+
+        elif kind == "image":
+            _, (x, y), im = op
+            buf = io.BytesIO()
+            im.save(buf, format="PNG")
+            rect = fitz.Rect(x / scale, y / scale, (x + im.width) / scale, (y + im.height) / scale)
+            pdf_page.insert_image(rect, stream=buf.getvalue(), keep_proportion=False)
@@ -0,0 +1,72 @@
+"""
+Bulk certificate issuance.
+
+Issuing used to mean reg.save() per registration: a full-row UPDATE each,
+plus the number generators' own queries for the certificate (and possibly
+learner) number. issue_certificates marks a whole batch issued in memory,
+reserves the missing numbers for all of them at once
+(LearnerRegistration.allocate_*_numbers) and writes the changes with one
+bulk_update, so issuing a 1,000-learner course takes a handful of queries.
+The registrations are returned updated, ready for rendering.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LearnerRegistration
+
+ISSUE_FIELDS = ["certificate_issued_at", "awarded_date", "status", "certificate_number", "learner_number"]
+
+
+@dataclass
+class IssuanceResult:
+    registrations: list
+    newly_issued: set = field(default_factory=set)   # ids issued by this call
+    updated: int = 0                                  # rows written
+
+    def is_new(self, reg) -> bool:
+        return reg.pk in self.newly_issued
+
+
+def issue_certificates(registrations, *, awarded_date=None, sync_awarded_date=False) -> IssuanceResult:
+    """
+    Issue every registration in `registrations` that is not issued yet, dated
+    `awarded_date` (default today). With sync_awarded_date, registrations that
+    were already issued are moved to `awarded_date` too, so a re-download shows
+    the date just chosen. Same rules as LearnerRegistration.save().
+    """
+    regs = list(registrations)
+    now = timezone.now()
+    awarded_date = awarded_date or now.date()
+    result = IssuanceResult(registrations=regs)
+
+    changed = []
+    for reg in regs:
+        dirty = False
+        if not reg.certificate_issued_at:
+            reg.certificate_issued_at = now
+            reg.awarded_date = awarded_date
+            result.newly_issued.add(reg.pk)
+            dirty = True
+        elif sync_awarded_date and reg.awarded_date != awarded_date:
+            reg.awarded_date = awarded_date
+            dirty = True
+        # Keep status consistent with certificate_issued_at
+        if reg.status != LearnerRegistration.Status.ISSUED:
+            reg.status = LearnerRegistration.Status.ISSUED
+            dirty = True
+        if dirty or not reg.certificate_number or not reg.learner_number:
+            changed.append(reg)
+    if not changed:
+        return result
+
+    with transaction.atomic():
+        missing = [reg for reg in changed if not reg.certificate_number]
+        for reg, number in zip(missing, LearnerRegistration.allocate_certificate_numbers(len(missing))):
+            reg.certificate_number = number
+        missing = [reg for reg in changed if not reg.learner_number]
+        for reg, number in zip(missing, LearnerRegistration.allocate_learner_numbers(len(missing))):
+            reg.learner_number = number
+        result.updated = LearnerRegistration.objects.bulk_update(changed, ISSUE_FIELDS, batch_size=500)
+    return result
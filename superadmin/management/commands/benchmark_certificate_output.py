@@ -0,0 +1,117 @@
+import time
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from superadmin.certificate_render import build_render_specs
+from superadmin.certificate_vector import RASTER, VECTOR
+from superadmin.models import LearnerRegistration
+from superadmin.views import render_certificate_spec
+
+
+class Command(BaseCommand):
+    help = 'Compare raster and vector certificate output: render time, PDF size and pixel difference'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'registration_ids',
+            nargs='*',
+            type=int,
+            help='Registrations to render (must already have certificate numbers or be issuable)'
+        )
+        parser.add_argument(
+            '--course',
+            type=int,
+            help='Use issued registrations of this course instead of explicit ids'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Maximum registrations to take from --course (default 10)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Renders per registration and mode; the best time is reported (default 3)'
+        )
+        parser.add_argument(
+            '--no-diff',
+            action='store_true',
+            help='Skip the rasterized pixel comparison'
+        )
+
+    def handle(self, *args, **options):
+        regs = LearnerRegistration.objects.all()
+        if options['registration_ids']:
+            regs = regs.filter(id__in=options['registration_ids'])
+        elif options['course']:
+            regs = regs.filter(course_id=options['course'], certificate_number__isnull=False).order_by('id')[:options['limit']]
+        else:
+            raise CommandError('Give registration ids or --course')
+
+        specs = []
+        for reg, spec, error in build_render_specs(regs):
+            if error is not None:
+                self.stdout.write(self.style.WARNING(f'Skipping registration {reg.id}: {error}'))
+            else:
+                specs.append(spec)
+        if not specs:
+            raise CommandError('No renderable registrations')
+
+        repeat = max(1, options['repeat'])
+        totals = {RASTER: [0.0, 0], VECTOR: [0.0, 0]}
+        for spec in specs:
+            results = {}
+            for mode in (RASTER, VECTOR):
+                mode_spec = replace(spec, output=mode)
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    pdf_bytes = render_certificate_spec(mode_spec)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                results[mode] = (best, pdf_bytes)
+                totals[mode][0] += best
+                totals[mode][1] += len(pdf_bytes)
+
+            line = f'reg {spec.registration_id}: ' + ', '.join(
+                f'{mode} {seconds * 1000:.0f} ms / {len(pdf_bytes) / 1024:.0f} KB'
+                for mode, (seconds, pdf_bytes) in results.items()
+            )
+            if not options['no_diff']:
+                diffs = _page_differences(results[RASTER][1], results[VECTOR][1])
+                line += ' | pixel diff per page: ' + ', '.join(f'{d:.1f}' for d in diffs)
+            self.stdout.write(line)
+
+        count = len(specs)
+        for mode, (seconds, size) in totals.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{mode}: {seconds / count * 1000:.0f} ms and {size / count / 1024:.0f} KB per certificate'
+            ))
+
+
+def _page_differences(raster_pdf: bytes, vector_pdf: bytes) -> list:
+    """
+    Mean absolute pixel difference (0-255) per page between the two outputs,
+    rasterized at the renderer's pixel size. Raster pages are stored at 300 dpi,
+    vector pages at the template's point size, hence the different zooms.
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image, ImageChops, ImageStat
+    from superadmin.views import CERTIFICATE_SCALE_FACTOR
+
+    def _pages(pdf_bytes, zoom):
+        with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+            for page in doc:
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                yield Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+    diffs = []
+    for raster_page, vector_page in zip(_pages(raster_pdf, 300 / 72), _pages(vector_pdf, CERTIFICATE_SCALE_FACTOR)):
+        if raster_page.size != vector_page.size:
+            raster_page = raster_page.resize(vector_page.size)
+        diff = ImageChops.difference(raster_page, vector_page).convert('L')
+        diffs.append(ImageStat.Stat(diff).mean[0])
+    return diffs
@@ -0,0 +1,367 @@
+import os
+import resource
+import statistics
+import time
+from dataclasses import replace
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from superadmin.certificate_render import (
+    CertificateRenderSpec, CertificateSectionSpec, CertificateUnitSpec,
+    load_certificate_render_spec, render_certificates,
+)
+from superadmin.certificate_vector import RASTER, VECTOR, open_vector_page, replay_ops
+
+GOLDEN_DIR = os.path.join(settings.BASE_DIR, 'superadmin', 'testdata', 'certificate_golden')
+GOLDEN_DPI = 36
+
+UNIT_TITLES = [
+    'Health and safety legislation',
+    'Risk assessment and control of workplace hazards in occupational settings',
+    'Incident investigation, recording and reporting procedures',
+    'Developing a positive health and safety culture within an organisation through leadership and worker engagement',
+    'Fire safety',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark certificate rendering on synthetic data: seeds courses, businesses and learners into a '
+        'throwaway test database, renders them serially and in parallel, reports latency, throughput, peak RSS, '
+        'output size and a per-phase breakdown, and checks page rasters against golden images'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--courses',
+            default='1x5,5x8,20x10',
+            help='Comma-separated course shapes as SECTIONSxUNITS_PER_SECTION (default 1x5,5x8,20x10)'
+        )
+        parser.add_argument(
+            '--learners',
+            type=int,
+            default=10,
+            help='Learners (certificates) per course (default 10)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Processes for the parallel run (default CERTIFICATE_RENDER_WORKERS, else CPU count)'
+        )
+        parser.add_argument(
+            '--output',
+            choices=[RASTER, VECTOR],
+            default=getattr(settings, 'CERTIFICATE_OUTPUT_MODE', RASTER),
+            help='Certificate output mode to benchmark (default CERTIFICATE_OUTPUT_MODE)'
+        )
+        parser.add_argument(
+            '--skip-parallel',
+            action='store_true',
+            help='Only run the serial benchmark'
+        )
+        parser.add_argument(
+            '--skip-golden',
+            action='store_true',
+            help='Do not compare against golden images'
+        )
+        parser.add_argument(
+            '--update-golden',
+            action='store_true',
+            help='Write the current output as the new golden images instead of comparing'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.0,
+            help='Largest allowed mean absolute pixel difference (0-255) per golden page (default 1.0)'
+        )
+        parser.add_argument(
+            '--golden-dir',
+            default=GOLDEN_DIR,
+            help='Directory holding the golden page images'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            shapes = [tuple(int(n) for n in shape.lower().split('x')) for shape in options['courses'].split(',')]
+        except ValueError:
+            raise CommandError('--courses must look like 1x5,5x8,20x10')
+        for sections, units in shapes:
+            if not (1 <= sections <= 20) or not (1 <= sections * units <= 200):
+                raise CommandError('Courses need 1-20 sections and at most 200 units')
+
+        mode = options['output']
+        golden_failures = []
+        if options['update_golden']:
+            self._write_golden(options['golden_dir'], mode)
+        elif not options['skip_golden']:
+            golden_failures = self._check_golden(options['golden_dir'], mode, options['tolerance'])
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for sections, units in shapes:
+                regs = _seed_course(sections, units, options['learners'], mode)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'\n{sections} section(s) x {units} unit(s), {len(regs)} certificates, {mode}'
+                ))
+                self._benchmark_phases(regs[0])
+                self._benchmark_serial(regs)
+                if not options['skip_parallel']:
+                    self._benchmark_parallel(regs, options['workers'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if golden_failures:
+            raise CommandError('Golden image check failed:\n' + '\n'.join(golden_failures))
+
+    def _benchmark_phases(self, reg):
+        from superadmin import views
+        from superadmin.certificate_cache import template_page_cache
+
+        spec = load_certificate_render_spec(reg.id)
+        vector = spec.output == VECTOR
+        template_path = views._template_pdf_path()
+        plan = views.compile_certificate_layout(spec)
+
+        def _pages():
+            pages = []
+            for planned in plan.pages:
+                if vector:
+                    page = open_vector_page(template_path, planned.template_page, views.CERTIFICATE_SCALE_FACTOR)
+                else:
+                    page = views._open_template_page(planned.template_page)
+                replay_ops(page, planned.ops)
+                pages.append(page)
+            return pages
+
+        def _template_cold():
+            template_page_cache.clear()
+            views._open_template_page(1)
+            views._open_template_page(2)
+
+        pages = _pages()
+        phases = [
+            ('spec load', lambda: load_certificate_render_spec(reg.id)),
+            ('template (cold)', _template_cold),
+            ('template (warm)', lambda: (views._open_template_page(1), views._open_template_page(2))),
+            ('layout plan', lambda: views.compile_certificate_layout(spec)),
+            ('qr code', lambda: views._generate_qr_image(spec.verify_url, views._scale(80))),
+            ('plan replay', _pages),
+            ('pdf encode', lambda: views._encode_certificate_pdf(pages, template_path if vector else None)),
+            ('full render', lambda: views.render_certificate_spec(spec)),
+        ]
+        for name, phase in phases:
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                phase()
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f'  {name:<16} {statistics.median(timings) * 1000:8.1f} ms')
+
+    def _benchmark_serial(self, regs):
+        from superadmin.certificate_layout import certificate_layout_cache
+        from superadmin.views import render_certificate_spec
+
+        certificate_layout_cache.clear()
+        latencies, sizes = [], []
+        start = time.perf_counter()
+        for reg in regs:
+            t0 = time.perf_counter()
+            pdf_bytes = render_certificate_spec(load_certificate_render_spec(reg.id))
+            latencies.append(time.perf_counter() - t0)
+            sizes.append(len(pdf_bytes))
+        wall = time.perf_counter() - start
+
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f'  serial           p50 {_percentile(latencies, 50) * 1000:.0f} ms, '
+            f'p95 {_percentile(latencies, 95) * 1000:.0f} ms, first {latencies[0] * 1000:.0f} ms, '
+            f'{len(regs) / wall:.2f} certs/s, {statistics.mean(sizes) / 1024:.0f} KB avg, peak RSS {peak_rss:.0f} MB'
+        )
+
+    def _benchmark_parallel(self, regs, workers):
+        workers = workers or getattr(settings, 'CERTIFICATE_RENDER_WORKERS', 0) or os.cpu_count() or 1
+        start = time.perf_counter()
+        done = []
+        for result in render_certificates(regs, workers=workers, use_cache=False):
+            if result.error is not None:
+                raise CommandError(f'Registration {result.registration.id} failed: {result.error}')
+            done.append(time.perf_counter() - start)
+        wall = time.perf_counter() - start
+
+        peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        self.stdout.write(
+            f'  parallel x{workers:<3}    {wall:.2f} s wall, {len(done) / wall:.2f} certs/s, '
+            f'p50 completion {_percentile(done, 50):.2f} s, p95 {_percentile(done, 95):.2f} s, '
+            f'worker peak RSS {peak_rss:.0f} MB'
+        )
+
+    def _golden_pages(self, mode):
+        from superadmin.views import render_certificate_spec
+
+        for name, spec in _golden_specs().items():
+            pdf_bytes = render_certificate_spec(replace(spec, output=mode))
+            yield name, _rasterize(pdf_bytes, mode)
+
+    def _write_golden(self, golden_dir, mode):
+        os.makedirs(golden_dir, exist_ok=True)
+        for name, pages in self._golden_pages(mode):
+            for old in os.listdir(golden_dir):
+                if old.startswith(f'{mode}-{name}-p'):
+                    os.remove(os.path.join(golden_dir, old))
+            for number, page in enumerate(pages, 1):
+                page.save(os.path.join(golden_dir, f'{mode}-{name}-p{number}.png'), optimize=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(pages)} golden page(s) for {mode}/{name}'))
+
+    def _check_golden(self, golden_dir, mode, tolerance):
+        from PIL import Image, ImageChops, ImageStat
+
+        failures = []
+        for name, pages in self._golden_pages(mode):
+            expected = sorted(
+                (f for f in os.listdir(golden_dir) if f.startswith(f'{mode}-{name}-p')) if os.path.isdir(golden_dir) else [],
+                key=lambda f: int(f.rsplit('-p', 1)[1].split('.')[0]),
+            )
+            if not expected:
+                failures.append(f'{mode}/{name}: no golden images (run with --update-golden)')
+                continue
+            if len(expected) != len(pages):
+                failures.append(f'{mode}/{name}: {len(pages)} page(s), golden has {len(expected)}')
+                continue
+            for number, (page, filename) in enumerate(zip(pages, expected), 1):
+                with Image.open(os.path.join(golden_dir, filename)) as golden:
+                    golden = golden.convert('L')
+                if golden.size != page.size:
+                    failures.append(f'{mode}/{name} page {number}: size {page.size}, golden {golden.size}')
+                    continue
+                diff = ImageStat.Stat(ImageChops.difference(page, golden)).mean[0]
+                status = self.style.SUCCESS('ok') if diff <= tolerance else self.style.ERROR('FAIL')
+                self.stdout.write(f'golden {mode}/{name} page {number}: mean diff {diff:.2f} {status}')
+                if diff > tolerance:
+                    failures.append(f'{mode}/{name} page {number}: mean diff {diff:.2f} > {tolerance}')
+        return failures
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _rasterize(pdf_bytes, mode):
+    """Grayscale images of every page of a certificate PDF at GOLDEN_DPI of the template."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+    from superadmin.views import CERTIFICATE_SCALE_FACTOR
+
+    zoom = GOLDEN_DPI / 72
+    if mode == RASTER:
+        # Raster pages are the template at CERTIFICATE_SCALE_FACTOR saved as 300 DPI images
+        zoom *= 300 / (72 * CERTIFICATE_SCALE_FACTOR)
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        pages = []
+        for page in doc:
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+            pages.append(Image.frombytes('L', (pix.width, pix.height), pix.samples))
+        return pages
+
+
+def _golden_specs():
+    """Fixed specs (no database) so golden images only change when the drawing does."""
+    def _spec(sections, units_per_section):
+        return CertificateRenderSpec(
+            registration_id=0,
+            learner_name='Alexandra Example-Learner',
+            course_title='LICQual Level 3 Diploma in Occupational Health and Safety Management Systems',
+            course_number='LQ-BENCH-001',
+            business_name='Example Approved Training Centre Ltd',
+            certificate_number='ATC123456',
+            issue_date=date(2025, 1, 15),
+            verify_url='https://example.com/verify/ATC123456/',
+            sections=_sections(sections, units_per_section),
+        )
+
+    return {
+        'short': _spec(1, 4),
+        'long': _spec(20, 3),
+    }
+
+
+def _sections(sections, units_per_section):
+    return tuple(
+        CertificateSectionSpec(
+            order=s,
+            credits=units_per_section * 5,
+            glh_hours=units_per_section * 20,
+            tqt_hours=units_per_section * 50,
+            remarks='Pass',
+            units=tuple(
+                CertificateUnitSpec(
+                    order=u,
+                    unit_ref=f'LQ{s:02d}-{u:02d}',
+                    unit_title=UNIT_TITLES[(s + u) % len(UNIT_TITLES)],
+                    credits=5,
+                    glh_hours=20,
+                )
+                for u in range(1, units_per_section + 1)
+            ),
+        )
+        for s in range(1, sections + 1)
+    )
+
+
+def _seed_course(sections, units_per_section, learners, mode):
+    from users.models import CustomUser
+    from superadmin.models import Business, Course, LearnerRegistration, QualificationSection, QualificationUnit
+
+    label = f'{sections}x{units_per_section}'
+    business = Business.objects.create(
+        name=f'Benchmark Centre {label}',
+        email=f'centre-{label}@example.com',
+        business_name=f'Benchmark Approved Training Centre {label}',
+    )
+    course = Course.objects.create(
+        title='LICQual Level 3 Diploma in Occupational Health and Safety Management Systems',
+        course_number=f'LQ-BENCH-{label}',
+        certificate_output=mode,
+    )
+    for section_spec in _sections(sections, units_per_section):
+        section = QualificationSection.objects.create(
+            course=course,
+            order=section_spec.order,
+            credits=section_spec.credits,
+            glh_hours=section_spec.glh_hours,
+            tqt_hours=section_spec.tqt_hours,
+            remarks=section_spec.remarks,
+        )
+        QualificationUnit.objects.bulk_create([
+            QualificationUnit(
+                section=section,
+                order=unit.order,
+                unit_ref=unit.unit_ref,
+                unit_title=unit.unit_title,
+                credits=unit.credits,
+                glh_hours=unit.glh_hours,
+            )
+            for unit in section_spec.units
+        ])
+
+    regs = []
+    for i in range(learners):
+        learner = CustomUser.objects.create_user(
+            email=f'learner-{label}-{i}@example.com',
+            full_name=f'Benchmark Learner {i} {label}',
+        )
+        regs.append(LearnerRegistration.objects.create(
+            course=course,
+            business=business,
+            learner=learner,
+            awarded_date=timezone.now().date(),
+            certificate_issued_at=timezone.now(),
+        ))
+    return regs
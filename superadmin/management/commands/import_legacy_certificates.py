@@ -8,6 +8,7 @@ from superadmin.models import (
     LearnerRegistration, IsoIssuedCertificate, IsoCertification, 
     Business, Course
 )
+from users.accounts import NewAccount, create_accounts
 from users.models import CustomUser, Role
 from django.utils import timezone
 
@@ -83,6 +84,8 @@ class Command(BaseCommand):
         imported_count = 0
         skipped_count = 0
         errors = []
+        pending = []  # validated rows, imported once their placeholder accounts exist
+        seen_certificates = set()
 
         with open(csv_path, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
@@ -99,7 +102,7 @@ class Command(BaseCommand):
                         continue
 
                     # Check if certificate already exists
-                    if LearnerRegistration.objects.filter(certificate_number=certificate_no).exists():
+                    if certificate_no in seen_certificates or LearnerRegistration.objects.filter(certificate_number=certificate_no).exists():
                         self.stdout.write(f"Row {row_num}: Certificate {certificate_no} already exists, skipping")
                         skipped_count += 1
                         continue
@@ -125,28 +128,44 @@ class Command(BaseCommand):
                         imported_count += 1
                         continue
 
-                    with transaction.atomic():
-                        # Create a placeholder user without email
-                        # Use a unique identifier based on certificate number
-                        placeholder_email = f"legacy_{certificate_no.lower()}@placeholder.local"
-                        
-                        # Check if user already exists
-                        user = CustomUser.objects.filter(email__iexact=placeholder_email).first()
-                        if not user:
-                            user = CustomUser.objects.create_user(
-                                email=placeholder_email,
-                                password='legacy_import',  # Placeholder password
-                                full_name=learner_name,
-                                is_active=True,
-                            )
-                            # Add learner role
-                            user.roles.add(learner_role)
+                    seen_certificates.add(certificate_no)
+                    pending.append((row_num, learner_name, certificate_no, expiry_date))
 
+                except Exception as e:
+                    errors.append(f"Row {row_num}: {str(e)}")
+                    continue
+
+        if pending:
+            # Create a placeholder user without email for each learner
+            # Use a unique identifier based on certificate number
+            placeholder_emails = {
+                certificate_no: f"legacy_{certificate_no.lower()}@placeholder.local"
+                for _, _, certificate_no, _ in pending
+            }
+            users = {
+                user.email.lower(): user
+                for user in CustomUser.objects.filter(email__in=placeholder_emails.values())
+            }
+            # All missing placeholder users in one bulk insert
+            new_accounts = {}
+            for _, learner_name, certificate_no, _ in pending:
+                email = placeholder_emails[certificate_no]
+                if email not in users and email not in new_accounts:
+                    new_accounts[email] = NewAccount(
+                        email=email,
+                        password='legacy_import',  # Placeholder password
+                        full_name=learner_name,
+                    )
+            users.update(create_accounts(new_accounts.values(), roles=[learner_role]))
+
+            for row_num, learner_name, certificate_no, expiry_date in pending:
+                try:
+                    with transaction.atomic():
                         # Create the registration
                         registration = LearnerRegistration.objects.create(
                             course=course,
                             business=business,
-                            learner=user,
+                            learner=users[placeholder_emails[certificate_no]],
                             certificate_number=certificate_no,
                             certificate_issued_at=timezone.now(),
                             certificate_expiry_date=expiry_date,
@@ -155,8 +174,8 @@ class Command(BaseCommand):
                             is_revoked=False,  # You might want to add a legacy flag
                         )
 
-                        imported_count += 1
-                        self.stdout.write(f"Imported: {learner_name} - {certificate_no}")
+                    imported_count += 1
+                    self.stdout.write(f"Imported: {learner_name} - {certificate_no}")
 
                 except Exception as e:
                     errors.append(f"Row {row_num}: {str(e)}")
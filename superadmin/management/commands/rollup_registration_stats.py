@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from superadmin.rollup import rebuild_daily_stats, rolled_up_to, rollup_pending_days
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll up the daily registration statistics used by the dashboards through yesterday '
+        '(also run daily by the rollup_registration_stats Celery task)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Also recompute this many days before today (default 2)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute the whole history'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rows = rebuild_daily_stats()
+            self.stdout.write(f'Rebuilt registration stats: {rows} row(s)')
+            return
+
+        rows = rollup_pending_days(recompute_days=options['days'])
+        self.stdout.write(f'Registration stats rolled up to {rolled_up_to()}: {rows} row(s) written')
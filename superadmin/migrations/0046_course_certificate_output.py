@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0045_certificateissuancejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='certificate_output',
+            field=models.CharField(blank=True, choices=[('', 'Site default'), ('raster', 'Raster (full-page images)'), ('vector', 'Vector (template PDF with text overlay)')], default='', help_text='How certificate PDFs are produced. Leave blank to use the CERTIFICATE_OUTPUT_MODE setting.', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0046_course_certificate_output'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificateissuancejobitem',
+            name='pdf_file',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
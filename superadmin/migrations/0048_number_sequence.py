@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0047_issuance_item_pdf_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('low', models.PositiveIntegerField()),
+                ('high', models.PositiveIntegerField()),
+                ('multiplier', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField()),
+                ('next_index', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_daily_stats(apps, schema_editor):
+    from superadmin.rollup import rebuild_daily_stats
+
+    rebuild_daily_stats(
+        apps.get_model('superadmin', 'LearnerRegistration'),
+        apps.get_model('superadmin', 'RegistrationDailyStats'),
+        None,  # RegistrationRollupState does not exist yet (0052 rebuilds and records it)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0048_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='learnerregistration',
+            name='certificate_issued_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='learnerregistration',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='RegistrationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('registered', models.PositiveIntegerField(default=0)),
+                ('issued', models.PositiveIntegerField(default=0)),
+                ('shared', models.PositiveIntegerField(default=0)),
+                ('revoked', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='superadmin.business')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='superadmin.course')),
+            ],
+            options={
+                'unique_together': {('business', 'course', 'day')},
+            },
+        ),
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
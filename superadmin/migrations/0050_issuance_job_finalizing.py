@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0049_registration_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificateissuancejob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finalizing', 'Finalizing'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+def build_daily_stats(apps, schema_editor):
+    # Nothing scheduled the rollup before: recompute it and record how far it goes
+    from superadmin.rollup import rebuild_daily_stats
+
+    rebuild_daily_stats(
+        apps.get_model('superadmin', 'LearnerRegistration'),
+        apps.get_model('superadmin', 'RegistrationDailyStats'),
+        apps.get_model('superadmin', 'RegistrationRollupState'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0051_registration_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rolled_up_to', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
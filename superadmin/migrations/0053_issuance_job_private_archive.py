@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:29
+
+import users.storage_backends
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0052_registration_rollup_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificateissuancejob',
+            name='archive',
+            field=models.FileField(blank=True, null=True, storage=users.storage_backends.PrivateMediaStorage(), upload_to='certificate_jobs/'),
+        ),
+    ]
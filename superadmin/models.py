@@ -1,10 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import Role  
 from django.conf import settings
 from django.core.validators import FileExtensionValidator, MinValueValidator, RegexValidator
+import math
 import random, string
 from django.db.models import JSONField  
-from users.storage_backends import CertTemplateStorage, CertSampleStorage, IsoTemplateStorage, CertOutputStorage
+from users.storage_backends import CertTemplateStorage, CertSampleStorage, IsoTemplateStorage, CertOutputStorage, PrivateMediaStorage
 from decimal import Decimal
 
 
@@ -74,6 +75,14 @@ class Course(models.Model):  # singular is conventional in Django
     )
 
     certificate_style = models.CharField(max_length=20, choices=STYLE_CHOICES, default="lead", help_text="Select a layout preset. You can fine-tune positions in code presets.")
+
+    CERTIFICATE_OUTPUT_CHOICES = (
+        ("", "Site default"),
+        ("raster", "Raster (full-page images)"),
+        ("vector", "Vector (template PDF with text overlay)"),
+    )
+
+    certificate_output = models.CharField(max_length=10, choices=CERTIFICATE_OUTPUT_CHOICES, blank=True, default="", help_text="How certificate PDFs are produced. Leave blank to use the CERTIFICATE_OUTPUT_MODE setting.")
     course_description = models.TextField(blank=True,help_text="Short paragraph describing the course. Can be printed on certificates.")
     show_course_description_on_certificate = models.BooleanField(default=False,help_text="If enabled, the course_description will be printed on the certificate after the learner name.")
     iascb_course_number = models.CharField(max_length=20,blank=True,db_index=True, validators=[RegexValidator(r"^I-\d{3,6}$", "Use format I-#### (e.g., I-1547).")], help_text="IASCB Course No. (e.g., I-1547).",)
@@ -202,6 +211,70 @@ class QualificationUnit(models.Model):
         return f"{self.unit_ref}: {self.unit_title}"
 
 
+class NumberSequence(models.Model):
+    """
+    Hands out the numbers of [low, high] in a scrambled but collision-free
+    order: the n-th number is low + (multiplier * n + offset) mod size, which
+    is a permutation of the range because multiplier is coprime with size.
+    Only the counter is stored, so reserving a block of numbers is a single
+    locked row update however many are taken at once.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    low = models.PositiveIntegerField()
+    high = models.PositiveIntegerField()
+    multiplier = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField()
+    next_index = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.next_index}/{self.size})"
+
+    @property
+    def size(self) -> int:
+        return self.high - self.low + 1
+
+    def number_at(self, index: int) -> int:
+        return self.low + (self.multiplier * index + self.offset) % self.size
+
+    @classmethod
+    def _new_parameters(cls, size: int) -> dict:
+        rng = random.SystemRandom()
+        while True:
+            multiplier = rng.randrange(size // 3, size)
+            if math.gcd(multiplier, size) == 1:
+                return {"multiplier": multiplier, "offset": rng.randrange(size)}
+
+    @classmethod
+    def reserve(cls, name: str, count: int, *, low: int, high: int, taken=None) -> list:
+        """
+        Reserve the next `count` numbers of sequence `name` (created for
+        [low, high] on first use). `taken(numbers)` returns those already in
+        use elsewhere (e.g. legacy imports); they are skipped, never handed out.
+        Raises ValueError once the range is used up.
+        """
+        if count <= 0:
+            return []
+        with transaction.atomic():
+            try:
+                seq = cls.objects.select_for_update().get(name=name)
+            except cls.DoesNotExist:
+                cls.objects.get_or_create(name=name, defaults={"low": low, "high": high, **cls._new_parameters(high - low + 1)})
+                seq = cls.objects.select_for_update().get(name=name)
+            numbers = []
+            while len(numbers) < count:
+                wanted = count - len(numbers)
+                if seq.next_index + wanted > seq.size:
+                    raise ValueError(f"Number sequence '{name}' is exhausted.")
+                block = [seq.number_at(i) for i in range(seq.next_index, seq.next_index + wanted)]
+                seq.next_index += wanted
+                if taken is not None:
+                    in_use = taken(block)
+                    block = [n for n in block if n not in in_use]
+                numbers.extend(block)
+            seq.save(update_fields=["next_index"])
+        return numbers
+
+
 class LearnerRegistration(models.Model):
     class Status:
         PENDING = "pending"
@@ -214,7 +287,7 @@ class LearnerRegistration(models.Model):
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='registrations')
     business = models.ForeignKey('Business', on_delete=models.CASCADE, related_name='registrations')
     learner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='course_registrations')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
         # Training dates (From / To)
     training_from = models.DateField(blank=True, null=True, db_index=True)
     training_to = models.DateField(blank=True, null=True, db_index=True)
@@ -230,7 +303,7 @@ class LearnerRegistration(models.Model):
         blank=True, null=True
     )
 
-    certificate_issued_at = models.DateTimeField(blank=True, null=True)
+    certificate_issued_at = models.DateTimeField(blank=True, null=True, db_index=True)
     certificate_number = models.CharField(max_length=50, unique=True, blank=True,null=True,db_index=True,help_text="Auto-generated certificate number (e.g., ATC265788) or legacy certificate number.",)
     learner_number = models.CharField(max_length=6, unique=True, blank=True, null=True, db_index=True, help_text="6-digit unique learner number (256001-999999)")
     certificate_shared_at = models.DateTimeField(blank=True, null=True, db_index=True)  
@@ -245,31 +318,39 @@ class LearnerRegistration(models.Model):
 
 
 
+    LEARNER_NUMBER_RANGE = (256001, 999999)
+    CERTIFICATE_NUMBER_RANGE = (265001, 999999)
+    CERTIFICATE_PREFIX = "ATC"
+
+    @classmethod
+    def allocate_learner_numbers(cls, count: int) -> list:
+        """`count` unique, unused 6-digit learner numbers (256001-999999)."""
+        def taken(candidates):
+            return set(
+                int(n) for n in cls.objects.filter(learner_number__in=[str(c) for c in candidates])
+                .values_list("learner_number", flat=True)
+            )
+        low, high = cls.LEARNER_NUMBER_RANGE
+        return [str(n) for n in NumberSequence.reserve("learner_number", count, low=low, high=high, taken=taken)]
+
+    @classmethod
+    def allocate_certificate_numbers(cls, count: int) -> list:
+        """`count` unique, unused certificate numbers in the format ATC + 6 digits (e.g. ATC265788)."""
+        prefix = cls.CERTIFICATE_PREFIX
+
+        def taken(candidates):
+            return set(
+                int(n[len(prefix):]) for n in cls.objects.filter(certificate_number__in=[f"{prefix}{c}" for c in candidates])
+                .values_list("certificate_number", flat=True)
+            )
+        low, high = cls.CERTIFICATE_NUMBER_RANGE
+        return [f"{prefix}{n}" for n in NumberSequence.reserve("certificate_number", count, low=low, high=high, taken=taken)]
+
     def _generate_unique_learner_number(self) -> str:
-        """
-        Generate a unique 6-digit learner number between 256001 and 999999.
-        Retries up to 50 times to avoid collisions.
-        """
-        for _ in range(50):
-            number = str(random.randint(256001, 999999))
-            if not LearnerRegistration.objects.filter(learner_number=number).exists():
-                return number
-        # Extremely unlikely fallback
-        return str(random.randint(256001, 999999))
+        return self.allocate_learner_numbers(1)[0]
 
     def _generate_unique_certificate_number(self) -> str:
-        """
-        Generate a unique certificate number in the format ATC + 6 digits
-        (e.g., ATC265788). Numbers range from 265001 to 999999.
-        Retries up to 50 times to avoid collisions.
-        """
-        for _ in range(50):
-            number = random.randint(265001, 999999)
-            code = f"ATC{number}"
-            if not LearnerRegistration.objects.filter(certificate_number=code).exists():
-                return code
-        # Extremely unlikely fallback
-        return f"ATC{random.randint(265001, 999999)}"
+        return self.allocate_certificate_numbers(1)[0]
 
     def __str__(self):
         return f"{self.learner.email} → {self.course.title}"
@@ -300,6 +381,147 @@ class LearnerRegistration(models.Model):
 
 
 
+class RegistrationDailyStats(models.Model):
+    """
+    Per (business, course, day) counts of LearnerRegistration activity, kept
+    by superadmin/rollup.py so dashboards read a few rows per day instead of
+    counting the whole registration table. Days after
+    RegistrationRollupState.rolled_up_to are counted live.
+    """
+    business = models.ForeignKey('Business', on_delete=models.CASCADE, related_name='daily_stats')
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField(db_index=True)
+    registered = models.PositiveIntegerField(default=0)  # registrations created that day
+    issued = models.PositiveIntegerField(default=0)      # certificates issued that day
+    shared = models.PositiveIntegerField(default=0)      # certificates first shared that day
+    revoked = models.PositiveIntegerField(default=0)     # revoked registrations, by the day they were created
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('business', 'course', 'day')
+
+    def __str__(self):
+        return f"{self.day} business={self.business_id} course={self.course_id}"
+
+
+class RegistrationRollupState(models.Model):
+    """
+    How far RegistrationDailyStats is complete (a single row): every day up
+    to and including rolled_up_to is rolled up; readers count later days live.
+    """
+    rolled_up_to = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Registration stats rolled up to {self.rolled_up_to}"
+
+
+class RegistrationReport(models.Model):
+    """
+    The row-by-row outcome of a partner's last learner upload for a course
+    (superadmin.bulk_registration), kept as CSV for the register_learners
+    report download. Only the latest report per partner and course is kept.
+    """
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='registration_reports')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='registration_reports')
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Registration report #{self.pk} (course {self.course_id})"
+
+
+class CertificateIssuanceJob(models.Model):
+    """
+    A background bulk issuance/download run (see superadmin/tasks.py).
+    One CertificateIssuanceJobItem per registration records its outcome.
+    """
+    class Kind:
+        ISSUE = "issue"
+        ISSUE_AND_DOWNLOAD = "issue_download"
+        DOWNLOAD = "download"
+        CHOICES = (
+            (ISSUE, "Issue"),
+            (ISSUE_AND_DOWNLOAD, "Issue and download"),
+            (DOWNLOAD, "Download"),
+        )
+
+    class Status:
+        PENDING = "pending"
+        RUNNING = "running"
+        FINALIZING = "finalizing"   # all items processed, archive being built
+        COMPLETED = "completed"
+        FAILED = "failed"
+        CHOICES = (
+            (PENDING, "Pending"),
+            (RUNNING, "Running"),
+            (FINALIZING, "Finalizing"),
+            (COMPLETED, "Completed"),
+            (FAILED, "Failed"),
+        )
+
+    kind = models.CharField(max_length=20, choices=Kind.CHOICES)
+    status = models.CharField(max_length=20, choices=Status.CHOICES, default=Status.PENDING, db_index=True)
+    course = models.ForeignKey('Course', on_delete=models.SET_NULL, null=True, blank=True, related_name='issuance_jobs')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='certificate_issuance_jobs')
+    awarded_date = models.DateField(blank=True, null=True)
+    send_emails = models.BooleanField(default=False, help_text="Email newly issued certificates to learners.")
+    build_archive = models.BooleanField(default=False, help_text="Collect the rendered PDFs into a downloadable ZIP.")
+
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    # Private storage: the ZIP holds learner certificates, so it is only served by download_certificate_job_archive
+    archive = models.FileField(upload_to="certificate_jobs/", storage=PrivateMediaStorage(), blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job #{self.pk} ({self.status})"
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.COMPLETED, self.Status.FAILED)
+
+
+class CertificateIssuanceJobItem(models.Model):
+    class Status:
+        PENDING = "pending"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+        CHOICES = (
+            (PENDING, "Pending"),
+            (SUCCEEDED, "Succeeded"),
+            (FAILED, "Failed"),
+        )
+
+    job = models.ForeignKey('CertificateIssuanceJob', on_delete=models.CASCADE, related_name='items')
+    registration = models.ForeignKey('LearnerRegistration', on_delete=models.CASCADE, related_name='issuance_job_items')
+    status = models.CharField(max_length=20, choices=Status.CHOICES, default=Status.PENDING, db_index=True)
+    newly_issued = models.BooleanField(default=False)
+    # Storage name of the PDF rendered for this item (content-addressed, see users.outbox.store_blob);
+    # the archive and the email attachment both reference it
+    pdf_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('job', 'registration')
+
+    def __str__(self):
+        return f"Job #{self.job_id} → registration {self.registration_id} ({self.status})"
+
+
 class IsoCertification(models.Model):
     standard = models.CharField(max_length=120, help_text="e.g., ISO 45001:2018")
     management_system = models.CharField(max_length=120, help_text="e.g., OHS Mgt system")
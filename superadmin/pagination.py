@@ -0,0 +1,78 @@
+"""
+Keyset (seek) pagination.
+
+OFFSET pagination makes the database read and throw away every row before the
+requested page, and listing everything at once grows with the table. A keyset
+page instead continues from the last row shown: WHERE (a, b, id) > (last a,
+last b, last id) ORDER BY a, b, id LIMIT n, which an index on (a, b, id)
+answers by reading just the page, however deep into the list it is.
+
+Cursors are the primary key of the boundary row (?after=<pk> for the next
+page, ?before=<pk> for the previous one); its ordering values are read back
+with one primary-key lookup.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_after: object = None       # cursor for the following page, if any
+    previous_before: object = None  # cursor for the preceding page, if any
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_after is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_before is not None
+
+
+def _seek(fields, values, lookup) -> Q:
+    """(f1, f2, ...) > (v1, v2, ...) spelt out as ORs of equal prefixes."""
+    condition = Q()
+    for i, name in enumerate(fields):
+        step = Q(**{f"{name}__{lookup}": values[name]})
+        for prefix in fields[:i]:
+            step &= Q(**{prefix: values[prefix]})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, fields, *, after=None, before=None, size=50) -> KeysetPage:
+    """
+    One page of `queryset` ordered by `fields` (ascending; the last one must
+    be unique, e.g. "id"), starting after the row `after` or ending before
+    the row `before`. Unknown cursors fall back to the first page.
+    """
+    fields = list(fields)
+    cursor = after if after is not None else before
+    boundary = None
+    if cursor is not None:
+        boundary = queryset.model._default_manager.filter(pk=cursor).values(*fields).first()
+
+    if boundary is None:
+        rows = list(queryset.order_by(*fields)[:size + 1])
+        page = KeysetPage(items=rows[:size])
+        if len(rows) > size:
+            page.next_after = rows[size - 1].pk
+        return page
+
+    if after is not None:
+        rows = list(queryset.filter(_seek(fields, boundary, "gt")).order_by(*fields)[:size + 1])
+        page = KeysetPage(items=rows[:size], previous_before=rows[0].pk if rows else None)
+        if len(rows) > size:
+            page.next_after = rows[size - 1].pk
+        return page
+
+    rows = list(
+        queryset.filter(_seek(fields, boundary, "lt")).order_by(*(f"-{name}" for name in fields))[:size + 1]
+    )
+    if len(rows) <= size:
+        # Reached the start of the list: show a full first page instead of a short one
+        return keyset_page(queryset, fields, size=size)
+    items = rows[:size][::-1]
+    return KeysetPage(items=items, next_after=items[-1].pk, previous_before=items[0].pk)
@@ -0,0 +1,247 @@
+"""
+Daily registration statistics rollup.
+
+The dashboards used to count the whole LearnerRegistration table on every
+load. RegistrationDailyStats keeps per (business, course, day) counts of
+registrations created, certificates issued, certificates shared and revoked
+registrations instead. RegistrationRollupState records the last day the
+rollup is complete for; readers sum the rolled-up days up to it and count
+everything after it live (normally just today, a small indexed range), so
+their cost no longer depends on how much history there is, and a missed
+rollup run makes them slower, never wrong.
+
+Keeping it current:
+- refresh_daily_stats(first_day, last_day) recomputes a range of days from
+  LearnerRegistration with one grouped query per counter;
+- rollup_pending_days() rolls up every day since the last complete one
+  through yesterday and moves the mark; the rollup_registration_stats Celery
+  task runs it daily (beat) and so does the rollup_registration_stats command;
+- signals.py re-rolls the past days touched when a registration is edited
+  (e.g. revoked) or deleted;
+- rebuild_daily_stats() (command --rebuild) recomputes the whole history.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import LearnerRegistration, RegistrationDailyStats, RegistrationRollupState
+from .stats import MonthlySeries, monthly_series
+
+COUNTERS = ("registered", "issued", "shared", "revoked")
+
+# counter -> (date field it is bucketed by, extra condition)
+EVENTS = {
+    "registered": ("created_at", Q()),
+    "issued": ("certificate_issued_at", Q()),
+    "shared": ("certificate_shared_at", Q()),
+    "revoked": ("created_at", Q(is_revoked=True)),
+}
+
+
+def day_start(day):
+    """The first moment of `day` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def event_days(reg) -> dict:
+    """counter -> local day for the events `reg` counts towards."""
+    days = {}
+    for counter, (field, condition) in EVENTS.items():
+        value = getattr(reg, field)
+        if value is None or (counter == "revoked" and not reg.is_revoked):
+            continue
+        days[counter] = timezone.localdate(value)
+    return days
+
+
+def _rollup(registration_model, stats_model, first_day, last_day, *, business_id=None, course_id=None) -> int:
+    start, end = day_start(first_day), day_start(last_day + timedelta(days=1))
+    regs = registration_model.objects.all()
+    stale = stats_model.objects.filter(day__gte=first_day, day__lte=last_day)
+    if business_id is not None:
+        regs, stale = regs.filter(business_id=business_id), stale.filter(business_id=business_id)
+    if course_id is not None:
+        regs, stale = regs.filter(course_id=course_id), stale.filter(course_id=course_id)
+
+    rows = {}
+    for counter, (field, condition) in EVENTS.items():
+        grouped = (
+            regs.filter(condition, **{f"{field}__gte": start, f"{field}__lt": end})
+            .annotate(day=TruncDate(field))
+            .values("business_id", "course_id", "day")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for row in grouped:
+            key = (row["business_id"], row["course_id"], row["day"])
+            rows.setdefault(key, dict.fromkeys(COUNTERS, 0))[counter] = row["n"]
+
+    with transaction.atomic():
+        stale.delete()
+        stats_model.objects.bulk_create(
+            [
+                stats_model(business_id=business_id, course_id=course_id, day=day, **counts)
+                for (business_id, course_id, day), counts in rows.items()
+            ],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def refresh_daily_stats(first_day, last_day=None, *, business_id=None, course_id=None) -> int:
+    """
+    Recompute the rollup for the days first_day..last_day (inclusive),
+    optionally for one business/course only. Returns the number of rows written.
+    """
+    return _rollup(
+        LearnerRegistration, RegistrationDailyStats, first_day, last_day or first_day,
+        business_id=business_id, course_id=course_id,
+    )
+
+
+def rolled_up_to():
+    """The last day RegistrationDailyStats is complete for, or None if none is."""
+    return RegistrationRollupState.objects.values_list("rolled_up_to", flat=True).first()
+
+
+def _mark_rolled_up(state_model, day) -> None:
+    state_model.objects.update_or_create(pk=1, defaults={"rolled_up_to": day})
+
+
+def _rollup_chunked(registration_model, stats_model, first_day, last_day, chunk_days) -> int:
+    written = 0
+    day = first_day
+    while day <= last_day:
+        last = min(day + timedelta(days=chunk_days - 1), last_day)
+        written += _rollup(registration_model, stats_model, day, last)
+        day = last + timedelta(days=1)
+    return written
+
+
+def rebuild_daily_stats(registration_model=LearnerRegistration, stats_model=RegistrationDailyStats,
+                        state_model=RegistrationRollupState, *, chunk_days=31) -> int:
+    """Recompute the whole rollup up to yesterday, a month of history at a time."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    earliest = registration_model.objects.aggregate(first=Min("created_at"))["first"]
+    stats_model.objects.all().delete()
+    written = 0
+    if earliest is not None:
+        written = _rollup_chunked(registration_model, stats_model, timezone.localdate(earliest), yesterday, chunk_days)
+    if state_model is not None:
+        _mark_rolled_up(state_model, yesterday)
+    return written
+
+
+def rollup_pending_days(*, recompute_days: int = 1, chunk_days: int = 31) -> int:
+    """
+    Roll up every day after the last complete one through yesterday, plus
+    the last `recompute_days` days again (to pick up edits that bypassed the
+    signals), then mark yesterday complete. Returns the number of rows written.
+    """
+    done = rolled_up_to()
+    if done is None:
+        return rebuild_daily_stats(chunk_days=chunk_days)
+    yesterday = timezone.localdate() - timedelta(days=1)
+    first_day = min(done + timedelta(days=1), yesterday - timedelta(days=max(recompute_days, 1) - 1))
+    written = _rollup_chunked(LearnerRegistration, RegistrationDailyStats, first_day, yesterday, chunk_days)
+    _mark_rolled_up(RegistrationRollupState, max(done, yesterday))
+    return written
+
+
+def _local_day(value):
+    return timezone.localdate(value) if isinstance(value, datetime) else value
+
+
+def registration_stats(*, business_ids=None, start=None, end=None, group_by=None) -> dict:
+    """
+    Sum of the counters over [start, end) (day-aligned datetimes or dates;
+    either may be None for an open range), optionally for some businesses.
+    With group_by (e.g. "business_id"), a dict of those sums per value.
+    Rolled-up days come from the rollup, later ones are counted live.
+    """
+    done = rolled_up_to()
+    first = _local_day(start) if start is not None else None
+    stop = _local_day(end) if end is not None else None  # exclusive
+
+    results = {}
+
+    def add(key, values):
+        totals = results.setdefault(key, dict.fromkeys(COUNTERS, 0))
+        for counter in COUNTERS:
+            totals[counter] += values.get(counter) or 0
+
+    if done is not None and (first is None or first <= done):
+        rolled = RegistrationDailyStats.objects.filter(day__lte=done)
+        if business_ids is not None:
+            rolled = rolled.filter(business_id__in=business_ids)
+        if first is not None:
+            rolled = rolled.filter(day__gte=first)
+        if stop is not None:
+            rolled = rolled.filter(day__lt=stop)
+        sums = {counter: Sum(counter) for counter in COUNTERS}
+        if group_by:
+            for row in rolled.values(group_by).annotate(**sums).order_by():
+                add(row[group_by], row)
+        else:
+            add(None, rolled.aggregate(**sums))
+
+    live_from = done + timedelta(days=1) if done is not None else None
+    if first is not None and (live_from is None or first > live_from):
+        live_from = first
+    if stop is None or live_from is None or live_from < stop:
+        live = _live_counts(since=live_from, until=stop, business_ids=business_ids, group_by=group_by)
+        for key, values in live.items():
+            add(key, values)
+
+    if group_by:
+        return results
+    return results.get(None, dict.fromkeys(COUNTERS, 0))
+
+
+def _live_counts(*, since=None, until=None, business_ids=None, group_by=None) -> dict:
+    """
+    Counters for the days [since, until) (None: open-ended) straight from
+    LearnerRegistration, keyed like registration_stats.
+    """
+    live = LearnerRegistration.objects.all()
+    if since is not None:
+        start = day_start(since)
+        live = live.filter(Q(created_at__gte=start) | Q(certificate_issued_at__gte=start) | Q(certificate_shared_at__gte=start))
+    if business_ids is not None:
+        live = live.filter(business_id__in=business_ids)
+    counts = {}
+    for counter, (field, condition) in EVENTS.items():
+        if since is not None:
+            window = Q(**{f"{field}__gte": day_start(since)})
+        else:
+            window = Q(**{f"{field}__isnull": False})
+        if until is not None:
+            window &= Q(**{f"{field}__lt": day_start(until)})
+        counts[counter] = Count("id", filter=condition & window)
+    if group_by:
+        return {row[group_by]: row for row in live.values(group_by).annotate(**counts).order_by()}
+    return {None: live.aggregate(**counts)}
+
+
+def monthly_stats(counter: str, *, business_ids=None, months: int = 12) -> MonthlySeries:
+    """monthly_series of one counter: the rollup, plus the days after it counted live."""
+    done = rolled_up_to()
+    rolled = None
+    if done is not None:
+        rolled = RegistrationDailyStats.objects.filter(day__lte=done)
+        if business_ids is not None:
+            rolled = rolled.filter(business_id__in=business_ids)
+    series = monthly_series(rolled, "day", months=months, aggregate=Sum(counter))
+
+    field, condition = EVENTS[counter]
+    live = LearnerRegistration.objects.filter(condition)
+    if done is not None:
+        live = live.filter(**{f"{field}__gte": day_start(done + timedelta(days=1))})
+    if business_ids is not None:
+        live = live.filter(business_id__in=business_ids)
+    live_series = monthly_series(live, field, months=months)
+    series.values = [rolled_value + live_value for rolled_value, live_value in zip(series.values, live_series.values)]
+    return series
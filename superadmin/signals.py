@@ -0,0 +1,105 @@
+# superadmin/signals.py
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from superadmin.certificate_layout import certificate_layout_cache
+from superadmin.models import Business, Course, LearnerRegistration, QualificationSection, QualificationUnit
+from superadmin.rollup import event_days, refresh_daily_stats, rolled_up_to
+
+
+@receiver([post_save, post_delete], sender=Course)
+def _drop_layout_plans_for_course(sender, instance: Course, **kwargs):
+    certificate_layout_cache.invalidate(course_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=QualificationSection)
+def _drop_layout_plans_for_section(sender, instance: QualificationSection, **kwargs):
+    certificate_layout_cache.invalidate(course_id=instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=QualificationUnit)
+def _drop_layout_plans_for_unit(sender, instance: QualificationUnit, **kwargs):
+    try:
+        course_id = instance.section.course_id
+    except QualificationSection.DoesNotExist:
+        # Cascade delete of the section; its own signal covers the course
+        return
+    certificate_layout_cache.invalidate(course_id=course_id)
+
+
+@receiver([post_save, post_delete], sender=Business)
+def _drop_layout_plans_for_business(sender, instance: Business, **kwargs):
+    certificate_layout_cache.invalidate(business_id=instance.pk)
+
+
+_ROLLUP_FIELDS = ("created_at", "certificate_issued_at", "certificate_shared_at", "is_revoked")
+_ROLLUP_KEYS = ("business_id", "course_id")
+
+
+def _rollup_untouched(update_fields) -> bool:
+    """A save limited to fields the rollup does not count (e.g. a status or file change)."""
+    if update_fields is None:
+        return False
+    tracked = {*_ROLLUP_FIELDS, *_ROLLUP_KEYS, "business", "course"}
+    return not tracked & set(update_fields)
+
+
+@receiver(pre_save, sender=LearnerRegistration)
+def _remember_rollup_days(sender, instance: LearnerRegistration, update_fields=None, **kwargs):
+    # The stored row's rollup fields, to compare after the save; read back only
+    # for updates that can change what the registration counts towards
+    instance._rollup_before = None
+    if instance._state.adding or instance.pk is None or _rollup_untouched(update_fields):
+        return
+    instance._rollup_before = (
+        sender._default_manager.filter(pk=instance.pk).values(*_ROLLUP_KEYS, *_ROLLUP_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=LearnerRegistration)
+def _refresh_rollup_on_save(sender, instance: LearnerRegistration, created, update_fields=None, **kwargs):
+    before = instance.__dict__.pop("_rollup_before", None)
+    if created or _rollup_untouched(update_fields):
+        return  # new rows are counted live until rollup_pending_days rolls their day up
+    after = event_days(instance)
+    if before is None:
+        _refresh_rollup_days(instance.business_id, instance.course_id, set(after.values()))
+        return
+    before_days = event_days(SimpleNamespace(**before))
+    if (before["business_id"], before["course_id"]) != (instance.business_id, instance.course_id):
+        # Moved to another business or course: both rollup rows change
+        _refresh_rollup_days(before["business_id"], before["course_id"], set(before_days.values()))
+        _refresh_rollup_days(instance.business_id, instance.course_id, set(after.values()))
+        return
+    days = {
+        day
+        for counter in before_days.keys() | after.keys()
+        if before_days.get(counter) != after.get(counter)
+        for day in (before_days.get(counter), after.get(counter))
+        if day is not None
+    }
+    _refresh_rollup_days(instance.business_id, instance.course_id, days)
+
+
+@receiver(post_delete, sender=LearnerRegistration)
+def _refresh_rollup_on_delete(sender, instance: LearnerRegistration, **kwargs):
+    _refresh_rollup_days(instance.business_id, instance.course_id, set(event_days(instance).values()))
+
+
+def _refresh_rollup_days(business_id, course_id, days):
+    # Later days are counted live; only days already rolled up need recomputing
+    if not days:
+        return
+    done = rolled_up_to()
+    days = {day for day in days if done is not None and day <= done}
+    if not days:
+        return
+
+    def refresh():
+        for day in sorted(days):
+            refresh_daily_stats(day, business_id=business_id, course_id=course_id)
+
+    transaction.on_commit(refresh)
@@ -0,0 +1,67 @@
+"""
+Dashboard statistics helpers.
+
+monthly_series() returns a per-month count series (e.g. registrations over
+the last 12 months) from a single TruncMonth + Count grouped query, with
+empty months filled in as zero, so dashboards no longer run one count per
+month.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+@dataclass
+class MonthlySeries:
+    months: list    # aware datetimes: the first moment of each month, oldest first
+    values: list
+
+    @property
+    def labels(self) -> list:
+        return [month.strftime('%b %Y') for month in self.months]
+
+
+def month_starts(count: int = 12, now=None) -> list:
+    """
+    The starts of the last `count` months, oldest first, ending with the
+    current month (e.g. on 15 Dec 2024 with count=12: Jan 2024 ... Dec 2024).
+    """
+    now = timezone.localtime(now or timezone.now())
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(count):
+        starts.append(timezone.make_aware(datetime(year, month, 1)))
+        month -= 1
+        if month == 0:
+            month, year = 12, year - 1
+    return starts[::-1]
+
+
+def monthly_series(queryset, date_field: str, *, months: int = 12, now=None, aggregate=None) -> MonthlySeries:
+    """
+    Count the rows of `queryset` per month of `date_field` over the last
+    `months` months (up to now), in one grouped query. `aggregate` replaces
+    the default Count("pk") (e.g. Sum("fee")).
+    """
+    now = now or timezone.now()
+    starts = month_starts(months, now)
+    if queryset is None:
+        return MonthlySeries(months=starts, values=[0] * len(starts))
+    rows = (
+        queryset
+        .filter(**{f"{date_field}__gte": starts[0], f"{date_field}__lte": now})
+        .annotate(month=TruncMonth(date_field))
+        .values("month")
+        .annotate(value=aggregate if aggregate is not None else Count("pk"))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        month = row["month"]
+        # DateField truncation gives dates, DateTimeField gives aware datetimes
+        key = (month.year, month.month)
+        totals[key] = totals.get(key, 0) + (row["value"] or 0)
+    return MonthlySeries(months=starts, values=[totals.get((start.year, start.month), 0) for start in starts])
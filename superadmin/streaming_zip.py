@@ -0,0 +1,63 @@
+"""
+Streaming ZIP Writer
+Builds a ZIP archive incrementally so it can be sent with StreamingHttpResponse
+without holding the whole archive (or every member) in memory.
+"""
+
+import io
+import zipfile
+
+
+class _ZipChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable file object that buffers what zipfile writes until
+    drained. zipfile falls back to data descriptors for non-seekable output, so
+    nothing is ever rewritten and chunks can be sent as soon as they exist.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries, compression=zipfile.ZIP_STORED):
+    """
+    Yield the bytes of a ZIP archive containing (name, data) entries, one chunk
+    per entry as it is added, then the central directory.
+
+    Args:
+        entries: Iterable of (archive name, bytes); consumed lazily
+        compression: zipfile compression method. Defaults to ZIP_STORED since
+                     certificate PDFs are already compressed.
+    """
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=compression) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
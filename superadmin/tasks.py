@@ -0,0 +1,286 @@
+# superadmin/tasks.py
+"""
+Background certificate issuance.
+
+A CertificateIssuanceJob first issues all of its registrations in one batch
+(superadmin.issuance.issue_certificates), then fans out one
+issue_certificate_job_item task per registration; each item renders (and, for
+new issues, emails) its certificate and records success/failure. The item that completes the job triggers
+finalize_certificate_issuance_job, which packs the rendered PDFs into the
+job's ZIP archive when one was requested.
+
+Each item renders its PDF exactly once. When the job needs the bytes again
+(the archive, the email attachment) the item stores them once in
+content-addressed storage (users.outbox.store_blob) and every consumer
+references that file: the archive reads it back, and the queued email's
+attachment points at the same blob instead of holding its own copy. The
+stored PDFs are deleted when the job finishes, unless an unsent email still
+attaches them.
+
+rollup_registration_stats, run daily by Celery beat, keeps the dashboard
+statistics rollup current (superadmin.rollup).
+"""
+import logging
+import tempfile
+import zipfile
+
+from celery import shared_task
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from users.outbox import blob_storage
+
+from .issuance import issue_certificates
+from .models import CertificateIssuanceJob, CertificateIssuanceJobItem, LearnerRegistration
+
+logger = logging.getLogger(__name__)
+
+
+def start_certificate_issuance_job(*, kind, registrations, user=None, course=None, awarded_date=None,
+                                   send_emails=False, build_archive=False, newly_issued=()) -> CertificateIssuanceJob:
+    """
+    Create a job with one item per registration and queue it once the
+    surrounding transaction commits. Returns the (pending) job.
+
+    newly_issued: ids of registrations the caller has just issued itself, so
+    that a DOWNLOAD job with send_emails still emails their certificates.
+    """
+    registrations = list(registrations)
+    with transaction.atomic():
+        job = CertificateIssuanceJob.objects.create(
+            kind=kind,
+            course=course,
+            created_by=user if user is not None and user.is_authenticated else None,
+            awarded_date=awarded_date,
+            send_emails=send_emails,
+            build_archive=build_archive,
+            total=len(registrations),
+        )
+        CertificateIssuanceJobItem.objects.bulk_create([
+            CertificateIssuanceJobItem(job=job, registration=reg, newly_issued=reg.pk in newly_issued)
+            for reg in registrations
+        ])
+        transaction.on_commit(lambda: run_certificate_issuance_job.delay(job.pk))
+    return job
+
+
+@shared_task
+def run_certificate_issuance_job(job_id: int) -> None:
+    """Mark the job running and dispatch one task per pending item."""
+    job = CertificateIssuanceJob.objects.get(pk=job_id)
+    if job.is_finished or job.status == CertificateIssuanceJob.Status.FINALIZING:
+        return
+    job.status = CertificateIssuanceJob.Status.RUNNING
+    job.started_at = job.started_at or timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    items = list(job.items.filter(status=CertificateIssuanceJobItem.Status.PENDING).select_related("registration"))
+    if items and job.kind in (CertificateIssuanceJob.Kind.ISSUE, CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD):
+        _issue_job_registrations(job, items)
+    item_ids = [item.id for item in items]
+    if not item_ids:
+        _record_job_progress(job_id)
+        return
+    for item_id in item_ids:
+        issue_certificate_job_item.delay(item_id)
+
+
+def _issue_job_registrations(job, items) -> None:
+    """
+    Issue all of the job's registrations in one batch up front; the item tasks
+    then only render (and email). If the batch fails, each item issues its own
+    registration as before.
+    """
+    try:
+        result = issue_certificates(
+            [item.registration for item in items],
+            awarded_date=job.awarded_date,
+            sync_awarded_date=job.kind == CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD,
+        )
+    except Exception as e:
+        logger.warning(f"Issuance job {job.pk}: batch issue failed, issuing per item: {e}")
+        return
+    newly_issued = [item for item in items if result.is_new(item.registration)]
+    for item in newly_issued:
+        item.newly_issued = True
+    CertificateIssuanceJobItem.objects.bulk_update(newly_issued, ["newly_issued"], batch_size=500)
+
+
+@shared_task
+def issue_certificate_job_item(item_id: int) -> None:
+    """Issue (if the job asks for it) and render one registration's certificate."""
+    from users.outbox import store_blob
+    from .views import generate_certificate_pdf, send_certificate_issued_email
+
+    item = (
+        CertificateIssuanceJobItem.objects
+        .select_related("job", "registration__learner", "registration__course", "registration__business")
+        .get(pk=item_id)
+    )
+    if item.status != CertificateIssuanceJobItem.Status.PENDING:
+        return
+    job = item.job
+    reg = item.registration
+
+    try:
+        if job.kind in (CertificateIssuanceJob.Kind.ISSUE, CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD):
+            awarded_date = job.awarded_date or timezone.now().date()
+            if not reg.certificate_issued_at:
+                reg.certificate_issued_at = timezone.now()
+                reg.awarded_date = awarded_date
+                reg.status = LearnerRegistration.Status.ISSUED
+                reg.save()
+                item.newly_issued = True
+            elif job.kind == CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD and reg.awarded_date != awarded_date:
+                # Already issued - keep the date shown on the certificate in line with this run
+                reg.awarded_date = awarded_date
+                reg.save()
+        elif not reg.certificate_issued_at:
+            raise ValueError("Certificate has not been issued yet.")
+
+        pdf_bytes = generate_certificate_pdf(reg)
+        if not pdf_bytes:
+            raise ValueError("Generated PDF is empty.")
+
+        send_email = item.newly_issued and job.send_emails
+        if job.build_archive or send_email:
+            item.pdf_file, _ = store_blob(pdf_bytes)
+
+        if send_email:
+            try:
+                send_certificate_issued_email(
+                    user=reg.learner,
+                    course=reg.course,
+                    business=reg.business,
+                    certificate_pdf_bytes=pdf_bytes,
+                )
+            except Exception as e:
+                # The certificate is issued; a failed email is not a failed item
+                logger.warning(f"Issuance job {job.pk}: certificate issued but email failed for {reg.learner.email}: {e}")
+                item.error = f"Email failed: {e}"[:1000]
+
+        item.status = CertificateIssuanceJobItem.Status.SUCCEEDED
+    except Exception as e:
+        logger.warning(f"Issuance job {job.pk}: registration {reg.pk} failed: {e}")
+        item.status = CertificateIssuanceJobItem.Status.FAILED
+        item.error = str(e)[:1000]
+
+    item.finished_at = timezone.now()
+    item.save(update_fields=["status", "newly_issued", "pdf_file", "error", "finished_at"])
+    _record_job_progress(job.pk)
+
+
+def _record_job_progress(job_id: int) -> None:
+    """
+    Refresh the job counters. The item that completes the job moves it to
+    FINALIZING and queues finalization; since that transition happens under
+    the row lock, retried or racing items that finish later cannot queue it again.
+    """
+    with transaction.atomic():
+        job = CertificateIssuanceJob.objects.select_for_update().get(pk=job_id)
+        counts = job.items.aggregate(
+            succeeded=Count("id", filter=Q(status=CertificateIssuanceJobItem.Status.SUCCEEDED)),
+            failed=Count("id", filter=Q(status=CertificateIssuanceJobItem.Status.FAILED)),
+        )
+        job.succeeded = counts["succeeded"]
+        job.failed = counts["failed"]
+        update_fields = ["succeeded", "failed"]
+        done = job.status == CertificateIssuanceJob.Status.RUNNING and job.processed >= job.total
+        if done:
+            job.status = CertificateIssuanceJob.Status.FINALIZING
+            update_fields.append("status")
+        job.save(update_fields=update_fields)
+        if done:
+            transaction.on_commit(lambda: finalize_certificate_issuance_job.delay(job_id))
+
+
+@shared_task
+def finalize_certificate_issuance_job(job_id: int) -> None:
+    """Build the ZIP archive (if requested) and mark the job finished."""
+    from .views import _certificate_zip_filename, generate_certificate_pdf
+
+    job = CertificateIssuanceJob.objects.get(pk=job_id)
+    if job.status != CertificateIssuanceJob.Status.FINALIZING:
+        return
+
+    try:
+        if job.build_archive and job.succeeded:
+            items = (
+                job.items
+                .filter(status=CertificateIssuanceJobItem.Status.SUCCEEDED)
+                .select_related("registration__learner", "registration__course", "registration__business")
+                .order_by("id")
+            )
+            with tempfile.TemporaryFile() as tmp:
+                # PDFs are already compressed
+                with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+                    for item in items:
+                        reg = item.registration
+                        zf.writestr(_certificate_zip_filename(reg), _item_pdf_bytes(item, generate_certificate_pdf))
+                tmp.seek(0)
+                ts = timezone.now().strftime("%Y%m%d_%H%M%S")
+                job.archive.save(f"certificates_job{job.pk}_{ts}.zip", File(tmp), save=False)
+        job.status = CertificateIssuanceJob.Status.COMPLETED if job.succeeded or not job.total else CertificateIssuanceJob.Status.FAILED
+    except Exception as e:
+        logger.error(f"Issuance job {job.pk}: finalization failed: {e}", exc_info=True)
+        job.status = CertificateIssuanceJob.Status.FAILED
+        job.error = str(e)[:1000]
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["archive", "status", "error", "finished_at"])
+    _release_item_pdfs(job)
+
+
+def _release_item_pdfs(job) -> None:
+    """
+    Delete the PDFs the job's items stored once the job is finished, except
+    those an unsent email still attaches (the same content-addressed file) or
+    another unfinished job still needs; the email outbox purge
+    (users.outbox.purge_outbox) removes those once nothing references them.
+    """
+    from users.models import OutboxAttachment, OutboxEmail
+
+    items = list(job.items.exclude(pdf_file=""))
+    if not items:
+        return
+    names = {item.pdf_file for item in items}
+    in_use = set(
+        OutboxAttachment.objects
+        .filter(file__in=names, email__status__in=[OutboxEmail.Status.PENDING, OutboxEmail.Status.SENDING])
+        .values_list("file", flat=True)
+    )
+    in_use.update(
+        CertificateIssuanceJobItem.objects
+        .filter(pdf_file__in=names)
+        .exclude(job=job)
+        .exclude(job__status__in=[CertificateIssuanceJob.Status.COMPLETED, CertificateIssuanceJob.Status.FAILED])
+        .values_list("pdf_file", flat=True)
+    )
+    for name in names - in_use:
+        try:
+            blob_storage.delete(name)
+        except OSError as e:
+            logger.warning(f"Issuance job {job.pk}: could not delete stored PDF {name}: {e}")
+    job.items.filter(pk__in=[item.pk for item in items]).update(pdf_file="")
+
+
+
+def _item_pdf_bytes(item, generate_certificate_pdf) -> bytes:
+    """The PDF stored for a job item; rendered again only if the stored file is gone."""
+    if item.pdf_file:
+        try:
+            with blob_storage.open(item.pdf_file, "rb") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"Issuance job {item.job_id}: stored PDF {item.pdf_file} unreadable, rendering again: {e}")
+    return generate_certificate_pdf(item.registration)
+
+
+@shared_task(ignore_result=True)
+def rollup_registration_stats() -> int:
+    """Roll the dashboard registration stats up through yesterday (run daily by Celery beat)."""
+    from .rollup import rollup_pending_days
+
+    return rollup_pending_days(recompute_days=2)
@@ -1,3 +1,686 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
 
-# Create your tests here.
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main.celery import app as celery_app
+from pricing.models import CoursePricing
+from users.models import CustomUser, OutboxEmail, Role
+from users.outbox import enqueue_email
+
+from .bulk_registration import REPORT_FIELDS, LearnerRow, parse_learner_rows, register_learners_bulk
+from .certificate_render import RenderedCertificate, load_certificate_render_spec, render_certificates
+from .certificate_vector import VectorPage, page_draw, write_vector_pdf
+from .issuance import issue_certificates
+from .rollup import monthly_stats, rebuild_daily_stats, registration_stats, rolled_up_to
+from .stats import month_starts, monthly_series
+from .models import (
+    Business, BusinessCourseDiscount, BusinessDiscount, CertificateIssuanceJob, CertificateIssuanceJobItem, Course, LearnerRegistration, NumberSequence, QualificationSection, QualificationUnit,
+    RegistrationDailyStats, RegistrationReport,
+)
+from .tasks import _record_job_progress, rollup_registration_stats, start_certificate_issuance_job
+from .views import _load_ictqual_font, generate_certificate_pdf
+
+
+class CertificateIssuanceJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        # Run the whole job in-process against the in-memory broker (no Redis)
+        previous = {key: celery_app.conf[key] for key in ("task_always_eager", "broker_url")}
+        celery_app.conf.update(task_always_eager=True, broker_url="memory://")
+        self.addCleanup(celery_app.conf.update, previous)
+
+        self.business = Business.objects.create(name="Acme", email="partner@example.com", business_name="Acme Training")
+        self.course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        self.regs = [
+            LearnerRegistration.objects.create(
+                course=self.course,
+                business=self.business,
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com", full_name=f"Learner {i}"),
+            )
+            for i in range(3)
+        ]
+
+    def test_eager_issue_and_download_job(self):
+        def queue_first_email(*, user, course, business, certificate_pdf_bytes):
+            # Only the first learner's email is still waiting in the outbox when the job finishes
+            if user == self.regs[0].learner:
+                message = EmailMessage("Certificate", "Attached", to=[user.email])
+                message.attach("Certificate.pdf", certificate_pdf_bytes, "application/pdf")
+                enqueue_email(message)
+
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch("superadmin.views.generate_certificate_pdf", side_effect=lambda reg: f"%PDF-1.4 {reg.pk}".encode()) as render, \
+                mock.patch("superadmin.views.send_certificate_issued_email", side_effect=queue_first_email) as send_email, \
+                mock.patch("users.outbox._kick_drain"), \
+                self.captureOnCommitCallbacks(execute=True):
+            job = start_certificate_issuance_job(
+                kind=CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD,
+                registrations=self.regs,
+                course=self.course,
+                send_emails=True,
+                build_archive=True,
+            )
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, CertificateIssuanceJob.Status.COMPLETED)
+        self.assertEqual((job.total, job.succeeded, job.failed), (3, 3, 0))
+        self.assertEqual(send_email.call_count, 3)
+        # One render per certificate, shared by the email and the archive
+        self.assertEqual(render.call_count, 3)
+        # The stored PDFs go with the job, except the one the unsent email attaches
+        self.assertEqual(set(job.items.values_list("pdf_file", flat=True)), {""})
+        outbox_dir = os.path.join(self.media_root, "email_outbox")
+        stored = {name for prefix in os.listdir(outbox_dir) for name in os.listdir(os.path.join(outbox_dir, prefix))}
+        self.assertEqual(stored, {OutboxEmail.objects.get().attachments.get().sha256})
+        for reg in self.regs:
+            reg.refresh_from_db()
+            self.assertIsNotNone(reg.certificate_issued_at)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with job.archive.open("rb") as f:
+                names = zipfile.ZipFile(io.BytesIO(f.read())).namelist()
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(name.endswith(".pdf") for name in names))
+
+    def test_failed_items_are_recorded(self):
+        with mock.patch("superadmin.views.generate_certificate_pdf", side_effect=RuntimeError("template missing")), \
+                self.captureOnCommitCallbacks(execute=True):
+            job = start_certificate_issuance_job(
+                kind=CertificateIssuanceJob.Kind.ISSUE,
+                registrations=self.regs,
+                course=self.course,
+            )
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, CertificateIssuanceJob.Status.FAILED)
+        self.assertEqual((job.succeeded, job.failed), (0, 3))
+        self.assertEqual(set(job.items.values_list("error", flat=True)), {"template missing"})
+
+    def test_bulk_download_queues_notifications_before_streaming(self):
+        admin = CustomUser.objects.create_superuser(email="admin@example.com", password="pw-12345")
+        self.client.force_login(admin)
+        rendered = lambda regs: (RenderedCertificate(reg, pdf_bytes=b"%PDF-1.4 test") for reg in regs)
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch("superadmin.views.render_certificates", side_effect=rendered), \
+                mock.patch("superadmin.views.generate_certificate_pdf", return_value=b"%PDF-1.4 test"), \
+                mock.patch("superadmin.views.send_certificate_issued_email") as send_email:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("superadmin:bulk_issue_download"), {"reg_ids": [reg.pk for reg in self.regs[:2]]},
+                )
+            # Emailed although the client has not read (and may never read) the ZIP
+            self.assertEqual(send_email.call_count, 2)
+            self.assertEqual(len(zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))).namelist()), 2)
+        self.assertEqual(send_email.call_count, 2)
+        self.assertEqual(LearnerRegistration.objects.filter(certificate_issued_at__isnull=False).count(), 2)
+
+    def test_finalization_is_queued_once(self):
+        job = CertificateIssuanceJob.objects.create(
+            kind=CertificateIssuanceJob.Kind.DOWNLOAD, status=CertificateIssuanceJob.Status.RUNNING, total=1,
+        )
+        CertificateIssuanceJobItem.objects.create(
+            job=job, registration=self.regs[0], status=CertificateIssuanceJobItem.Status.SUCCEEDED,
+        )
+        with mock.patch("superadmin.tasks.finalize_certificate_issuance_job.delay") as finalize, \
+                self.captureOnCommitCallbacks(execute=True):
+            # e.g. a retried item reporting in after the job is already complete
+            _record_job_progress(job.pk)
+            _record_job_progress(job.pk)
+        finalize.assert_called_once_with(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, CertificateIssuanceJob.Status.FINALIZING)
+
+
+class CertificateRenderQueryTests(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="Acme", email="partner@example.com", business_name="Acme Training")
+        self.learner = CustomUser.objects.create_user(email="learner@example.com", full_name="Learner One")
+
+    def _registration(self, sections, units_per_section):
+        course = Course.objects.create(title=f"Diploma {sections}x{units_per_section}", course_number="LQ-1")
+        for s in range(1, sections + 1):
+            section = QualificationSection.objects.create(course=course, order=s, credits=10, glh_hours=20)
+            for u in range(1, units_per_section + 1):
+                QualificationUnit.objects.create(section=section, order=u, unit_ref=f"U{s}{u}", unit_title=f"Unit {s}.{u}")
+        reg = LearnerRegistration.objects.create(
+            course=course, business=self.business, learner=self.learner, certificate_issued_at=timezone.now(),
+        )
+        return reg.pk
+
+    def test_loader_query_count_is_independent_of_course_size(self):
+        for sections, units in ((1, 1), (4, 6)):
+            reg_id = self._registration(sections, units)
+            # registration (with course, business, learner) + sections + units
+            with self.assertNumQueries(3):
+                spec = load_certificate_render_spec(reg_id)
+            self.assertEqual(len(spec.sections), sections)
+            self.assertEqual([unit.order for unit in spec.sections[-1].units], list(range(1, units + 1)))
+
+        with self.assertRaises(AttributeError):
+            spec.learner_name = "Someone else"
+
+    def test_render_path_query_count_is_independent_of_course_size(self):
+        for sections, units in ((1, 1), (4, 6)):
+            reg = LearnerRegistration.objects.get(pk=self._registration(sections, units))
+            with mock.patch("superadmin.views.render_certificate_spec", return_value=b"%PDF-1.4 test"), \
+                    mock.patch("superadmin.certificate_cache.rendered_certificate_cache") as cache:
+                cache.get.return_value = None
+                # course + business + learner + sections + units
+                with self.assertNumQueries(5):
+                    self.assertEqual(generate_certificate_pdf(reg), b"%PDF-1.4 test")
+
+    def test_small_batches_render_in_process_and_large_ones_share_one_pool(self):
+        reg = LearnerRegistration.objects.get(pk=self._registration(1, 1))
+        regs = [reg] + [
+            LearnerRegistration.objects.create(
+                course=reg.course, business=self.business, certificate_issued_at=timezone.now(),
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com"),
+            )
+            for i in range(3)
+        ]
+        pools = []
+
+        def thread_pool(max_workers, mp_context, initializer):
+            # Threads instead of spawned processes, so the render mock applies
+            pools.append(ThreadPoolExecutor(max_workers))
+            return pools[-1]
+
+        with mock.patch("superadmin.views.render_certificate_spec", return_value=b"%PDF-1.4 test"), \
+                mock.patch("superadmin.certificate_render.ProcessPoolExecutor", side_effect=thread_pool), \
+                mock.patch.dict("superadmin.certificate_render._pools", clear=True), \
+                override_settings(CERTIFICATE_RENDER_WORKERS=2, CERTIFICATE_RENDER_PARALLEL_MIN=4):
+            results = list(render_certificates(regs[:3], use_cache=False))
+            self.assertEqual(pools, [])
+            for _ in range(2):
+                results = list(render_certificates(regs, use_cache=False))
+                self.assertEqual(sorted(r.registration.pk for r in results if r.pdf_bytes), sorted(r.pk for r in regs))
+        self.assertEqual(len(pools), 1)
+        pools[0].shutdown()
+
+    def test_a_broken_pool_fails_its_renders_and_finishes_the_rest_in_process(self):
+        reg = LearnerRegistration.objects.get(pk=self._registration(1, 1))
+        regs = [reg] + [
+            LearnerRegistration.objects.create(
+                course=reg.course, business=self.business, certificate_issued_at=timezone.now(),
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com"),
+            )
+            for i in range(5)
+        ]
+
+        class DeadPool:
+            # A worker died: everything in flight fails and the pool refuses new work
+            def __init__(self, *args, **kwargs):
+                self.submitted = 0
+
+            def submit(self, fn, *args):
+                self.submitted += 1
+                if self.submitted > 4:
+                    raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+                future = Future()
+                future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+                return future
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                pass
+
+        with mock.patch("superadmin.views.render_certificate_spec", return_value=b"%PDF-1.4 test"), \
+                mock.patch("superadmin.certificate_render.ProcessPoolExecutor", DeadPool), \
+                mock.patch.dict("superadmin.certificate_render._pools", clear=True) as pools:
+            results = list(render_certificates(regs, workers=2, use_cache=False))
+            self.assertEqual(pools, {})
+
+        self.assertEqual(sorted(r.registration.pk for r in results), sorted(r.pk for r in regs))
+        self.assertEqual(sum(isinstance(r.error, BrokenProcessPool) for r in results), 4)
+        self.assertEqual(sum(r.pdf_bytes == b"%PDF-1.4 test" for r in results), 2)
+
+
+class VectorCertificateOutputTests(TestCase):
+    def test_fonts_without_a_file_fall_back_to_a_builtin_pdf_font(self):
+        import fitz  # PyMuPDF
+        from PIL import ImageFont
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        template = os.path.join(tmp, "template.pdf")
+        doc = fitz.open()
+        doc.new_page(width=300, height=200)
+        doc.save(template)
+        doc.close()
+
+        page = VectorPage(0, (600, 400))
+        draw = page_draw(page)
+        # What the font registry returns when the font file is missing
+        draw.text((20, 20), "Learner One", font=_load_ictqual_font("static/fonts/missing.ttf", 24), fill="black")
+        draw.text((20, 80), "Unit 1.1", font=ImageFont.load_default_imagefont(), fill="black")
+        draw.text((20, 140), "Level 3", font=_load_ictqual_font("static/fonts/Montserrat-Regular.ttf", 24), fill="black")
+
+        pdf = fitz.open(stream=write_vector_pdf([page], template, scale=2.0), filetype="pdf")
+        text = pdf[0].get_text()
+        for expected in ("Learner One", "Unit 1.1", "Level 3"):
+            self.assertIn(expected, text)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class BulkLearnerRegistrationTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.business = Business.objects.create(name="Acme", email="partner@example.com", business_name="Acme Training")
+        self.course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        self.existing = CustomUser.objects.create_user(email="Known@Example.com", full_name="Known Learner")
+
+    def _register(self, count, offset=0):
+        names = [f"Learner {i}" for i in range(offset, offset + count)]
+        emails = [f"learner{i}@example.com" for i in range(offset, offset + count)]
+        rows = parse_learner_rows(names, emails, [])
+        with override_settings(MEDIA_ROOT=self.media_root):
+            return register_learners_bulk(course=self.course, business=self.business, rows=rows, portal_url="/login/")
+
+    def test_rows_are_validated_and_registered(self):
+        rows = parse_learner_rows(
+            ["New Learner", "Known Learner", "Again", "", "Bad Email"],
+            ["new@example.com", "known@example.com", "NEW@example.com", "missing-name@example.com", "not-an-email"],
+            [],
+        )
+        self.assertEqual(
+            [row.status for row in rows],
+            ["", "", LearnerRow.Status.DUPLICATE, LearnerRow.Status.ERROR, LearnerRow.Status.ERROR],
+        )
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            result = register_learners_bulk(course=self.course, business=self.business, rows=rows, portal_url="/login/")
+            again = register_learners_bulk(
+                course=self.course, business=self.business,
+                rows=parse_learner_rows(["Known Learner"], ["known@example.com"], []),
+            )
+
+        self.assertEqual([row.status for row in rows[:2]], [LearnerRow.Status.CREATED, LearnerRow.Status.REGISTERED])
+        self.assertEqual((result.registered_count, result.created_users, result.error_count), (2, 1, 3))
+        self.assertEqual((again.registered_count, again.existing_count), (0, 1))
+
+        new_user = CustomUser.objects.get(email="new@example.com")
+        self.assertTrue(new_user.username and new_user.has_usable_password())
+        for user in (new_user, self.existing):
+            self.assertTrue(user.is_learner)
+        numbers = set(LearnerRegistration.objects.values_list("learner_number", flat=True))
+        self.assertEqual(len(numbers), 2)
+        self.assertNotIn(None, numbers)
+        self.assertEqual(OutboxEmail.objects.filter(kind="registration").count(), 3)
+
+    def test_query_count_is_independent_of_upload_size(self):
+        self._register(1)  # creates the learner role and stores the logo once
+        with CaptureQueriesContext(connection) as small:
+            self._register(2, offset=1)
+        with CaptureQueriesContext(connection) as large:
+            self._register(40, offset=3)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(LearnerRegistration.objects.count(), 43)
+
+
+    def test_upload_report_is_stored_outside_the_session(self):
+        partner = CustomUser.objects.create_user(email="partner@example.com", password="pw-12345")
+        partner.roles.add(Role.objects.create(name=Role.Names.PARTNER))
+        self.course.businesses.add(self.business)
+        self.client.force_login(partner)
+        url = reverse("superadmin:register_learners", args=[self.course.id])
+
+        with override_settings(MEDIA_ROOT=self.media_root), mock.patch("users.outbox._kick_drain"):
+            self.client.post(url, {"learner_name": ["Old Upload"], "learner_email": ["old@example.com"]})
+            self.client.post(url, {"learner_name": ["New Learner", "Bad Email"], "learner_email": ["new@example.com", "not-an-email"]})
+
+        report = RegistrationReport.objects.get()
+        self.assertEqual(self.client.session[f"learner_registration_report_{self.course.id}"], report.pk)
+        response = self.client.get(url, {"download": "report"})
+        lines = response.content.decode().splitlines()
+        self.assertEqual(lines[0], ",".join(REPORT_FIELDS))
+        self.assertEqual([line.split(",")[4] for line in lines[1:]], [LearnerRow.Status.CREATED, LearnerRow.Status.ERROR])
+
+class NumberSequenceTests(TestCase):
+    def test_sequence_is_a_permutation_of_its_range(self):
+        numbers = NumberSequence.reserve("test", 50, low=100, high=149)
+        self.assertEqual(sorted(numbers), list(range(100, 150)))
+        with self.assertRaises(ValueError):
+            NumberSequence.reserve("test", 1, low=100, high=149)
+
+    def test_numbers_already_in_use_are_skipped(self):
+        business = Business.objects.create(name="Acme", email="partner@example.com")
+        course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        learner = CustomUser.objects.create_user(email="legacy@example.com")
+        # Simulate a legacy certificate holding the sequence's next number
+        seq = NumberSequence.objects.create(
+            name="certificate_number", low=265001, high=999999, multiplier=7919, offset=12345,
+        )
+        legacy = f"ATC{seq.number_at(0)}"
+        LearnerRegistration.objects.create(course=course, business=business, learner=learner, certificate_number=legacy)
+
+        # savepoint, lock, in-use check, top-up check for the skipped number, update, release
+        with self.assertNumQueries(6):
+            numbers = LearnerRegistration.allocate_certificate_numbers(100)
+        self.assertEqual(len(set(numbers)), 100)
+        self.assertNotIn(legacy, numbers)
+        self.assertTrue(all(n.startswith("ATC") and 265001 <= int(n[3:]) <= 999999 for n in numbers))
+
+
+class BulkIssuanceTests(TestCase):
+    def setUp(self):
+        business = Business.objects.create(name="Acme", email="partner@example.com")
+        course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        self.regs = [
+            LearnerRegistration.objects.create(
+                course=course,
+                business=business,
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com"),
+            )
+            for i in range(30)
+        ]
+
+    def test_batch_is_issued_in_a_fixed_number_of_queries(self):
+        already = self.regs[0]
+        already.certificate_issued_at = timezone.now()
+        already.awarded_date = timezone.now().date() - timezone.timedelta(days=3)
+        already.save()
+        regs = list(LearnerRegistration.objects.order_by("id"))
+        awarded = timezone.now().date()
+
+        # savepoint, (nested savepoint, sequence lock, in-use check, counter update, release), bulk update, release
+        with self.assertNumQueries(8):
+            result = issue_certificates(regs, awarded_date=awarded, sync_awarded_date=True)
+
+        self.assertEqual(result.newly_issued, {reg.pk for reg in self.regs[1:]})
+        self.assertEqual(result.updated, 30)
+        issued = list(LearnerRegistration.objects.all())
+        self.assertTrue(all(reg.status == LearnerRegistration.Status.ISSUED and reg.awarded_date == awarded for reg in issued))
+        self.assertEqual(len({reg.certificate_number for reg in issued}), 30)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.partner = CustomUser.objects.create_user(email="partner@example.com", password="pw-12345")
+        self.partner.roles.add(Role.objects.create(name=Role.Names.PARTNER))
+        business = Business.objects.create(name="Acme", email="partner@example.com")
+        course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        course.businesses.add(business)
+        now = timezone.now()
+        # Two this month, one three months ago, one outside the 12-month window
+        for i, months_ago in enumerate([0, 0, 3, 13]):
+            reg = LearnerRegistration.objects.create(
+                course=course, business=business,
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com"),
+            )
+            created = month_starts(months_ago + 1, now)[0] + timezone.timedelta(days=1)
+            LearnerRegistration.objects.filter(pk=reg.pk).update(created_at=min(created, now))
+        rebuild_daily_stats()
+
+    def test_monthly_series_fills_empty_months(self):
+        series = monthly_series(LearnerRegistration.objects.all(), "created_at", months=12)
+        self.assertEqual(len(series.values), 12)
+        self.assertEqual(series.values[-1], 2)
+        self.assertEqual(series.values[-4], 1)
+        self.assertEqual(sum(series.values), 3)
+        self.assertEqual(series.labels[-1], timezone.localtime().strftime("%b %Y"))
+        self.assertEqual(monthly_series(None, "created_at", months=3).values, [0, 0, 0])
+
+    def test_partner_dashboard_counts(self):
+        self.client.force_login(self.partner)
+        response = self.client.get(reverse("superadmin:business_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        ctx = response.context
+        self.assertEqual((ctx["total_courses"], ctx["total_registrations"], ctx["pending_certificates"]), (1, 4, 4))
+        self.assertEqual(sum(ctx["monthly_registrations"]), 3)
+
+
+class RegistrationRollupTests(TestCase):
+    def setUp(self):
+        self.business = Business.objects.create(name="Acme", email="partner@example.com")
+        self.course = Course.objects.create(title="Level 3 Diploma", course_number="LQ-1")
+        self.regs = [
+            LearnerRegistration.objects.create(
+                course=self.course, business=self.business,
+                learner=CustomUser.objects.create_user(email=f"learner{i}@example.com"),
+            )
+            for i in range(4)
+        ]
+        # Two registered ten days ago, one of them issued five days ago; two registered today
+        past = timezone.now() - timezone.timedelta(days=10)
+        LearnerRegistration.objects.filter(pk__in=[self.regs[0].pk, self.regs[1].pk]).update(created_at=past)
+        LearnerRegistration.objects.filter(pk=self.regs[0].pk).update(
+            certificate_issued_at=past + timezone.timedelta(days=5), status=LearnerRegistration.Status.ISSUED,
+        )
+        rebuild_daily_stats()
+
+    def live_counts(self):
+        regs = LearnerRegistration.objects.all()
+        return {
+            "registered": regs.count(),
+            "issued": regs.filter(certificate_issued_at__isnull=False).count(),
+            "shared": regs.filter(certificate_shared_at__isnull=False).count(),
+            "revoked": regs.filter(is_revoked=True).count(),
+        }
+
+    def test_rollup_plus_today_matches_live_counts(self):
+        self.assertEqual(RegistrationDailyStats.objects.count(), 2)
+        # Rollup mark, rolled-up days, then today live: a handful of queries however large the history
+        with self.assertNumQueries(3):
+            stats = registration_stats()
+        self.assertEqual(stats, self.live_counts())
+        week = registration_stats(start=timezone.localdate() - timezone.timedelta(days=7), group_by="business_id")
+        self.assertEqual(week[self.business.pk]["registered"], 2)
+        self.assertEqual(week[self.business.pk]["issued"], 1)
+
+    def test_edits_and_deletes_of_past_registrations_are_rolled_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reg = LearnerRegistration.objects.get(pk=self.regs[0].pk)
+            reg.is_revoked = True
+            reg.save()
+        self.assertEqual(registration_stats(), self.live_counts())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LearnerRegistration.objects.get(pk=self.regs[1].pk).delete()
+        self.assertEqual(registration_stats(), self.live_counts())
+
+        # Changes that bypass signals are picked up by the periodic command
+        LearnerRegistration.objects.filter(pk=self.regs[0].pk).update(is_revoked=False)
+        call_command("rollup_registration_stats", "--days", "30", stdout=io.StringIO())
+        self.assertEqual(registration_stats(), self.live_counts())
+
+    def test_saves_read_back_the_row_only_when_rollup_fields_may_change(self):
+        reg = LearnerRegistration.objects.get(pk=self.regs[0].pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, CaptureQueriesContext(connection) as queries:
+            reg.status = LearnerRegistration.Status.PENDING
+            reg.save(update_fields=["status"])
+        self.assertEqual(callbacks, [])
+        self.assertFalse([q for q in queries if '"certificate_shared_at"' in q["sql"]])
+
+        # Moving a past registration to another business rolls up both businesses' rows
+        other = Business.objects.create(name="Other", email="other@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            reg.business = other
+            reg.save()
+        rolled = registration_stats(end=timezone.localdate(), group_by="business_id")
+        self.assertEqual(rolled[self.business.pk]["registered"], 1)
+        self.assertEqual(rolled[other.pk]["issued"], 1)
+
+    def test_days_not_rolled_up_yet_are_counted_live(self):
+        today = registration_stats(start=timezone.localdate())
+        self.assertEqual(today["registered"], 2)
+
+        # Two days later, before (and then without) any rollup run
+        later = timezone.now() + timezone.timedelta(days=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(registration_stats(), self.live_counts())
+            self.assertEqual(sum(monthly_stats("registered").values), 4)
+            self.assertEqual(registration_stats(start=timezone.localdate() - timezone.timedelta(days=2))["registered"], 2)
+
+            rollup_registration_stats.delay()
+            self.assertEqual(rolled_up_to(), timezone.localdate() - timezone.timedelta(days=1))
+            self.assertEqual(RegistrationDailyStats.objects.aggregate(n=Sum("registered"))["n"], 4)
+            self.assertEqual(registration_stats(), self.live_counts())
+            self.assertEqual(sum(monthly_stats("registered").values), 4)
+
+
+def _legacy_business_fee(business, start=None, end=None):
+    """The per-registration fee loop business_performance used before the set-based version."""
+    total_fee = Decimal("0.00")
+    if business.business_name == "Simple Solutions Ltd" or business.name == "Simple Solutions Ltd":
+        return "—"
+    issued_registrations = business.registrations.filter(certificate_issued_at__isnull=False)
+    if start and end:
+        issued_registrations = issued_registrations.filter(certificate_issued_at__gte=start, certificate_issued_at__lt=end)
+    for reg in issued_registrations:
+        try:
+            pricing = CoursePricing.objects.get(course=reg.course)
+            base_price = pricing.affiliate_price
+            final_price = base_price
+            try:
+                course_discount = BusinessCourseDiscount.objects.get(business=business, course=reg.course)
+                pct = course_discount.affiliate_discount_percentage
+                if pct and pct > 0:
+                    final_price = max(Decimal("0.00"), base_price - (base_price * pct) / 100)
+            except BusinessCourseDiscount.DoesNotExist:
+                if not BusinessCourseDiscount.objects.filter(business=business).exists():
+                    try:
+                        discount = business.discount
+                        if discount.affiliate_discount_percentage > 0:
+                            final_price = max(
+                                Decimal("0.00"), base_price - (base_price * discount.affiliate_discount_percentage) / 100
+                            )
+                    except BusinessDiscount.DoesNotExist:
+                        pass
+            total_fee += final_price
+        except CoursePricing.DoesNotExist:
+            total_fee += Decimal("20.00")
+    return f"${total_fee:.2f}" if total_fee > 0 else "—"
+
+
+class BusinessPerformanceFeeTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email="admin@example.com", password="pw-12345")
+        courses = [
+            Course.objects.create(title=f"Course {i}", course_number=f"LQ-{i}") for i in range(4)
+        ]
+        CoursePricing.objects.create(course=courses[0], affiliate_price=Decimal("33.33"))
+        CoursePricing.objects.create(course=courses[1], affiliate_price=Decimal("20.00"))
+        CoursePricing.objects.create(course=courses[2], affiliate_price=Decimal("12.50"))
+        # courses[3] has no pricing: default fee, never discounted
+
+        plain = Business.objects.create(name="Plain", email="plain@example.com")
+        wide = Business.objects.create(name="Wide", email="wide@example.com")
+        BusinessDiscount.objects.create(business=wide, affiliate_discount_percentage=Decimal("12.5"))
+        per_course = Business.objects.create(name="PerCourse", email="per-course@example.com")
+        BusinessDiscount.objects.create(business=per_course, affiliate_discount_percentage=Decimal("50"))
+        BusinessCourseDiscount.objects.create(business=per_course, course=courses[0], affiliate_discount_percentage=Decimal("17"))
+        BusinessCourseDiscount.objects.create(business=per_course, course=courses[1], affiliate_discount_percentage=Decimal("0"))
+        Business.objects.create(name="Simple Solutions Ltd", email="legacy@example.com")
+        Business.objects.create(name="Idle", email="idle@example.com")
+
+        learner = 0
+        long_ago = timezone.now() - timezone.timedelta(days=400)
+        for business in Business.objects.all():
+            for course in courses:
+                course.businesses.add(business)
+                for issued_at in (timezone.now(), timezone.now(), long_ago, None):
+                    learner += 1
+                    reg = LearnerRegistration.objects.create(
+                        course=course, business=business,
+                        learner=CustomUser.objects.create_user(email=f"learner{learner}@example.com"),
+                    )
+                    if issued_at and business.name != "Idle":
+                        LearnerRegistration.objects.filter(pk=reg.pk).update(certificate_issued_at=issued_at)
+
+    def test_fees_match_the_per_registration_calculation(self):
+        self.client.force_login(self.admin)
+        for params in ({"range": "today"}, {"range": "year"}, {"range": "custom"}):
+            response = self.client.get(reverse("superadmin:business_performance"), params)
+            self.assertEqual(response.status_code, 200)
+            start, end = response.context["start"], response.context["end"]
+            end = end + timezone.timedelta(seconds=1) if end else None
+            fees = {business.name: business.calculated_fee for business in response.context["businesses"]}
+            expected = {
+                business.name: _legacy_business_fee(business, start, end) for business in Business.objects.all()
+            }
+            self.assertEqual(fees, expected)
+            self.assertNotEqual(fees["Plain"], "—")
+
+    def test_a_range_with_one_bound_counts_and_charges_everything(self):
+        self.client.force_login(self.admin)
+        # Every registration was created today: either bound alone would exclude them all
+        tomorrow = timezone.localdate() + timezone.timedelta(days=1)
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        for params in ({"range": "custom", "start": tomorrow.isoformat()}, {"range": "custom", "end": yesterday.isoformat()}):
+            response = self.client.get(reverse("superadmin:business_performance"), params)
+            businesses = response.context["businesses"]
+            self.assertEqual({b.name: b.registrations_count for b in businesses}, {b.name: 16 for b in businesses})
+            self.assertEqual(
+                {b.name: b.calculated_fee for b in businesses},
+                {b.name: _legacy_business_fee(b, None, None) for b in Business.objects.all()},
+            )
+
+
+class LearnersListTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email="admin@example.com", password="pw-12345")
+        learner_role = Role.objects.create(name=Role.Names.LEARNER)
+        business = Business.objects.create(name="Acme", email="acme@example.com")
+        courses = [Course.objects.create(title=f"Course {i}", course_number=f"LQ-{i}") for i in range(2)]
+        self.latest = {}
+        for i, name in enumerate(["Cara", "Ann", "Ben", "Ann", "", "Ben", "Dan"]):
+            user = CustomUser.objects.create_user(email=f"learner{i}@example.com", full_name=name)
+            user.roles.add(learner_role)
+            for days_ago in range(i % 3):
+                reg = LearnerRegistration.objects.create(course=courses[days_ago], business=business, learner=user)
+                issued_at = timezone.now() - timezone.timedelta(days=days_ago)
+                LearnerRegistration.objects.filter(pk=reg.pk).update(certificate_issued_at=issued_at)
+                self.latest.setdefault(user.pk, reg.pk)
+        LearnerRegistration.objects.create(course=courses[0], business=business, learner=user)  # not issued
+        CustomUser.objects.create_user(email="partner@example.com", full_name="Aaron")  # not a learner
+        self.expected = list(
+            CustomUser.objects.filter(roles__name=Role.Names.LEARNER).order_by("full_name", "email", "id")
+        )
+        self.client.force_login(self.admin)
+
+    @mock.patch("superadmin.views.LEARNERS_PAGE_SIZE", 3)
+    def test_pages_follow_the_name_email_id_keyset(self):
+        url = reverse("superadmin:learners_list")
+        self.client.get(url)  # warm up session/auth lookups
+
+        seen, params, pages = [], {}, []
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            pages.append(response.context["page_obj"])
+            seen += response.context["learners"]
+            self.assertEqual(len(queries), 5 if params else 4)  # session, user, cursor row, page, nav role check
+            if not pages[-1].has_next:
+                break
+            params = {"after": pages[-1].next_after}
+
+        self.assertEqual([u.pk for u in seen], [u.pk for u in self.expected])
+        self.assertEqual([len(page.items) for page in pages], [3, 3, 1])
+        for user in seen:
+            self.assertEqual(user.most_recent_reg_id, self.latest.get(user.pk))
+            self.assertEqual(user.issued_total, user.course_registrations.filter(certificate_issued_at__isnull=False).count())
+
+        response = self.client.get(url, {"before": pages[2].previous_before})
+        self.assertEqual(response.context["learners"], pages[1].items)
+        response = self.client.get(url, {"before": pages[1].previous_before})
+        self.assertEqual(response.context["learners"], pages[0].items)
+        self.assertFalse(response.context["page_obj"].has_previous)
+
+        response = self.client.get(url, {"q": "ann"})
+        self.assertEqual([u.full_name for u in response.context["learners"]], ["Ann", "Ann"])
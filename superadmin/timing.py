@@ -0,0 +1,209 @@
+"""
+Pipeline Timing
+Lightweight spans for seeing where time goes in the certificate pipeline.
+
+    with timing.trace("certificate.generate", registration_id=reg.id):
+        with timing.span("template_load"):
+            ...
+
+A trace collects the spans run inside it (same-named spans are summed, with a
+count) and, when it finishes, hands one record to every configured sink.
+Spans are inclusive: a span inside another is also counted in the outer one.
+Outside a trace a span only costs two perf_counter() calls, and a trace
+started inside another trace is recorded as a span of the outer one.
+
+Sinks come from the CERTIFICATE_TIMING_SINKS setting (dotted paths):
+    LoggingSink      one structured log line per trace (superadmin.timing logger)
+    JsonLinesSink    appends one JSON object per trace to CERTIFICATE_TIMING_FILE
+    PrometheusSink   in-process histograms served as Prometheus text by the
+                     certificate_timing_metrics view (per worker process)
+Any object with an emit(record: dict) method can be used.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar("timing_trace", default=None)
+
+
+class Trace:
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans = {}  # span name -> [seconds, count]
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def as_record(self) -> dict:
+        return {
+            "trace": self.name,
+            "started_at": round(self.started_at, 3),
+            "ms": round(self.duration * 1000, 3),
+            "spans": {
+                name: {"ms": round(seconds * 1000, 3), "count": count}
+                for name, (seconds, count) in self.spans.items()
+            },
+            "attrs": self.attrs,
+        }
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Time a whole operation and emit its spans to the sinks when it ends."""
+    parent = _current_trace.get()
+    if parent is not None:
+        with span(name):
+            yield parent
+        return
+
+    current = Trace(name, attrs)
+    token = _current_trace.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_trace.reset(token)
+        _emit(current.as_record())
+
+
+@contextmanager
+def span(name: str):
+    """Time one phase of the active trace (no-op outside a trace)."""
+    current = _current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if current is not None:
+            current.add(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_sinks = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks() -> list:
+    """Sink instances configured by CERTIFICATE_TIMING_SINKS (created once per process)."""
+    global _sinks
+    if _sinks is None:
+        with _sinks_lock:
+            if _sinks is None:
+                sinks = []
+                for path in getattr(settings, "CERTIFICATE_TIMING_SINKS", []) or []:
+                    try:
+                        sinks.append(import_string(path)())
+                    except Exception as e:
+                        logger.error(f"Could not load timing sink {path}: {e}")
+                _sinks = sinks
+    return _sinks
+
+
+def reset_sinks() -> None:
+    """Forget the configured sinks (e.g. after changing the setting in tests)."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = None
+
+
+def _emit(record: dict) -> None:
+    for sink in get_sinks():
+        try:
+            sink.emit(record)
+        except Exception as e:
+            logger.warning(f"Timing sink {type(sink).__name__} failed: {e}")
+
+
+class LoggingSink:
+    def emit(self, record: dict) -> None:
+        spans = " ".join(
+            f"{name}={value['ms']:.1f}ms" + (f"(x{value['count']})" if value["count"] > 1 else "")
+            for name, value in record["spans"].items()
+        )
+        attrs = " ".join(f"{key}={value}" for key, value in record["attrs"].items())
+        logger.info(f"timing {record['trace']} total={record['ms']:.1f}ms {spans} {attrs}".rstrip(), extra={"timing": record})
+
+
+class JsonLinesSink:
+    def __init__(self, path: str | None = None):
+        self.path = path or getattr(settings, "CERTIFICATE_TIMING_FILE", None)
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        if not self.path:
+            return
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class PrometheusSink:
+    """Histogram of trace and span durations per (trace, span), in seconds."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (trace, span) -> [bucket counts..., sum, count]
+
+    def _observe(self, key: tuple, seconds: float) -> None:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                series[i] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            self._observe((record["trace"], "total"), record["ms"] / 1000)
+            for name, value in record["spans"].items():
+                self._observe((record["trace"], name), value["ms"] / 1000)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP certificate_pipeline_seconds Time spent in certificate pipeline traces and spans.",
+            "# TYPE certificate_pipeline_seconds histogram",
+        ]
+        with self._lock:
+            for (trace_name, span_name), series in sorted(self._series.items()):
+                labels = f'trace="{trace_name}",span="{span_name}"'
+                for bound, count in zip(self.BUCKETS, series):
+                    lines.append(f'certificate_pipeline_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'certificate_pipeline_seconds_bucket{{{labels},le="+Inf"}} {series[-1]}')
+                lines.append(f"certificate_pipeline_seconds_sum{{{labels}}} {series[-2]:.6f}")
+                lines.append(f"certificate_pipeline_seconds_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import superadmin_dashboard, delete_business, edit_business, edit_learner, bulk_issue_and_download, learner_specific, toggle_revoke_registration, learners_list, toggle_profile_lock, edit_user, business_performance, delete_registration, list_of_learners, all_registered_learners, toggle_business_restriction, register_learners, download_certificate, issue_certificate, issue_all_certificates, download_all_certificates, registered_learners, add_business, assign_courses, business_list, business_dashboard, add_course, course_list, edit_course, business_courses, assign_course, assignment, unassign_course_from_business, business_details, toggle_advance_payment, business_discounts, edit_business_discount, delete_business_discount, business_pricing, create_payment_session, payment_success, payment_cancel, stripe_webhook, pay_invoice_stripe, invoice_payment_success, bulk_toggle_profile_lock, assign_courses_to_learner, view_certificate_sample
+from .views import superadmin_dashboard, delete_business, edit_business, edit_learner, bulk_issue_and_download, learner_specific, toggle_revoke_registration, learners_list, toggle_profile_lock, edit_user, business_performance, delete_registration, list_of_learners, all_registered_learners, toggle_business_restriction, register_learners, download_certificate, issue_certificate, issue_all_certificates, download_all_certificates, registered_learners, add_business, assign_courses, business_list, business_dashboard, add_course, course_list, edit_course, business_courses, assign_course, assignment, unassign_course_from_business, business_details, toggle_advance_payment, business_discounts, edit_business_discount, delete_business_discount, business_pricing, create_payment_session, payment_success, payment_cancel, stripe_webhook, pay_invoice_stripe, invoice_payment_success, bulk_toggle_profile_lock, assign_courses_to_learner, view_certificate_sample, start_certificate_job, certificate_job_status, download_certificate_job_archive, certificate_timing_metrics
 
 app_name = "superadmin"
 
@@ -41,6 +41,10 @@ urlpatterns = [
     path("learners/<int:user_id>/", learner_specific, name="learner_specific"),
     path("registrations/<int:reg_id>/toggle-revoke/", toggle_revoke_registration,name="toggle_revoke_registration",),
     path("business/courses/registrations/bulk-issue-download/", bulk_issue_and_download, name="bulk_issue_download"),
+    path("business/courses/registrations/certificate-jobs/", start_certificate_job, name="start_certificate_job"),
+    path("business/courses/registrations/certificate-jobs/<int:job_id>/", certificate_job_status, name="certificate_job_status"),
+    path("business/courses/registrations/certificate-jobs/<int:job_id>/download/", download_certificate_job_archive, name="download_certificate_job_archive"),
+    path("metrics/certificates/", certificate_timing_metrics, name="certificate_timing_metrics"),
     path("business/<int:pk>/delete/", delete_business, name="delete_business"),
     path("discounts/", business_discounts, name="business_discounts"),
     path("discounts/<int:business_id>/edit/", edit_business_discount, name="edit_business_discount"),
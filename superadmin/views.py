@@ -6,17 +6,20 @@ from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from users.models import CustomUser, Role, EmailSubscription
+from users.accounts import NewAccount, create_accounts
 import re
 from PIL import ImageOps
 from django.db import transaction, IntegrityError
 from django.utils.crypto import get_random_string
 from .models import Business, Course, LearnerRegistration, PaymentSession, LearnerRegistrationPayment, BusinessDiscount, BusinessCourseDiscount
+from users.email_assets import inline_logo
+from users.outbox import enqueue_email
+from .bulk_registration import parse_learner_rows, register_learners_bulk, save_registration_report
 from users.views import send_welcome_email
 from django.conf import settings
 from django.db.models import Q, Count
 from django.core.mail import send_mail
-from django.core.validators import validate_email
-from django.http import FileResponse, HttpResponse, Http404, HttpResponseForbidden
+from django.http import FileResponse, HttpResponse, Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.utils.safestring import mark_safe
@@ -30,7 +33,6 @@ from django.utils.text import slugify
 from django.templatetags.static import static
 from django.core.mail import EmailMultiAlternatives, EmailMessage
 from django.contrib.staticfiles import finders
-from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import base64
@@ -42,8 +44,8 @@ from PIL import Image, ImageDraw, ImageFont
 from .forms import BusinessForm, CourseForm, LearnerEditForm, AtpGlobalTemplateForm, CentreApplicationApprovalForm, BusinessDiscountForm, AwardedDateForm
 from django.db.models.functions import Coalesce, NullIf, Trim
 from django.db import models
-from django.db.models import F, OuterRef, Subquery, Value, IntegerField
-import io, os, zipfile
+from django.db.models import Exists, F, OuterRef, Subquery, Value, IntegerField
+import io, itertools, os
 import io, random, string
 from datetime import date, timedelta
 from django.http import HttpResponseNotAllowed
@@ -56,6 +58,17 @@ import secrets
 from django.utils.text import slugify
 from django.contrib.staticfiles import finders
 from users.storage_backends import CertTemplateStorage
+from .certificate_fonts import get_cached_font
+from .certificate_render import CertificateRenderSpec, CertificateSectionSpec, CertificateUnitSpec, load_certificate_render_spec, render_certificates
+from .certificate_layout import CertificateLayoutPlan, PlannedPage, certificate_layout_cache
+from .certificate_vector import RASTER as RASTER_OUTPUT, VECTOR as VECTOR_OUTPUT, VectorPage, open_vector_page, page_draw, replay_ops, template_page_size, write_vector_pdf
+from .streaming_zip import stream_zip
+from . import timing
+from .models import CertificateIssuanceJob, CertificateIssuanceJobItem, RegistrationReport
+from .issuance import issue_certificates
+from .pagination import keyset_page
+from .rollup import monthly_stats, registration_stats
+from .tasks import start_certificate_issuance_job
 import qrcode
 # Pillow for drawing on the template PNG and exporting PDF
 from PIL import Image, ImageDraw, ImageFont
@@ -81,6 +94,7 @@ except Exception:
 from PIL import Image
 ATP_CERT_TEMPLATE_KEY = "atp/authorization_template.png"
 
+
 def _get_default_certificate_template():
     """
     Get the default certificate template file path.
@@ -176,10 +190,13 @@ def superadmin_dashboard(request):
     # Get statistics for the dashboard
     total_businesses = Business.objects.count()
     total_courses = Course.objects.count()
-    total_learners = CustomUser.objects.filter(roles__name=Role.Names.LEARNER).distinct().count()
-    total_registrations = LearnerRegistration.objects.count()
-    pending_certificates = LearnerRegistration.objects.filter(certificate_issued_at__isnull=True).count()
-    issued_certificates = LearnerRegistration.objects.filter(certificate_issued_at__isnull=False).count()
+    # One row per (user, role), so no distinct join is needed
+    total_learners = CustomUser.roles.through.objects.filter(role__name=Role.Names.LEARNER).count()
+    # Registration counts from the daily rollup (plus today's live activity)
+    stats = registration_stats()
+    total_registrations = stats["registered"]
+    issued_certificates = stats["issued"]
+    pending_certificates = total_registrations - issued_certificates
     
     # Recent businesses (last 5)
     recent_businesses = Business.objects.order_by('-created_at')[:5]
@@ -241,12 +258,9 @@ def add_business(request):
                 safe_email = (business.email or "").strip()
 
                 plain_password = get_random_string(12)
-                user = CustomUser.objects.create_user(
-                    email=safe_email,
-                    password=plain_password,
-                    full_name=safe_full_name,
-                    is_active=True,
-                )
+                user = create_accounts(
+                    [NewAccount(email=safe_email, full_name=safe_full_name, password=plain_password)]
+                )[safe_email.lower()]
 
                 created_now = True
 
@@ -389,89 +403,20 @@ def business_dashboard(request):
     partner_businesses = Business.objects.filter(email__iexact=request.user.email)
 
     # Get statistics for the dashboard
-    from .models import LearnerRegistration
-    from django.db.models import Count
-    from datetime import datetime, timedelta
-    from django.utils import timezone
-    
-    total_courses = Course.objects.filter(businesses__in=partner_businesses).distinct().count() if partner_businesses.exists() else 0
-    total_registrations = LearnerRegistration.objects.filter(business__in=partner_businesses).count() if partner_businesses.exists() else 0
-    pending_certificates = LearnerRegistration.objects.filter(business__in=partner_businesses, certificate_issued_at__isnull=True).count() if partner_businesses.exists() else 0
-    issued_certificates = LearnerRegistration.objects.filter(business__in=partner_businesses, certificate_issued_at__isnull=False).count() if partner_businesses.exists() else 0
-
-    # Get monthly registration data for the last 12 months
-    monthly_data = []
-    monthly_labels = []
-    
-    if partner_businesses.exists():
-        # Get the last 12 months with proper month boundaries
-        now = timezone.now()
-        from calendar import monthrange
-        
-        # Calculate 12 months: from 11 months ago to current month (inclusive)
-        # Example: If today is Dec 15, 2024, show: Jan 2024, Feb 2024, ..., Nov 2024, Dec 2024
-        for i in range(11, -1, -1):  # i goes from 11 (11 months ago) to 0 (current month)
-            # Calculate the exact month by going back i months from current month
-            current_year = now.year
-            current_month = now.month
-            
-            # Calculate target month: current_month - i
-            # When i=0: current month (December)
-            # When i=11: 11 months ago (January)
-            target_month = current_month - i
-            target_year = current_year
-            
-            # Handle year rollover (when going back crosses year boundary)
-            while target_month <= 0:
-                target_month += 12
-                target_year -= 1
-            
-            # Create month start (first day of the month)
-            month_start = timezone.make_aware(
-                datetime(target_year, target_month, 1, 0, 0, 0, 0)
-            )
-            
-            # Calculate month end properly
-            if i == 0:
-                # Current month - use current date/time as end
-                month_end = now
-            else:
-                # Get last day of the month
-                last_day = monthrange(target_year, target_month)[1]
-                month_end = timezone.make_aware(
-                    datetime(target_year, target_month, last_day, 23, 59, 59, 999999)
-                )
-            
-            # Query registrations for this month (dynamic query - updates on each page load)
-            # This ensures the graph updates when learners are registered or deleted
-            count = LearnerRegistration.objects.filter(
-                business__in=partner_businesses,
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).count()
-            
-            monthly_data.append(count)
-            monthly_labels.append(month_start.strftime('%b %Y'))
-    else:
-        # If no businesses, return empty data for 12 months
-        now = timezone.now()
-        from calendar import monthrange
-        for i in range(11, -1, -1):
-            current_year = now.year
-            current_month = now.month
-            
-            target_month = current_month - i
-            target_year = current_year
-            
-            while target_month <= 0:
-                target_month += 12
-                target_year -= 1
-            
-            month_start = timezone.make_aware(
-                datetime(target_year, target_month, 1, 0, 0, 0, 0)
-            )
-            monthly_data.append(0)
-            monthly_labels.append(month_start.strftime('%b %Y'))
+    business_ids = list(partner_businesses.values_list("id", flat=True))
+
+    total_courses = Course.objects.filter(businesses__in=business_ids).distinct().count() if business_ids else 0
+    # Registration counts from the daily rollup (plus today's live activity)
+    stats = registration_stats(business_ids=business_ids)
+    total_registrations = stats["registered"]
+    issued_certificates = stats["issued"]
+    pending_certificates = total_registrations - issued_certificates
+
+    # Monthly registrations for the last 12 months (current month inclusive);
+    # all zeros when the partner has no business
+    series = monthly_stats("registered", business_ids=business_ids, months=12)
+    monthly_data = series.values
+    monthly_labels = series.labels
 
     return render(
         request,
@@ -844,6 +789,9 @@ def edit_course(request, pk: int):
         course.title = request.POST.get('title', '').strip()
         course.course_number = request.POST.get('course_number', '').strip()
         course.category = request.POST.get('category', '').strip()
+        certificate_output = request.POST.get('certificate_output', '').strip()
+        if certificate_output in dict(Course.CERTIFICATE_OUTPUT_CHOICES):
+            course.certificate_output = certificate_output
         
         # Update duration and credit hours
         duration = request.POST.get('duration', '').strip()
@@ -1231,9 +1179,9 @@ def assign_courses(request, business_id: int):
 
 
 
-def send_registration_email(*, user, course, business, portal_url, plain_password=None, training_from=None, training_to=None):
+def build_registration_email(*, user, course, business, portal_url, plain_password=None, training_from=None, training_to=None):
     """
-    Sends a styled HTML email to the learner about course registration.
+    Builds the styled HTML email to the learner about course registration.
     - If plain_password is provided, treats as a new user (includes credentials).
     - training_from / training_to are optional date objects (rendered as ISO format).
     """
@@ -1256,28 +1204,13 @@ def send_registration_email(*, user, course, business, portal_url, plain_passwor
 
 
     # Always try to embed the logo inline - email clients often block external images
-    # Locate the static file on disk first
-    logo_cid = None
-    img_bytes = None
-    prefer_cid = False
-    logo_fs_path = finders.find("images/LICQual-Logo.jpg")
-    if logo_fs_path:
-        try:
-            with open(logo_fs_path, "rb") as f:
-                img_bytes = f.read()
-            # If we successfully read the file, set logo_cid
-            logo_cid = "licqual-logo"
-            prefer_cid = True
-            # Only use URL if it's a full absolute URL, otherwise prefer inline embedding
-            if not (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
-                logo_url = ""  # Clear relative URLs, use inline instead
-        except Exception as e:
-            # Log error but continue - logo will just not appear
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Could not load logo for registration email: {e}")
-            logo_cid = None
-            img_bytes = None
+    # (bytes and MIME part come from the process-level email asset cache)
+    logo = inline_logo()
+    logo_cid = logo.content_id if logo else None
+    img_bytes = logo.data if logo else None
+    prefer_cid = bool(logo)
+    if prefer_cid and not (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
+        logo_url = ""  # Clear relative URLs, use inline instead
 
     # Build context with logo_cid preferred; use URL only when CID not available and URL is absolute
     def _is_absolute(u: str) -> bool:
@@ -1341,24 +1274,30 @@ def send_registration_email(*, user, course, business, portal_url, plain_passwor
 
     # Attach inline image BEFORE attaching HTML (some email clients need this order)
     if logo_cid and img_bytes:
-        img = MIMEImage(img_bytes, _subtype="jpeg")
-        img.add_header("Content-ID", f"<{logo_cid}>")
-        img.add_header("Content-Disposition", "inline", filename="LICQual-Logo.jpg")
         # Attach to the message's mixed part
         if hasattr(msg, '_container'):
-            msg._container.attach(img)
+            msg._container.attach(logo.mime_part())
         else:
-            msg.attach(img)
+            msg.attach(logo.mime_part())
 
-    # Send via your SES backend (raw MIME supported)
-    # Use fail_silently=True to prevent registration failures if email backend is not configured
-    try:
-        msg.send(fail_silently=True)
-    except Exception as e:
-        # Log error but don't raise - let caller handle if needed
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Failed to send registration email: {e}")
+    return msg
+
+
+def send_registration_email(*, user, course, business, portal_url, plain_password=None, training_from=None, training_to=None):
+    """
+    Queues the course registration email (see build_registration_email) in the
+    email outbox, as part of the caller's transaction.
+    """
+    msg = build_registration_email(
+        user=user,
+        course=course,
+        business=business,
+        portal_url=portal_url,
+        plain_password=plain_password,
+        training_from=training_from,
+        training_to=training_to,
+    )
+    enqueue_email(msg, kind="registration")
 
 
 def _generate_personalized_diploma(learner_name: str) -> bytes:
@@ -1464,9 +1403,9 @@ def _generate_personalized_diploma(learner_name: str) -> bytes:
             return None
 
 
-def send_certificate_issued_email(*, user, course, business, certificate_pdf_bytes=None):
+def build_certificate_issued_email(*, user, course, business, certificate_pdf_bytes=None):
     """
-    Sends an email to the learner when their certificate is issued.
+    Builds the email sent to the learner when their certificate is issued.
     
     Args:
         user: The learner user
@@ -1559,22 +1498,35 @@ def send_certificate_issued_email(*, user, course, business, certificate_pdf_byt
         except Exception as e:
             logger.warning(f"Could not attach certificate PDF to email: {e}")
     
-    # Send the email
+    return msg
+
+
+def send_certificate_issued_email(*, user, course, business, certificate_pdf_bytes=None):
+    """
+    Queues the certificate issued email (see build_certificate_issued_email)
+    in the email outbox. Returns True when it was queued.
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+
+    msg = build_certificate_issued_email(
+        user=user,
+        course=course,
+        business=business,
+        certificate_pdf_bytes=certificate_pdf_bytes,
+    )
+
     try:
-        msg.send(fail_silently=False)
+        enqueue_email(msg, kind="certificate_issued")
         return True
     except Exception as e:
         # Log the error but don't fail the certificate issuance
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to send certificate issued email to {user.email}: {e}")
+        logger.error(f"Failed to queue certificate issued email to {user.email}: {e}")
         return False
 
 
 def _send_share_certificate_email_like_share_button(*, reg, certificate_pdf_bytes: bytes) -> tuple[bool, str | None]:
-    import base64
     import logging
-    import os
 
     logger = logging.getLogger(__name__)
 
@@ -1604,54 +1556,19 @@ def _send_share_certificate_email_like_share_button(*, reg, certificate_pdf_byte
     logo_url = getattr(settings, "EMAIL_LOGO_URL", "") or None
     logo_cid = None
     logo_base64 = None
-    img_bytes = None
 
-    logo_fs_path = None
-    for candidate in [
-        "images/LICQual-Logo.jpg",
-        "images/LICQual Logo .jpg",
-        "images/LICQual Logo.jpg",
-        "images/licqual-logo.jpg",
-        "images/ictqual-logo.jpg",
-    ]:
-        p = finders.find(candidate)
-        if p and os.path.exists(p):
-            logo_fs_path = p
-            break
-
-    if logo_fs_path and os.path.exists(logo_fs_path):
-        try:
-            with open(logo_fs_path, "rb") as f:
-                img_bytes = f.read()
-        except Exception as e:
-            logger.error(f"Could not load logo for certificate email: {e}", exc_info=True)
-            img_bytes = None
+    # Logo bytes and MIME part come from the process-level email asset cache
+    logo = inline_logo()
+    img_bytes = logo.data if logo else None
 
-    if img_bytes and len(img_bytes) > 0:
-        logo_cid = "licqual-logo"
+    if img_bytes:
+        logo_cid = logo.content_id
         final_logo_url = ""
-        logo_base64 = None
     else:
         final_logo_url = ""
         if logo_url and (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
             final_logo_url = logo_url
 
-        if not final_logo_url and img_bytes and len(img_bytes) > 0:
-            try:
-                if img_bytes.startswith(b"\xff\xd8"):
-                    img_mime_type = "image/jpeg"
-                elif img_bytes.startswith(b"\x89PNG"):
-                    img_mime_type = "image/png"
-                elif img_bytes.startswith(b"GIF"):
-                    img_mime_type = "image/gif"
-                else:
-                    img_mime_type = "image/jpeg"
-                encoded = base64.b64encode(img_bytes).decode("utf-8")
-                logo_base64 = f"data:{img_mime_type};base64,{encoded}"
-            except Exception as e:
-                logger.warning(f"Could not encode logo as base64: {e}")
-                logo_base64 = None
-
     ctx = {
         "learner_name": learner_name,
         "business_name": business_name,
@@ -1683,38 +1600,26 @@ def _send_share_certificate_email_like_share_button(*, reg, certificate_pdf_byte
     msg.attach_alternative(html_body, "text/html")
 
     if logo_cid and img_bytes and not final_logo_url:
-        try:
-            from email.mime.image import MIMEImage
-            if img_bytes.startswith(b"\xff\xd8"):
-                img_type = "jpeg"
-            elif img_bytes.startswith(b"\x89PNG"):
-                img_type = "png"
-            elif img_bytes.startswith(b"GIF"):
-                img_type = "gif"
-            else:
-                img_type = "jpeg"
-
-            img = MIMEImage(img_bytes, _subtype=img_type)
-            img.add_header("Content-ID", f"<{logo_cid}>")
-            img.add_header("Content-Disposition", "inline", filename="licqual-logo.jpg")
-            msg.attach(img)
-        except Exception as e:
-            logger.warning(f"Could not attach logo image to certificate email: {e}")
+        msg.attach(logo.mime_part())
 
     filename = f"{safe_name}.pdf"
     msg.attach(filename, certificate_pdf_bytes, "application/pdf")
 
     try:
-        msg.send(fail_silently=False)
+        enqueue_email(msg, kind="certificate_share")
         return True, None
     except Exception as e:
         logger.error(
-            f"Failed to send share certificate email to {reg.learner.email}: {e}",
+            f"Failed to queue share certificate email to {reg.learner.email}: {e}",
             exc_info=True,
         )
         return False, str(e)
 
 
+def _registration_report_key(course_id: int) -> str:
+    return f"learner_registration_report_{course_id}"
+
+
 @login_required
 def register_learners(request, course_id: int):
     """
@@ -1764,6 +1669,20 @@ def register_learners(request, course_id: int):
         return resp
 
 
+    # --- Row-by-row report of the last upload ---
+    if request.method == "GET" and request.GET.get("download") == "report":
+        report = RegistrationReport.objects.filter(
+            pk=request.session.get(_registration_report_key(course.id)),
+            course=course,
+            created_by=request.user,
+        ).first()
+        if not report:
+            messages.error(request, "No registration report is available.")
+            return redirect("superadmin:register_learners", course_id=course.id)
+        resp = HttpResponse(report.content, content_type="text/csv")
+        resp["Content-Disposition"] = f'attachment; filename="registration_report_{course.id}.csv"'
+        return resp
+
     if request.method == "POST":
         # Collect names/emails/dobs from manual form fields
         names = [ (n or "").strip() for n in request.POST.getlist("learner_name") ]
@@ -1810,53 +1729,20 @@ def register_learners(request, course_id: int):
                 messages.error(request, "Could not read CSV. Please ensure it is a valid .csv file.")
                 return redirect("superadmin:business_courses")
 
-        # Validate learner data
-        valid_learners = []
-        error_rows = 0
-
-        # Iterate pairs (pad to longer)
-        total = max(len(names), len(emails), len(dobs))
-        for i in range(total):
-            name = (names[i] if i < len(names) else "").strip()
-            email = (emails[i] if i < len(emails) else "").strip().lower()
-            dob = (dobs[i] if i < len(dobs) else "").strip()
-
-            # Skip completely empty rows
-            if not name and not email and not dob:
-                continue
-
-            # Both name and email are REQUIRED
-            if not name or not email:
-                error_rows += 1
-                continue
-
-            # Validate email format
-            try:
-                validate_email(email)
-            except Exception:
-                error_rows += 1
-                continue
-
-            valid_learners.append({'name': name, 'email': email, 'dob': dob})
+        # Validate the whole submission up front (per-row report kept for download)
+        rows = parse_learner_rows(names, emails, dobs)
+        error_rows = sum(1 for row in rows if not row.is_valid)
 
         if error_rows:
             messages.error(
                 request,
-                f"{error_rows} learner(s) not registered due to invalid email ID format, missing name field or missing email field."
+                f"{error_rows} learner(s) not registered due to invalid email ID format, missing name field, missing email field or a repeated email."
             )
 
-        if not valid_learners:
+        if not any(row.is_valid for row in rows):
             messages.error(request, "No valid learners to register.")
             return redirect("superadmin:register_learners", course_id=course.id)
 
-        # Register learners directly (payment happens later for advance_payment businesses)
-        created_count = 0
-        existing_count = 0
-        registered_count = 0  # Total registrations (new + existing)
-
-        # Get or create LEARNER role
-        learner_role, _ = Role.objects.get_or_create(name=Role.Names.LEARNER)
-
         # Build a login URL (optional)
         base_url = getattr(settings, "SITE_URL", None)
         try:
@@ -1865,64 +1751,20 @@ def register_learners(request, course_id: int):
         except Exception:
             portal_url = None
 
-        for learner_data in valid_learners:
-            name = learner_data['name']
-            email = learner_data['email']
-
-            with transaction.atomic():
-                user = CustomUser.objects.filter(email__iexact=email).first()
-                plain_password = None
-
-                if not user:
-                    plain_password = get_random_string(12)
-                    user = CustomUser.objects.create_user(
-                        email=email,
-                        password=plain_password,
-                        full_name=name,
-                        is_active=True,
-                    )
-
-                    created_count += 1
-
-                # Ensure learner role
-                user.roles.add(learner_role)
-
-                # Link registration (allow same learner for same course under different businesses)
-                registration, registration_created = LearnerRegistration.objects.get_or_create(
-                    course=course,
-                    learner=user,
-                    business=owning_business,
-                )
-                
-                if registration_created:
-                    registered_count += 1
-                else:
-                    existing_count += 1
-
-                # Send email to valid provided email (fail silently if email backend not configured)
-                try:
-                    send_registration_email(
-                        user=user,
-                        course=course,
-                        business=owning_business,
-                        portal_url=portal_url,
-                        plain_password=plain_password,  # None for existing users
-                    )
-                except Exception as e:
-                    # Log error but don't fail registration if email fails
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.warning(f"Failed to send registration email to {user.email}: {e}")
+        # Register learners directly (payment happens later for advance_payment businesses)
+        result = register_learners_bulk(course=course, business=owning_business, rows=rows, portal_url=portal_url)
+        registered_count = result.registered_count
+        existing_count = result.existing_count
 
         # Create invoice for the registrations
         if registered_count > 0:
-            from pricing.views import get_discounted_price
+            from pricing.pricebook import PriceBook
             from pricing.models import InvoicePayment, InvoicedItem
             from django.utils import timezone
             from decimal import Decimal
             
             # Get pricing with discount
-            final_price, base_price, discount_percentage, currency = get_discounted_price(owning_business, course, 'affiliate')
+            final_price, base_price, discount_percentage, currency = PriceBook.for_pairs([(owning_business, course)]).price(owning_business, course, 'affiliate')
             
             # Calculate total amount
             total_amount = final_price * registered_count
@@ -1939,21 +1781,17 @@ def register_learners(request, course_id: int):
                 status=invoice_status,
             )
             
-            # Create invoiced items for each new registration
-            new_registrations = LearnerRegistration.objects.filter(
-                course=course,
-                business=owning_business,
-                learner__email__in=[learner['email'] for learner in valid_learners[:registered_count]]
-            )
-            
-            for registration in new_registrations:
-                InvoicedItem.objects.create(
+            # One invoiced item for each new registration
+            InvoicedItem.objects.bulk_create([
+                InvoicedItem(
                     invoice=invoice,
                     registration=registration,
                     currency=currency,
                     unit_fee=final_price,
                     course_title_snapshot=course.title,
                 )
+                for registration in result.registrations
+            ])
             
             if owning_business.advance_payment:
                 messages.success(
@@ -1980,6 +1818,13 @@ def register_learners(request, course_id: int):
                 f"{existing_count} learner{'s' if existing_count != 1 else ''} {'are' if existing_count != 1 else 'is'} already registered for this course."
             )
 
+        # Keep the per-row outcome so it can be downloaded as a CSV report; the
+        # session only remembers which one (a large upload's report is too big for it)
+        report = save_registration_report(course=course, user=request.user, rows=result.rows)
+        request.session[_registration_report_key(course.id)] = report.pk
+        report_url = reverse("superadmin:register_learners", args=[course.id]) + "?download=report"
+        messages.info(request, mark_safe(f'<a href="{report_url}">Download the registration report</a> for a row-by-row result.'))
+
         # Redirect to registered learners page if any registrations were successful (new or existing)
         if registered_count > 0 or existing_count > 0:
             return redirect("superadmin:registered_learners", course_id=course.id)
@@ -2007,6 +1852,43 @@ def register_learners(request, course_id: int):
     )
 
 
+def _certificate_zip_filename(reg: LearnerRegistration) -> str:
+    """ZIP entry name for a certificate: CERTNO_NameOrEmail.pdf"""
+    name_bits = (reg.learner.full_name or reg.learner.email or "learner")
+    if name_bits:
+        name_bits = str(name_bits).strip() or "learner"
+    else:
+        name_bits = "learner"
+    safe_name = slugify(name_bits)[:50] or "learner"
+    certno = (reg.certificate_number or f"reg-{reg.id}").replace("/", "-")
+    return f"{certno}_{safe_name}.pdf"
+
+
+def _certificate_zip_response(results, zip_name: str):
+    """
+    Stream a ZIP of the successful RenderedCertificate results as they arrive.
+    Consumes results up to the first success before responding, so callers get
+    None (and can redirect with a message) when nothing could be rendered.
+    Nothing with side effects belongs in the stream: it stops wherever the
+    client disconnects.
+    """
+    results = iter(results)
+    first = next((r for r in results if r.error is None and r.pdf_bytes), None)
+    if first is None:
+        return None
+
+    def entries():
+        for result in itertools.chain([first], results):
+            # Skip silently on render failure (already logged)
+            if result.error is not None or not result.pdf_bytes:
+                continue
+            yield _certificate_zip_filename(result.registration), result.pdf_bytes
+
+    resp = StreamingHttpResponse(stream_zip(entries()), content_type="application/zip")
+    resp["Content-Disposition"] = f'attachment; filename="{zip_name}"'
+    return resp
+
+
 @login_required
 @require_POST
 def bulk_issue_and_download(request):
@@ -2069,94 +1951,33 @@ def bulk_issue_and_download(request):
             return redirect("superadmin:registered_learners", course_id=int(course_id))
         return redirect("superadmin:business_courses")
 
-    # Build ZIP in memory
-    buf = io.BytesIO()
-    added = 0
-    newly_issued = []  # Track newly issued certificates for email notifications
-    
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for reg in regs:
-            # If not issued yet, issue now
-            was_newly_issued = False
-            needs_regeneration = False
-            
-            if not reg.certificate_issued_at:
-                reg.certificate_issued_at = timezone.now()
-                reg.awarded_date = awarded_date
-                reg.status = LearnerRegistration.Status.ISSUED
-                was_newly_issued = True
-                needs_regeneration = True
-            else:
-                # Already issued - update awarded_date if different to ensure certificate shows correct date
-                if reg.awarded_date != awarded_date:
-                    reg.awarded_date = awarded_date
-                    needs_regeneration = True
-
-            # Ensure certificate number exists (your model assigns on save)
-            if not reg.certificate_number:
-                reg.save()
-            elif needs_regeneration:
-                # Save to persist awarded_date change
-                reg.save()
-
-            # Generate certificate PDF without saving to storage
-            try:
-                pdf_bytes = generate_certificate_pdf(reg)
-                # Track newly issued certificates for email notification
-                if was_newly_issued:
-                    newly_issued.append(reg)
-            except Exception as e:
-                # Skip silently on render failure
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Bulk issue: Certificate generation failed for reg {reg.id}: {e}")
-                continue
-
-            if not pdf_bytes or len(pdf_bytes) == 0:
-                continue
-
-            # Safe filename: CERTNO_NameOrEmail.pdf
-            name_bits = (reg.learner.full_name or reg.learner.email or "learner")
-            if name_bits:
-                name_bits = str(name_bits).strip() or "learner"
-            else:
-                name_bits = "learner"
-            safe_name = slugify(name_bits)[:50] or "learner"
-            certno = (reg.certificate_number or f"reg-{reg.id}").replace("/", "-")
-            filename = f"{certno}_{safe_name}.pdf"
-
-            zf.writestr(filename, pdf_bytes)
-            added += 1
+    # Issue the pending ones (and move already-issued ones to this awarded date) in one batch
+    newly_issued = issue_certificates(regs, awarded_date=awarded_date, sync_awarded_date=True).newly_issued
+
+    # Newly issued certificates get an email notification. Hand those to a
+    # background job now rather than sending them as the ZIP streams: a client
+    # that disconnects mid-download would otherwise leave learners issued but
+    # never notified (and a re-download no longer sees them as newly issued).
+    # Whichever of the job and the download renders a certificate first fills
+    # the render cache for the other.
+    if newly_issued:
+        start_certificate_issuance_job(
+            kind=CertificateIssuanceJob.Kind.DOWNLOAD,
+            registrations=[reg for reg in regs if reg.id in newly_issued],
+            user=request.user,
+            course=regs[0].course if len({reg.course_id for reg in regs}) == 1 else None,
+            send_emails=True,
+            newly_issued=newly_issued,
+        )
 
-    if added == 0:
+    # Render all PDFs across worker processes and stream the ZIP as they finish
+    ts = timezone.now().strftime("%Y%m%d_%H%M%S")
+    resp = _certificate_zip_response(render_certificates(regs), f"certificates_{ts}.zip")
+    if resp is None:
         messages.warning(request, "No certificates were available to download (missing templates or generation failed).")
         if course_id and str(course_id).isdigit():
             return redirect("superadmin:registered_learners", course_id=int(course_id))
         return redirect("superadmin:business_courses")
-
-    # Send email notifications for newly issued certificates
-    # Note: For bulk operations, we generate PDFs again for email (they're not saved)
-    for reg in newly_issued:
-        try:
-            # Generate PDF for email attachment
-            pdf_bytes = generate_certificate_pdf(reg)
-            send_certificate_issued_email(
-                user=reg.learner,
-                course=reg.course,
-                business=reg.business,
-                certificate_pdf_bytes=pdf_bytes
-            )
-        except Exception as e:
-            # Log the error but don't fail the bulk operation
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Bulk issue: Certificate issued but email failed for {reg.learner.email}: {e}")
-
-    buf.seek(0)
-    ts = timezone.now().strftime("%Y%m%d_%H%M%S")
-    zip_name = f"certificates_{ts}.zip"
-    resp = HttpResponse(buf.getvalue(), content_type="application/zip")
-    resp["Content-Disposition"] = f'attachment; filename="{zip_name}"'
     return resp
 
 
@@ -2199,6 +2020,10 @@ def registered_learners(request, course_id: int):
     issued_count = regs.filter(certificate_issued_at__isnull=False).count()
     pending_count = regs.filter(certificate_issued_at__isnull=True).count()
 
+    # Background issuance job started from this page (progress panel polls it)
+    job_id = request.GET.get("job", "")
+    job_id = int(job_id) if job_id.isdigit() else None
+
     return render(
         request,
         "superadmin/registered_learners.html",
@@ -2210,6 +2035,7 @@ def registered_learners(request, course_id: int):
             "total_count": total_count,
             "issued_count": issued_count,
             "pending_count": pending_count,
+            "job_id": job_id,
         },
     )
 
@@ -2499,15 +2325,17 @@ def download_certificate(request, reg_id: int):
         logger.info(f"Generating certificate on-demand for registration {reg_id}")
         logger.info(f"Registration details - Certificate Number: {reg.certificate_number}, Learner Number: {reg.learner_number}")
         
-        # Generate PDF bytes without saving
-        pdf_bytes = generate_certificate_pdf(reg)
+        # Generate PDF without saving (served from the rendered certificate cache when unchanged)
+        pdf_file = open_certificate_pdf(reg)
         
-        if not pdf_bytes or len(pdf_bytes) == 0:
+        if pdf_file.seek(0, os.SEEK_END) == 0:
+            pdf_file.close()
             import traceback
             error_traceback = traceback.format_exc()
             logger.error(f"Certificate generation completed but PDF is empty for registration {reg_id}\n{error_traceback}")
             messages.error(request, "Certificate file could not be generated. Please check server logs and contact support.")
             return redirect(get_redirect_url())
+        pdf_file.seek(0)
         
         logger.info(f"Certificate successfully generated on-demand for download: registration {reg_id}")
         
@@ -2527,10 +2355,8 @@ def download_certificate(request, reg_id: int):
         download_filename = f"{safe_name}.pdf"
         
         # Return PDF as response
-        from io import BytesIO
-        pdf_buffer = BytesIO(pdf_bytes)
         fr = FileResponse(
-            pdf_buffer,
+            pdf_file,
             as_attachment=True,
             filename=download_filename,
             content_type='application/pdf'
@@ -2629,47 +2455,17 @@ def issue_all_certificates(request, course_id: int):
         messages.info(request, "No pending certificates to issue (all require payment or are already issued).")
         return redirect("superadmin:registered_learners", course_id=course_id)
 
-    # Use today's date as awarded_date
-    awarded_date = timezone.now().date()
-    issued_count = 0
-    newly_issued = []
-
-    for reg in pending_regs:
-        try:
-            reg.certificate_issued_at = timezone.now()
-            reg.awarded_date = awarded_date
-            reg.status = LearnerRegistration.Status.ISSUED
-            reg.save()
-
-            # Generate certificate PDF without saving and send email
-            try:
-                pdf_bytes = generate_certificate_pdf(reg)
-                newly_issued.append(reg)
-                issued_count += 1
-                
-                # Send email notification with PDF attached
-                send_certificate_issued_email(
-                    user=reg.learner,
-                    course=reg.course,
-                    business=reg.business,
-                    certificate_pdf_bytes=pdf_bytes
-                )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Certificate issued but email failed for {reg.learner.email}: {e}")
-
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to issue certificate for registration {reg.id}: {e}")
-
-    if issued_count > 0:
-        messages.success(request, f"Successfully issued {issued_count} certificate(s).")
-    else:
-        messages.warning(request, "No certificates were issued.")
-
-    return redirect("superadmin:registered_learners", course_id=course_id)
+    # Issue, render and email in the background; the page polls the job for progress
+    job = start_certificate_issuance_job(
+        kind=CertificateIssuanceJob.Kind.ISSUE,
+        registrations=pending_regs,
+        user=request.user,
+        course=course,
+        awarded_date=timezone.now().date(),
+        send_emails=True,
+    )
+    messages.info(request, f"Issuing {len(pending_regs)} certificate(s) in the background.")
+    return redirect(f"{reverse('superadmin:registered_learners', kwargs={'course_id': course_id})}?job={job.pk}")
 
 
 @login_required
@@ -2698,49 +2494,150 @@ def download_all_certificates(request, course_id: int):
         messages.warning(request, "No issued certificates to download.")
         return redirect("superadmin:registered_learners", course_id=course_id)
 
-    # Build ZIP in memory
-    buf = io.BytesIO()
-    added = 0
+    # Generate certificate PDFs on-demand (in parallel) without saving, streaming the ZIP
+    ts = timezone.now().strftime("%Y%m%d_%H%M%S")
+    resp = _certificate_zip_response(render_certificates(regs), f"certificates_{course.course_number}_{ts}.zip")
+    if resp is None:
+        messages.warning(request, "No certificates were available to download.")
+        return redirect("superadmin:registered_learners", course_id=course_id)
+    return resp
+
 
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for reg in regs:
-            # Generate certificate PDF on-demand without saving
-            try:
-                pdf_bytes = generate_certificate_pdf(reg)
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Certificate generation failed for reg {reg.id}: {e}")
-                continue
+def _can_view_certificate_job(user, job) -> bool:
+    return user.is_superuser or (job.created_by_id is not None and job.created_by_id == user.id)
 
-            if not pdf_bytes or len(pdf_bytes) == 0:
-                continue
 
-            data = pdf_bytes
+@login_required
+@require_POST
+def start_certificate_job(request):
+    """
+    Queue a background issue-and-download job for the selected registrations.
+    Same inputs and permission rules as bulk_issue_and_download; returns JSON
+    with the job id and the URL to poll for progress.
+    """
+    reg_ids = request.POST.getlist("reg_ids")
+    course_id = request.POST.get("course_id")
+    awarded_date_str = request.POST.get("awarded_date")
 
-            # Safe filename: CERTNO_NameOrEmail.pdf
-            name_bits = (reg.learner.full_name or reg.learner.email or "learner")
-            if name_bits:
-                name_bits = str(name_bits).strip() or "learner"
-            else:
-                name_bits = "learner"
-            safe_name = slugify(name_bits)[:50] or "learner"
-            certno = (reg.certificate_number or f"reg-{reg.id}").replace("/", "-")
-            filename = f"{certno}_{safe_name}.pdf"
+    awarded_date = timezone.now().date()
+    if awarded_date_str:
+        form = AwardedDateForm({"awarded_date": awarded_date_str})
+        if not form.is_valid():
+            return JsonResponse(
+                {"error": f"Invalid awarded date: {', '.join([str(v) for v in form.errors.values()])}"},
+                status=400,
+            )
+        awarded_date = form.cleaned_data['awarded_date']
 
-            zf.writestr(filename, data)
-            added += 1
+    reg_ids = [int(x) for x in reg_ids if str(x).isdigit()]
+    if not reg_ids:
+        return JsonResponse({"error": "No learners selected."}, status=400)
 
-    if added == 0:
-        messages.warning(request, "No certificates were available to download.")
-        return redirect("superadmin:registered_learners", course_id=course_id)
+    qs = LearnerRegistration.objects.filter(id__in=reg_ids).order_by("id")
 
-    buf.seek(0)
-    ts = timezone.now().strftime("%Y%m%d_%H%M%S")
-    zip_name = f"certificates_{course.course_number}_{ts}.zip"
-    resp = HttpResponse(buf.getvalue(), content_type="application/zip")
-    resp["Content-Disposition"] = f'attachment; filename="{zip_name}"'
-    return resp
+    # Permission: partners limited to their own business and not restricted
+    if hasattr(request.user, "has_role") and request.user.has_role(Role.Names.PARTNER) and not request.user.is_superuser:
+        qs = qs.filter(
+            business__email__iexact=request.user.email,
+            business__is_restricted=False,
+        )
+
+    regs = list(qs)
+    if not regs:
+        return JsonResponse({"error": "No permitted learners selected."}, status=403)
+
+    course = None
+    if course_id and str(course_id).isdigit():
+        course = Course.objects.filter(pk=int(course_id)).first()
+
+    job = start_certificate_issuance_job(
+        kind=CertificateIssuanceJob.Kind.ISSUE_AND_DOWNLOAD,
+        registrations=regs,
+        user=request.user,
+        course=course,
+        awarded_date=awarded_date,
+        send_emails=True,
+        build_archive=True,
+    )
+    return JsonResponse({
+        "job_id": job.pk,
+        "status_url": reverse("superadmin:certificate_job_status", kwargs={"job_id": job.pk}),
+    }, status=202)
+
+
+@login_required
+def certificate_job_status(request, job_id: int):
+    """JSON progress of a certificate issuance job (polled by registered_learners)."""
+    job = get_object_or_404(CertificateIssuanceJob, pk=job_id)
+    if not _can_view_certificate_job(request.user, job):
+        raise PermissionDenied("You cannot view this job.")
+
+    failures = list(
+        job.items
+        .filter(status=CertificateIssuanceJobItem.Status.FAILED)
+        .select_related("registration__learner")
+        .order_by("-finished_at")[:10]
+    )
+    data = {
+        "job_id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "total": job.total,
+        "succeeded": job.succeeded,
+        "failed": job.failed,
+        "percent": int(job.processed * 100 / job.total) if job.total else 100,
+        "finished": job.is_finished,
+        "error": job.error,
+        "failures": [
+            {
+                "registration_id": item.registration_id,
+                "learner": item.registration.learner.full_name or item.registration.learner.email,
+                "error": item.error,
+            }
+            for item in failures
+        ],
+        "download_url": None,
+    }
+    if job.archive:
+        data["download_url"] = reverse("superadmin:download_certificate_job_archive", kwargs={"job_id": job.pk})
+    return JsonResponse(data)
+
+
+@login_required
+def download_certificate_job_archive(request, job_id: int):
+    """Download the ZIP built by a finished issue-and-download job."""
+    job = get_object_or_404(CertificateIssuanceJob, pk=job_id)
+    if not _can_view_certificate_job(request.user, job):
+        raise PermissionDenied("You cannot download this archive.")
+    if not job.archive:
+        raise Http404("This job has no archive (yet).")
+
+    ts = (job.finished_at or job.created_at).strftime("%Y%m%d_%H%M%S")
+    return FileResponse(
+        job.archive.open("rb"),
+        as_attachment=True,
+        filename=f"certificates_{ts}.zip",
+        content_type="application/zip",
+    )
+
+
+def certificate_timing_metrics(request):
+    """
+    Certificate pipeline timings in Prometheus text format (see superadmin.timing).
+    Open to superusers, or to scrapers sending "Authorization: Bearer <CERTIFICATE_METRICS_TOKEN>".
+    """
+    import hmac
+
+    token = getattr(settings, "CERTIFICATE_METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    token_ok = bool(token) and hmac.compare_digest(auth, f"Bearer {token}")
+    if not token_ok and not (request.user.is_authenticated and request.user.is_superuser):
+        return HttpResponseForbidden("Not authorized.")
+
+    sink = next((s for s in timing.get_sinks() if isinstance(s, timing.PrometheusSink)), None)
+    if sink is None:
+        raise Http404("Add superadmin.timing.PrometheusSink to CERTIFICATE_TIMING_SINKS to enable metrics.")
+    return HttpResponse(sink.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 def _date_range_from_request(request):
@@ -2809,6 +2706,36 @@ def _date_range_from_request(request):
 
 
 
+def _issued_affiliate_fees(start=None, end=None) -> dict:
+    """
+    Affiliate fees of the certificates issued in [start, end), per business id.
+
+    Issued counts are aggregated per (business, course) in SQL and priced
+    with one PriceBook (pricing.pricebook), so discounts follow the same
+    precedence as invoices. Courses without pricing are charged the default
+    affiliate price without any discount.
+    """
+    from pricing.pricebook import DEFAULT_AFFILIATE, PriceBook
+
+    issued = LearnerRegistration.objects.filter(certificate_issued_at__isnull=False)
+    if start and end:
+        issued = issued.filter(certificate_issued_at__gte=start, certificate_issued_at__lt=end)
+    counts = list(issued.values("business_id", "course_id").annotate(n=Count("id")).order_by())
+    if not counts:
+        return {}
+
+    book = PriceBook.for_pairs((row["business_id"], row["course_id"]) for row in counts)
+    fees = {}
+    for row in counts:
+        business_id, course_id = row["business_id"], row["course_id"]
+        if course_id in book.pricing:
+            unit_fee = book.price(business_id, course_id)[0]
+        else:
+            unit_fee = DEFAULT_AFFILIATE
+        fees[business_id] = fees.get(business_id, Decimal("0.00")) + unit_fee * row["n"]
+    return fees
+
+
 @login_required
 def business_performance(request):
     if not request.user.is_superuser:
@@ -2816,76 +2743,27 @@ def business_performance(request):
 
     selected, start, end = _date_range_from_request(request)
 
-    # Training registrations filter (existing logic)
-    reg_filter = Q()
+    # Training registrations in the range, per business, from the daily rollup. Like the
+    # fees below, a custom range with only one bound set counts everything
     if start and end:
-        reg_filter &= Q(
-            registrations__created_at__gte=start,
-            registrations__created_at__lt=end
-        )
+        registered = registration_stats(start=start, end=end, group_by="business_id")
+    else:
+        registered = registration_stats(group_by="business_id")
 
-    businesses = (
-        Business.objects
-        .annotate(
-            registrations_count=Count("registrations", filter=reg_filter, distinct=True),
-        )
-        .order_by("business_name", "name")
-    )
+    businesses = list(Business.objects.order_by("business_name", "name"))
+    for business in businesses:
+        business.registrations_count = registered.get(business.id, {}).get("registered", 0)
 
     # Calculate fees for each business (excluding Simple Solutions Ltd for legacy certificates)
-    from pricing.models import CoursePricing
-    from decimal import Decimal
-    
+    fees = _issued_affiliate_fees(start, end)
     for business in businesses:
-        total_fee = Decimal("0.00")
-        
         # Skip fee calculation for Simple Solutions Ltd (legacy certificates)
         if business.business_name == "Simple Solutions Ltd" or business.name == "Simple Solutions Ltd":
             business.calculated_fee = "—"
             continue
-            
-        # Calculate fees for issued learner registrations
-        issued_registrations = business.registrations.filter(
-            certificate_issued_at__isnull=False
-        )
-        if start and end:
-            issued_registrations = issued_registrations.filter(
-                certificate_issued_at__gte=start,
-                certificate_issued_at__lt=end
-            )
-        
-        for reg in issued_registrations:
-            try:
-                # Get course pricing
-                pricing = CoursePricing.objects.get(course=reg.course)
-                base_price = pricing.affiliate_price
-                
-                # Apply business discount if exists
-                final_price = base_price
-                try:
-                    course_discount = BusinessCourseDiscount.objects.get(business=business, course=reg.course)
-                    pct = course_discount.affiliate_discount_percentage
-                    if pct and pct > 0:
-                        discount_amount = (base_price * pct) / 100
-                        final_price = max(Decimal("0.00"), base_price - discount_amount)
-                except BusinessCourseDiscount.DoesNotExist:
-                    # Fallback to legacy business-wide discount ONLY if the business has no per-course discounts at all.
-                    has_any_course_discount = BusinessCourseDiscount.objects.filter(business=business).exists()
-                    if not has_any_course_discount:
-                        try:
-                            discount = business.discount
-                            if discount.affiliate_discount_percentage > 0:
-                                discount_amount = (base_price * discount.affiliate_discount_percentage) / 100
-                                final_price = max(Decimal("0.00"), base_price - discount_amount)
-                        except BusinessDiscount.DoesNotExist:
-                            pass
-                
-                total_fee += final_price
-            except CoursePricing.DoesNotExist:
-                # Use default price if no pricing set
-                total_fee += Decimal("20.00")  # Default affiliate price
-        
+
         # Format the fee
+        total_fee = fees.get(business.id, Decimal("0.00"))
         if total_fee > 0:
             business.calculated_fee = f"${total_fee:.2f}"
         else:
@@ -3305,6 +3183,7 @@ def _safe_get_font_path(cfg: dict, default_font: str = None) -> str:
     return font_path
 
 
+@timing.timed("transcript_table")
 def _draw_transcript_units_table(draw2: ImageDraw.ImageDraw, all_units_data: list, page2_unit_table_start_y: int, row_height: int) -> tuple[int, int, int]:
     total_units_count = len(all_units_data)
 
@@ -3491,6 +3370,7 @@ def _draw_transcript_units_table(draw2: ImageDraw.ImageDraw, all_units_data: lis
 
     return table_bottom, table_left, table_right
 
+@timing.timed("font_load")
 def _load_ictqual_font(font_path: str, size: int) -> ImageFont.ImageFont:
     """Load a font from static directory"""
     from django.conf import settings
@@ -3509,98 +3389,43 @@ def _load_ictqual_font(font_path: str, size: int) -> ImageFont.ImageFont:
     full_path = os.path.join(settings.BASE_DIR, font_path)
     try:
         if os.path.exists(full_path):
-            return ImageFont.truetype(full_path, size=size)
+            return get_cached_font(full_path, size)
     except Exception as e:
         logger.warning(f"Failed to load font from {full_path}: {e}")
     return ImageFont.load_default()
 
 
-def _open_template_page(page_num: int) -> Image.Image:
-    """
-    Open the static certificate template PDF and convert to image for drawing.
-    Uses LICQual Diploma -  Template E.pdf as the template.
-    page_num: 1 for first page, 2+ for subsequent pages (if PDF has multiple pages)
-    
-    Uses CERTIFICATE_SCALE_FACTOR for upscaling (e.g., 2.0 for 2x resolution)
-    """
+def _template_pdf_path() -> str:
+    """Locate LICQual Diploma -  Template E.pdf (static finders first, then BASE_DIR/static)."""
     from django.conf import settings
     from django.contrib.staticfiles import finders
 
-    # Use the PDF template
     template_file = "LICQual Diploma -  Template E.pdf"
     template_path = finders.find(f"images/{template_file}")
-    
     if not template_path:
         # Fallback to direct path
         template_path = os.path.join(settings.BASE_DIR, "static", "images", template_file)
+    return template_path
+
+
+@timing.timed("template_load")
+def _open_template_page(page_num: int) -> Image.Image:
+    """
+    Open the static certificate template PDF and convert to image for drawing.
+    Uses LICQual Diploma -  Template E.pdf as the template.
+    page_num: 1 for first page, 2+ for subsequent pages (if PDF has multiple pages)
     
+    Uses CERTIFICATE_SCALE_FACTOR for upscaling (e.g., 2.0 for 2x resolution)
+    Rasterized pages come from the process-wide template_page_cache, so the PDF
+    is only rendered once per (template, mtime, page, scale); callers get a copy.
+    """
+    from .certificate_cache import template_page_cache
+
+    template_path = _template_pdf_path()
+
     try:
         if os.path.exists(template_path):
-            # Try PyMuPDF (fitz) first - easiest to install and works well
-            try:
-                import fitz  # PyMuPDF
-                doc = fitz.open(template_path)
-                if page_num <= len(doc):
-                    page = doc[page_num - 1]  # 0-indexed
-                    # Render at high resolution (zoom factor = scale factor)
-                    # 300 DPI base * scale factor
-                    zoom = CERTIFICATE_SCALE_FACTOR
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=mat)
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    doc.close()
-                    logger.info(f"Loaded PDF template page {page_num} using PyMuPDF at {zoom}x zoom")
-                    return img
-                else:
-                    logger.warning(f"PDF has only {len(doc)} pages, requested page {page_num}. Creating blank page with same dimensions.")
-                    # Get dimensions from first page to create blank page with same size
-                    first_page = doc[0]
-                    zoom = CERTIFICATE_SCALE_FACTOR
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = first_page.get_pixmap(matrix=mat)
-                    base_width, base_height = pix.width, pix.height
-                    doc.close()
-                    # Create blank page with same dimensions
-                    img = Image.new("RGB", (base_width, base_height), "white")
-                    logger.info(f"Created blank page {page_num} with dimensions {base_width}x{base_height}")
-                    return img
-            except ImportError:
-                logger.warning("PyMuPDF (fitz) not installed. Install with: pip install PyMuPDF")
-            except Exception as e:
-                logger.warning(f"Failed to load PDF with PyMuPDF: {e}", exc_info=True)
-            
-            # Fallback: Try pdf2image if available (requires poppler)
-            try:
-                from pdf2image import convert_from_path
-                # Convert PDF page to image at high DPI (300 DPI for quality)
-                dpi = int(300 * CERTIFICATE_SCALE_FACTOR)
-                images = convert_from_path(template_path, dpi=dpi, first_page=page_num, last_page=page_num)
-                if images:
-                    img = images[0].convert("RGB")
-                    logger.info(f"Loaded PDF template page {page_num} using pdf2image at {dpi} DPI")
-                    return img
-                else:
-                    # Page doesn't exist, create blank page with same dimensions as first page
-                    logger.warning(f"Page {page_num} doesn't exist in PDF. Creating blank page.")
-                    first_page_images = convert_from_path(template_path, dpi=dpi, first_page=1, last_page=1)
-                    if first_page_images:
-                        first_img = first_page_images[0].convert("RGB")
-                        base_width, base_height = first_img.size
-                        img = Image.new("RGB", (base_width, base_height), "white")
-                        logger.info(f"Created blank page {page_num} with dimensions {base_width}x{base_height}")
-                        return img
-            except ImportError:
-                logger.warning("pdf2image not installed. Install it with: pip install pdf2image (requires poppler)")
-            except Exception as e:
-                logger.warning(f"Failed to load PDF with pdf2image: {e}", exc_info=True)
-            
-            # Final fallback error
-            error_msg = (
-                f"PDF template found at {template_path} but cannot convert to image. "
-                "Please install one of: pip install PyMuPDF (recommended) or pip install pdf2image"
-            )
-            logger.error(error_msg)
-            raise ImportError(error_msg)
+            return template_page_cache.get(template_path, page_num, CERTIFICATE_SCALE_FACTOR, _rasterize_template_page)
     except Exception as e:
         logger.error(f"Error loading template PDF: {e}", exc_info=True)
         raise
@@ -3612,6 +3437,75 @@ def _open_template_page(page_num: int) -> Image.Image:
     return Image.new("RGB", (int(base_w * CERTIFICATE_SCALE_FACTOR), int(base_h * CERTIFICATE_SCALE_FACTOR)), "white")
 
 
+def _rasterize_template_page(template_path: str, page_num: int) -> Image.Image:
+    """Render one page of the template PDF at CERTIFICATE_SCALE_FACTOR (cache miss path)."""
+    # Try PyMuPDF (fitz) first - easiest to install and works well
+    try:
+        import fitz  # PyMuPDF
+        doc = fitz.open(template_path)
+        if page_num <= len(doc):
+            page = doc[page_num - 1]  # 0-indexed
+            # Render at high resolution (zoom factor = scale factor)
+            # 300 DPI base * scale factor
+            zoom = CERTIFICATE_SCALE_FACTOR
+            mat = fitz.Matrix(zoom, zoom)
+            pix = page.get_pixmap(matrix=mat)
+            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+            doc.close()
+            logger.info(f"Loaded PDF template page {page_num} using PyMuPDF at {zoom}x zoom")
+            return img
+        else:
+            logger.warning(f"PDF has only {len(doc)} pages, requested page {page_num}. Creating blank page with same dimensions.")
+            # Get dimensions from first page to create blank page with same size
+            first_page = doc[0]
+            zoom = CERTIFICATE_SCALE_FACTOR
+            mat = fitz.Matrix(zoom, zoom)
+            pix = first_page.get_pixmap(matrix=mat)
+            base_width, base_height = pix.width, pix.height
+            doc.close()
+            # Create blank page with same dimensions
+            img = Image.new("RGB", (base_width, base_height), "white")
+            logger.info(f"Created blank page {page_num} with dimensions {base_width}x{base_height}")
+            return img
+    except ImportError:
+        logger.warning("PyMuPDF (fitz) not installed. Install with: pip install PyMuPDF")
+    except Exception as e:
+        logger.warning(f"Failed to load PDF with PyMuPDF: {e}", exc_info=True)
+    
+    # Fallback: Try pdf2image if available (requires poppler)
+    try:
+        from pdf2image import convert_from_path
+        # Convert PDF page to image at high DPI (300 DPI for quality)
+        dpi = int(300 * CERTIFICATE_SCALE_FACTOR)
+        images = convert_from_path(template_path, dpi=dpi, first_page=page_num, last_page=page_num)
+        if images:
+            img = images[0].convert("RGB")
+            logger.info(f"Loaded PDF template page {page_num} using pdf2image at {dpi} DPI")
+            return img
+        else:
+            # Page doesn't exist, create blank page with same dimensions as first page
+            logger.warning(f"Page {page_num} doesn't exist in PDF. Creating blank page.")
+            first_page_images = convert_from_path(template_path, dpi=dpi, first_page=1, last_page=1)
+            if first_page_images:
+                first_img = first_page_images[0].convert("RGB")
+                base_width, base_height = first_img.size
+                img = Image.new("RGB", (base_width, base_height), "white")
+                logger.info(f"Created blank page {page_num} with dimensions {base_width}x{base_height}")
+                return img
+    except ImportError:
+        logger.warning("pdf2image not installed. Install it with: pip install pdf2image (requires poppler)")
+    except Exception as e:
+        logger.warning(f"Failed to load PDF with pdf2image: {e}", exc_info=True)
+    
+    # Final fallback error
+    error_msg = (
+        f"PDF template found at {template_path} but cannot convert to image. "
+        "Please install one of: pip install PyMuPDF (recommended) or pip install pdf2image"
+    )
+    logger.error(error_msg)
+    raise ImportError(error_msg)
+
+
 
 def _scale(value):
     """Scale a coordinate or size value by CERTIFICATE_SCALE_FACTOR"""
@@ -3673,6 +3567,7 @@ def _wrap_text_to_width(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.Im
     return lines
 
 
+@timing.timed("text_fit")
 def _fit_wrapped_text_to_box(draw: ImageDraw.ImageDraw, text: str, font_path: str, base_size_scaled: int, max_width: int, max_height: int) -> tuple[ImageFont.ImageFont, list[str], int]:
     size = max(4, int(base_size_scaled))
     while size >= 4:
@@ -3785,44 +3680,61 @@ def _draw_text_with_spacing(draw, text: str, x: int, y: int, font, color, spacin
         # Move to next character position (character width + spacing)
         current_x += char_width + spacing
 
-def _generate_qr_png_bytes(data: str, size: int = 280) -> bytes:
-    """Generate QR code as PNG bytes with high error correction for better scanning"""
+def _generate_qr_image(data: str, size: int = 280) -> Image.Image:
+    """
+    Generate a QR code as a 1-bit size x size image with high error correction
+    for better scanning. Modules are scaled by a whole number of pixels
+    (nearest neighbour, so edges stay sharp) and centred in the quiet zone.
+    """
     # Ensure data is a string, not None
     if data is None:
         data = ""
     data = str(data)
     
     # Use higher error correction (ERROR_CORRECT_H = ~30% error correction) for better scanning
-    # Increase box_size for better quality, and border for quiet zone
+    # border=4 is the quiet zone required for reliable scanning
     qr = qrcode.QRCode(
         version=None,  # Auto-determine version based on data
         error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction (~30%)
-        box_size=10,
-        border=4  # Larger border (quiet zone) for better scanning
+        box_size=1,
+        border=4
     )
     qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-    img = img.resize((size, size), Image.Resampling.LANCZOS)  # Use high-quality resampling
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
-
-def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: bool = True) -> bytes | None:
+    matrix = qr.get_matrix()
+    modules = len(matrix)
+    code = Image.new("1", (modules, modules), 1)
+    code.putdata([0 if dark else 1 for row in matrix for dark in row])
+
+    box = size // modules
+    if box < 1:
+        return code.resize((size, size), Image.Resampling.NEAREST)
+    img = Image.new("1", (size, size), 1)
+    offset = (size - modules * box) // 2
+    img.paste(code.resize((modules * box, modules * box), Image.Resampling.NEAREST), (offset, offset))
+    return img
+
+
+@timing.timed("qr_code")
+def _certificate_qr_image(verify_url: str, size: int) -> Image.Image:
+    """QR code for a verification URL at its final pixel size, from the process-wide cache."""
+    from .certificate_cache import qr_code_cache
+    return qr_code_cache.get(verify_url, size, _generate_qr_image)
+
+def build_certificate_render_spec(reg: LearnerRegistration, *, learner=None, sections=None) -> CertificateRenderSpec:
     """
-    Build a multi-page ICTQUAL certificate PDF for the given registration.
-    Page 1: General info (learner name, qualification title, business name, QR code)
-    Page 2+: Sections with units, awarded date, duration, location, QR code
-    
+    Validate a registration and collect everything the certificate renderer draws
+    into a CertificateRenderSpec. Assigns a certificate number first if missing.
+
     Args:
-        reg: The LearnerRegistration to generate certificate for
-        save_to_storage: If True, save PDF to storage. If False, return PDF bytes without saving.
-    
+        reg: The LearnerRegistration to build the spec for (course/business loaded)
+        learner: Optional preloaded learner (full_name/email), avoids a query
+        sections: Optional preloaded QualificationSections of reg.course, ordered,
+                  with units prefetched (see certificate_render.build_render_specs)
+
     Returns:
-        If save_to_storage=False, returns PDF bytes. Otherwise returns None.
+        CertificateRenderSpec: plain picklable data, no database access needed to render it
     """
-    from io import BytesIO
-    
     logger.info(f"Starting certificate generation for registration {reg.id}")
     
     # Validate required data before starting
@@ -3844,7 +3756,7 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
             logger.warning(f"Business {business.id} has no name")
         
         # Check learner exists
-        if not reg.learner:
+        if not reg.learner_id:
             raise ValueError("Registration has no associated learner")
     except Exception as e:
         logger.error(f"Data validation failed for registration {reg.id}: {e}")
@@ -3864,10 +3776,11 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     logger.info(f"Certificate number: {reg.certificate_number}, Learner number: {reg.learner_number}")
     
     # Get learner and course info
-    from users.models import CustomUser
-    fresh_user = CustomUser.objects.only("full_name", "email").get(pk=reg.learner_id)
+    if learner is None:
+        from users.models import CustomUser
+        learner = CustomUser.objects.only("full_name", "email").get(pk=reg.learner_id)
     # Ensure learner_name is a string, not None
-    name_val = fresh_user.full_name or fresh_user.email
+    name_val = learner.full_name or learner.email
     learner_name = str(name_val).strip() if name_val is not None else "Learner"
     if not learner_name:
         learner_name = "Learner"
@@ -3875,21 +3788,23 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     
     # Get qualification sections and units
     course = reg.course
-    sections = course.sections.prefetch_related('units').all().order_by('order')
+    if sections is None:
+        sections = course.sections.prefetch_related('units').order_by('order')
+    sections = list(sections)
     
-    if not sections.exists():
+    if not sections:
         logger.error(f"No sections found for course {course.id} ({course.title})")
         raise ValueError(f"Course '{course.title}' has no sections. Please add sections to the course before issuing certificates.")
     
-    logger.info(f"Found {sections.count()} section(s) for course {course.id}")
+    logger.info(f"Found {len(sections)} section(s) for course {course.id}")
     
     # Validate sections have required data and log warnings
     missing_fields = []
     for section in sections:
-        section_num = section.order or sections.count()
-        # Check if section has units
-        units = section.units.all()
-        if not units.exists():
+        section_num = section.order or len(sections)
+        # Check if section has units (prefetched, already in unit order)
+        units = list(section.units.all())
+        if not units:
             missing_fields.append(f"Section {section_num} has NO UNITS - each section must have at least one unit")
             logger.error(f"Section {section.id} (order {section.order}) has no units")
         
@@ -3919,7 +3834,7 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
         logger.error(f"Certificate generation failed for registration {reg.id}:\n{error_msg}")
         raise ValueError(error_msg)
     
-    # Generate QR code (scaled size)
+    # Verification URL for the QR code
     try:
         verify_url = _verification_url_for(reg)
         if not verify_url or verify_url is None:
@@ -3929,78 +3844,126 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     except Exception as e:
         logger.error(f"Error generating verification URL: {e}", exc_info=True)
         verify_url = ""
-    qr_bytes = _generate_qr_png_bytes(verify_url, size=_scale(PAGE1_CONFIG["qr_code"]["size"]))
-    
-    # Create PDF buffer
-    buffer = BytesIO()
+
+    # Date shown on both pages
+    if reg.awarded_date:
+        issue_date = reg.awarded_date
+    elif reg.certificate_issued_at:
+        issue_date = reg.certificate_issued_at.date()
+    else:
+        issue_date = timezone.now().date()
+
+    # PDF backend: per-course choice, else the site-wide default
+    output = course.certificate_output or getattr(settings, "CERTIFICATE_OUTPUT_MODE", RASTER_OUTPUT)
+
+    return CertificateRenderSpec(
+        registration_id=reg.id,
+        learner_name=learner_name,
+        course_title=course.title,
+        course_number=course.course_number,
+        business_name=reg.business.business_name or reg.business.name,
+        certificate_number=reg.certificate_number,
+        issue_date=issue_date,
+        verify_url=verify_url,
+        sections=tuple(
+            CertificateSectionSpec(
+                order=section.order,
+                credits=section.credits,
+                glh_hours=section.glh_hours,
+                tqt_hours=section.tqt_hours,
+                remarks=section.remarks,
+                units=tuple(
+                    CertificateUnitSpec(
+                        order=unit.order,
+                        unit_ref=unit.unit_ref,
+                        unit_title=unit.unit_title,
+                        credits=unit.credits,
+                        glh_hours=unit.glh_hours,
+                    )
+                    for unit in section.units.all()
+                ),
+            )
+            for section in sections
+        ),
+        output=output,
+        course_id=course.id,
+        business_id=reg.business_id,
+    )
+
+
+def _draw_page1_value(draw, key: str, value: str) -> None:
+    """Draw a PAGE1_CONFIG value next to its label (labels are on the template)."""
+    cfg = PAGE1_CONFIG[key]
+    font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_REGULAR), _scale(cfg["size"]))
+    x = _scale(cfg["x"])
+    y = _scale(cfg["y"])
+    y_offset = int(cfg.get("y_offset", 0))
+    value = value or ""
+    bbox = draw.textbbox((0, 0), value, font=font)
+    text_h = bbox[3] - bbox[1]
+    line_h = _scale(cfg.get("line_height", cfg["size"]))
+    y_aligned = int(y + ((line_h - text_h) / 2) - bbox[1] + y_offset)
+    draw.text((x, y_aligned), value, font=font, fill=cfg["color"])
+
+
+def _draw_centred_value(draw, text: str, x: int, centre_y: float, font) -> None:
+    """Draw text starting at x, vertically centred on centre_y (summary block values)."""
+    bbox = draw.textbbox((0, 0), text, font=font)
+    y = int(centre_y - (bbox[1] + bbox[3]) / 2)
+    draw.text((x, y), text, font=font, fill=(0, 0, 0))
+
+
+def _template_page_size(page_num: int) -> tuple[int, int]:
+    """Pixel size of a template page as _open_template_page returns it."""
+    template_path = _template_pdf_path()
+    if os.path.exists(template_path):
+        return template_page_size(template_path, page_num, CERTIFICATE_SCALE_FACTOR)
+    base_w, base_h = 2480, 1754
+    return int(base_w * CERTIFICATE_SCALE_FACTOR), int(base_h * CERTIFICATE_SCALE_FACTOR)
+
+
+def _certificate_template_version() -> tuple:
+    """Identifies the template file and drawing code a layout plan was compiled against."""
+    template_path = _template_pdf_path()
+    try:
+        template_mtime = os.path.getmtime(template_path)
+    except OSError:
+        template_mtime = None
+    return (template_path, template_mtime, CERTIFICATE_RENDER_VERSION, CERTIFICATE_SCALE_FACTOR)
+
+
+def compile_certificate_layout(spec: CertificateRenderSpec) -> CertificateLayoutPlan:
+    """
+    Lay out everything on the certificate that depends only on the course,
+    business and template - titles, business banner, transcript table pages and
+    summary block - and record it as a CertificateLayoutPlan. Learner fields
+    (name, certificate number, dates, QR code) are left out; the plan records
+    where they go. Only the layout fields of spec are read.
+    """
+    sections = spec.sections
     pages = []
-    
+
+    def _open_page(page_num: int) -> VectorPage:
+        return VectorPage(page_num - 1, _template_page_size(page_num))
+
     # ===== PAGE 1: General Information =====
-    page1_img = _open_template_page(1)
-    draw = ImageDraw.Draw(page1_img)
+    page1_img = _open_page(1)
+    draw = page_draw(page1_img)
     img_width, img_height = page1_img.size
-
-    def _draw_page1_value(key: str, value: str) -> None:
-        cfg = PAGE1_CONFIG[key]
-        font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_REGULAR), _scale(cfg["size"]))
-        x = _scale(cfg["x"])
-        y = _scale(cfg["y"])
-        y_offset = int(cfg.get("y_offset", 0))
-        value = value or ""
-        bbox = draw.textbbox((0, 0), value, font=font)
-        text_h = bbox[3] - bbox[1]
-        line_h = _scale(cfg.get("line_height", cfg["size"]))
-        y_aligned = int(y + ((line_h - text_h) / 2) - bbox[1] + y_offset)
-        draw.text((x, y_aligned), value, font=font, fill=cfg["color"])
     
     # Course Number (value only, label is on template)
     # Ensure course_number is a string before calling strip()
-    if course.course_number is None or course.course_number == "":
+    if spec.course_number is None or spec.course_number == "":
         course_number = ""
     else:
-        course_number = str(course.course_number).strip()
-    _draw_page1_value("course_number", course_number)
+        course_number = str(spec.course_number).strip()
+    _draw_page1_value(draw, "course_number", course_number)
     
     # Course Duration (Credits) - value only, label is on template
     # Calculate total credits from all sections
     total_credits_for_duration = sum(s.credits if s.credits is not None else 0 for s in sections)
     duration_text = f"{total_credits_for_duration} Credits"
-    _draw_page1_value("course_duration", duration_text)
-    
-    # Certificate Number (value only, label is on template)
-    # Safely get certificate_number
-    if reg.certificate_number is None or reg.certificate_number == "":
-        cert_num = ""
-    else:
-        cert_num = str(reg.certificate_number)
-    _draw_page1_value("certificate_number", cert_num)
-    
-    # Issued Date (value only, label is on template)
-    if reg.awarded_date:
-        date_to_format = reg.awarded_date
-    elif reg.certificate_issued_at:
-        date_to_format = reg.certificate_issued_at.date()
-    else:
-        date_to_format = timezone.now().date()
-    date_str = _format_date_with_ordinal(date_to_format) if date_to_format else ""
-    _draw_page1_value("issued_date", date_str)
-    
-    # Learner Name (centered, bold - appears prominently in certificate section)
-    cfg = PAGE1_CONFIG["learner_name"]
-    font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_BOLD), _scale(cfg["size"]))
-    spacing = _scale(cfg.get("spacing", 0))
-    thickness = cfg.get("thickness", 0)  # Don't scale thickness
-    if cfg.get("align") == "center":
-        # Center the text with 15px offset to the right
-        bbox = draw.textbbox((0, 0), learner_name, font=font)
-        text_width = bbox[2] - bbox[0]
-        x = (img_width - text_width) // 2 + _scale(15)
-        if thickness > 0:
-            draw.text((x, _scale(cfg["y"])), learner_name, font=font, fill=cfg["color"], stroke_width=thickness, stroke_fill=cfg["color"])
-        else:
-            draw.text((x, _scale(cfg["y"])), learner_name, font=font, fill=cfg["color"])
-    else:
-        _draw_text_with_spacing(draw, learner_name, _scale(cfg["x"]), _scale(cfg["y"]), font, cfg["color"], spacing, thickness)
+    _draw_page1_value(draw, "course_duration", duration_text)
     
     # Qualification Title (centered, bold - appears below learner name)
     cfg = PAGE1_CONFIG["qualification_title"]
@@ -4008,11 +3971,11 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     base_size_scaled = _scale(cfg["size"])
     spacing = _scale(cfg.get("spacing", 0))
     thickness = cfg.get("thickness", 0)  # Don't scale thickness
-    # Ensure course.title is a string before calling strip()
-    if course.title is None or course.title == "":
+    # Ensure course title is a string before calling strip()
+    if spec.course_title is None or spec.course_title == "":
         course_title = "Course"
     else:
-        course_title = str(course.title).strip() or "Course"
+        course_title = str(spec.course_title).strip() or "Course"
     if cfg.get("align") == "center":
         max_width = max(_scale(200), img_width - (_scale(110) * 2))
         max_height = _scale(42)
@@ -4051,7 +4014,7 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     font_path = _safe_get_font_path(course_title_cfg, FONT_CANDARA_BOLD)
     base_size_scaled = _scale(course_title_cfg["size"])
     # Ensure business names are strings before calling strip()
-    business_name_val = reg.business.business_name or reg.business.name
+    business_name_val = spec.business_name
     if business_name_val is None or business_name_val == "":
         business_name = "Business"
     else:
@@ -4105,16 +4068,11 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
         font = _load_ictqual_font(font_path, base_size_scaled)
         _draw_text_with_spacing(draw, business_name, _scale(cfg["x"]), _scale(cfg["y"]), font, cfg["color"], spacing, thickness)
     
-    # QR Code
-    qr_img = Image.open(BytesIO(qr_bytes))
-    cfg = PAGE1_CONFIG["qr_code"]
-    page1_img.paste(qr_img, (_scale(cfg["x"]), _scale(cfg["y"])))
-    
     pages.append(page1_img)
     
     # ===== PAGE 2: Transcript Section with Units Table =====
-    page2_img = _open_template_page(2)
-    draw2 = ImageDraw.Draw(page2_img)
+    page2_img = _open_page(2)
+    draw2 = page_draw(page2_img)
     img_width2, img_height2 = page2_img.size
     
     # Page 2 coordinates - adjusted for top of page (not bottom section like page 1)
@@ -4126,19 +4084,10 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     PAGE2_SUMMARY_Y = 360  # Summary at bottom
     PAGE2_DATE_Y = 390
     
-    # Draw learner name in transcript section (left-aligned) - at top of page 2
+    # Learner name in transcript section (left-aligned) - at top of page 2, drawn per learner
     # Position aligned with "The Learner has been awarded..." line start
     PAGE2_LEFT_MARGIN = 75  # X position where content starts (aligned with units table)
-    cfg = TRANSCRIPT_CONFIG["learner_name"]
-    # Reduce font size for page 2 (from 24 to 20)
-    font_size = int(cfg["size"] * 0.83)  # Reduce by ~17%
-    font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_BOLD), _scale(font_size))
-    x = _scale(PAGE2_LEFT_MARGIN)
-    thickness = cfg.get("thickness", 0)
-    if thickness > 0:
-        draw2.text((x, _scale(PAGE2_HEADER_Y)), learner_name, font=font, fill=(0, 0, 0), stroke_width=thickness, stroke_fill=(0, 0, 0))
-    else:
-        draw2.text((x, _scale(PAGE2_HEADER_Y)), learner_name, font=font, fill=(0, 0, 0))
+    transcript_name_xy = (_scale(PAGE2_LEFT_MARGIN), _scale(PAGE2_HEADER_Y))
     
     PAGE2_RIGHT_MARGIN = 75
     max_text_width = img_width2 - _scale(PAGE2_LEFT_MARGIN + PAGE2_RIGHT_MARGIN)
@@ -4171,7 +4120,7 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     global_unit_idx = 0
     
     for section in sections:
-        units = section.units.all().order_by('order')
+        units = section.units
         section_credits = section.credits if section.credits is not None else 0
         section_glh = section.glh_hours if section.glh_hours is not None else 0
         
@@ -4182,7 +4131,7 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
                 'section': section,
                 'section_credits': section_credits,
                 'section_glh': section_glh,
-                'num_units_in_section': units.count(),
+                'num_units_in_section': len(units),
                 'global_idx': global_unit_idx
             })
     
@@ -4239,8 +4188,8 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
 
     for slice_index, (start, end, is_last_transcript_page) in enumerate(unit_slices):
         if slice_index > 0:
-            page2_img = _open_template_page(2)
-            draw2 = ImageDraw.Draw(page2_img)
+            page2_img = _open_page(2)
+            draw2 = page_draw(page2_img)
             img_width2, img_height2 = page2_img.size
 
         table_bottom, table_left, table_right = _draw_transcript_units_table(
@@ -4367,24 +4316,10 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     # "The learner has qualified for the above award on"
     qualification_text = "The learner has qualified for the above award on"
     draw2.text((language_label_x, qualification_y), qualification_text, font=language_font, fill=(0, 0, 0))
-    qualification_date_font = _load_ictqual_font(FONT_CANDARA_BOLD, _scale(11))
-    try:
-        if reg.awarded_date:
-            qualified_date = reg.awarded_date
-        elif reg.certificate_issued_at:
-            qualified_date = reg.certificate_issued_at.date()
-        else:
-            qualified_date = timezone.now().date()
-    except Exception:
-        qualified_date = timezone.now().date()
-    qualification_date_text = _format_date_with_ordinal(qualified_date) if qualified_date else ""
     qualification_bbox = draw2.textbbox((0, 0), qualification_text, font=language_font)
     qualification_width = qualification_bbox[2] - qualification_bbox[0]
     qualification_date_x = language_label_x + qualification_width + _scale(6)
     qualification_center_y = qualification_y + (qualification_bbox[1] + qualification_bbox[3]) / 2
-    qualification_date_bbox = draw2.textbbox((0, 0), qualification_date_text, font=qualification_date_font)
-    qualification_date_y = int(qualification_center_y - (qualification_date_bbox[1] + qualification_date_bbox[3]) / 2)
-    draw2.text((qualification_date_x, qualification_date_y), qualification_date_text, font=qualification_date_font, fill=(0, 0, 0))
     
     # Course Number | Certificate Number (labels regular, values bold)
     # Labels keep Candara; generated values use Montserrat
@@ -4416,12 +4351,8 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     cert_num_label_bbox = draw2.textbbox((0, 0), cert_num_label_text, font=cert_label_font)
     cert_num_label_width = cert_num_label_bbox[2] - cert_num_label_bbox[0]
     cert_num_value_x = cert_num_label_x + cert_num_label_width + _scale(5)
-    cert_num_text = cert_num if cert_num else ""
-    cert_num_value_bbox = draw2.textbbox((0, 0), cert_num_text, font=cert_value_font)
-    cert_num_value_y = int(cert_info_center_y - (cert_num_value_bbox[1] + cert_num_value_bbox[3]) / 2)
     
     draw2.text((cert_num_label_x, cert_info_y), cert_num_label_text, font=cert_label_font, fill=(0, 0, 0))
-    draw2.text((cert_num_value_x, cert_num_value_y), cert_num_text, font=cert_value_font, fill=(0, 0, 0))
     
     # Certificate Issue Date
     cert_date_label_text = "Certificate Issue Date:"
@@ -4429,54 +4360,172 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     cert_date_label_width = cert_date_label_bbox[2] - cert_date_label_bbox[0]
     cert_date_value_x = language_label_x + cert_date_label_width + _scale(5)
     
-    if reg.awarded_date:
-        date_to_format = reg.awarded_date
-    elif reg.certificate_issued_at:
-        date_to_format = reg.certificate_issued_at.date()
-    else:
-        date_to_format = timezone.now().date()
-    date_str = _format_date_with_ordinal(date_to_format) if date_to_format else ""
-    cert_date_text = date_str
-    
     draw2.text((language_label_x, cert_date_y), cert_date_label_text, font=cert_label_font, fill=(0, 0, 0))
     cert_date_label_bbox2 = draw2.textbbox((0, 0), cert_date_label_text, font=cert_label_font)
     cert_date_center_y = cert_date_y + (cert_date_label_bbox2[1] + cert_date_label_bbox2[3]) / 2
-    cert_date_value_bbox = draw2.textbbox((0, 0), cert_date_text, font=cert_value_font)
-    cert_date_value_y = int(cert_date_center_y - (cert_date_value_bbox[1] + cert_date_value_bbox[3]) / 2)
-    draw2.text((cert_date_value_x, cert_date_value_y), cert_date_text, font=cert_value_font, fill=(0, 0, 0))
     
-    # QR Code on transcript page - position centered horizontally at bottom
-    qr_img = Image.open(BytesIO(qr_bytes))
+    # QR Code on transcript page - centered horizontally at bottom, leaving space for signature
     qr_size = _scale(80)  # Same size as page 1
-    qr_img = qr_img.resize((qr_size, qr_size), Image.Resampling.LANCZOS)
-    # Position QR code centered on x-axis, near bottom
-    qr_x = (img_width2 - qr_size) // 2  # Center horizontally
-    qr_y = img_height2 - _scale(100)  # Position near bottom, leaving space for signature
-    page2_img.paste(qr_img, (qr_x, qr_y))
+    qr_x = (img_width2 - qr_size) // 2
+    qr_y = img_height2 - _scale(100)
     
     pages.append(page2_img)
-    
-    # Convert all pages to a single PDF with high resolution
-    if not pages:
-        raise ValueError("No certificate pages were generated. Check course sections and template files.")
-    
-    pdf_buffer = BytesIO()
-    # Save first page as PDF with 300 DPI for high quality
-    pages[0].save(
-        pdf_buffer, 
-        format='PDF', 
-        save_all=True, 
-        append_images=pages[1:] if len(pages) > 1 else [],
-        resolution=300.0,
-        quality=95
+
+    return CertificateLayoutPlan(
+        pages=tuple(PlannedPage(template_page=1 if i == 0 else 2, ops=tuple(page.ops)) for i, page in enumerate(pages)),
+        transcript_name_xy=transcript_name_xy,
+        qualification_date_anchor=(qualification_date_x, qualification_center_y),
+        certificate_number_anchor=(cert_num_value_x, cert_info_center_y),
+        issue_date_anchor=(cert_date_value_x, cert_date_center_y),
+        transcript_qr_xy=(qr_x, qr_y),
     )
-    pdf_buffer.seek(0)
+
+
+def render_certificate_spec(spec: CertificateRenderSpec) -> bytes:
+    """
+    Draw the multi-page ICTQUAL certificate described by spec and return the PDF bytes.
+    Page 1: General info (learner name, qualification title, business name, QR code)
+    Page 2+: Sections with units, awarded date, duration, location, QR code
+
+    The course/business part comes from the cached layout plan (see
+    compile_certificate_layout); only the learner's own fields are drawn here.
+    Pure CPU work - no database access - so it can run in a worker process
+    (see certificate_render.render_certificates).
+
+    spec.output selects the PDF backend: "raster" saves the drawn 2x page images,
+    "vector" replays the same drawing onto the template PDF (see certificate_vector).
+    """
+    template_path = _template_pdf_path()
+    vector = spec.output == VECTOR_OUTPUT and os.path.exists(template_path)
+    if spec.output == VECTOR_OUTPUT and not vector:
+        logger.warning(f"PDF template not found at {template_path}, falling back to raster certificate output")
+
+    def _open_page(page_num: int):
+        if vector:
+            with timing.span("template_load"):
+                return open_vector_page(template_path, page_num, CERTIFICATE_SCALE_FACTOR)
+        return _open_template_page(page_num)
+
+    with timing.span("layout_plan"):
+        plan = certificate_layout_cache.get(spec, _certificate_template_version(), compile_certificate_layout)
+    pages = []
+    for planned in plan.pages:
+        page = _open_page(planned.template_page)
+        replay_ops(page, planned.ops)
+        pages.append(page)
+
+    learner_name = spec.learner_name
+    cert_num = "" if spec.certificate_number is None else str(spec.certificate_number)
+    date_str = _format_date_with_ordinal(spec.issue_date) if spec.issue_date else ""
+
+
+    # ===== PAGE 1: learner fields =====
+    page1_img = pages[0]
+    draw = page_draw(page1_img)
+    img_width, img_height = page1_img.size
+
+    # Certificate Number and Issued Date (values only, labels are on template)
+    _draw_page1_value(draw, "certificate_number", cert_num)
+    _draw_page1_value(draw, "issued_date", date_str)
+    
+    # Learner Name (centered, bold - appears prominently in certificate section)
+    cfg = PAGE1_CONFIG["learner_name"]
+    font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_BOLD), _scale(cfg["size"]))
+    spacing = _scale(cfg.get("spacing", 0))
+    thickness = cfg.get("thickness", 0)  # Don't scale thickness
+    if cfg.get("align") == "center":
+        # Center the text with 15px offset to the right
+        bbox = draw.textbbox((0, 0), learner_name, font=font)
+        text_width = bbox[2] - bbox[0]
+        x = (img_width - text_width) // 2 + _scale(15)
+        if thickness > 0:
+            draw.text((x, _scale(cfg["y"])), learner_name, font=font, fill=cfg["color"], stroke_width=thickness, stroke_fill=cfg["color"])
+        else:
+            draw.text((x, _scale(cfg["y"])), learner_name, font=font, fill=cfg["color"])
+    else:
+        _draw_text_with_spacing(draw, learner_name, _scale(cfg["x"]), _scale(cfg["y"]), font, cfg["color"], spacing, thickness)
+
+    # QR Code
+    cfg = PAGE1_CONFIG["qr_code"]
+    page1_img.paste(_certificate_qr_image(spec.verify_url, _scale(cfg["size"])), (_scale(cfg["x"]), _scale(cfg["y"])))
+
+    # ===== TRANSCRIPT: learner name on the first transcript page =====
+    draw2 = page_draw(pages[1])
+    cfg = TRANSCRIPT_CONFIG["learner_name"]
+    # Reduce font size for page 2 (from 24 to 20)
+    font_size = int(cfg["size"] * 0.83)  # Reduce by ~17%
+    font = _load_ictqual_font(_safe_get_font_path(cfg, FONT_CANDARA_BOLD), _scale(font_size))
+    thickness = cfg.get("thickness", 0)
+    if thickness > 0:
+        draw2.text(plan.transcript_name_xy, learner_name, font=font, fill=(0, 0, 0), stroke_width=thickness, stroke_fill=(0, 0, 0))
+    else:
+        draw2.text(plan.transcript_name_xy, learner_name, font=font, fill=(0, 0, 0))
+
+    # ===== LAST TRANSCRIPT PAGE: dates, certificate number, QR code =====
+    last_page = pages[-1]
+    draw2 = page_draw(last_page)
+    value_font = _load_ictqual_font(FONT_CANDARA_BOLD, _scale(11))
+    _draw_centred_value(draw2, date_str, *plan.qualification_date_anchor, value_font)
+    _draw_centred_value(draw2, cert_num, *plan.certificate_number_anchor, value_font)
+    _draw_centred_value(draw2, date_str, *plan.issue_date_anchor, value_font)
+
+    qr_size = _scale(80)  # Same size as page 1
+    last_page.paste(_certificate_qr_image(spec.verify_url, qr_size), plan.transcript_qr_xy)
+    
+    return _encode_certificate_pdf(pages, template_path if vector else None)
+
+
+@timing.timed("pdf_save")
+def _encode_certificate_pdf(pages: list, vector_template_path: str | None = None) -> bytes:
+    """
+    Convert drawn certificate pages to a single PDF: raster pages as 300 DPI
+    images, or VectorPages onto vector_template_path (see certificate_vector).
+    """
+    from io import BytesIO
+
+    if vector_template_path:
+        pdf_data = write_vector_pdf(pages, vector_template_path, CERTIFICATE_SCALE_FACTOR)
+    else:
+        pdf_buffer = BytesIO()
+        # Save first page as PDF with 300 DPI for high quality
+        pages[0].save(
+            pdf_buffer, 
+            format='PDF', 
+            save_all=True, 
+            append_images=pages[1:] if len(pages) > 1 else [],
+            resolution=300.0,
+            quality=95
+        )
+        pdf_buffer.seek(0)
+        pdf_data = pdf_buffer.read()
     
     # Verify PDF buffer has content
-    pdf_data = pdf_buffer.read()
     if not pdf_data or len(pdf_data) == 0:
         raise ValueError("Generated PDF is empty. Certificate generation failed.")
     
+    return pdf_data
+
+
+def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: bool = True) -> bytes | None:
+    """
+    Build a multi-page ICTQUAL certificate PDF for the given registration.
+    Page 1: General info (learner name, qualification title, business name, QR code)
+    Page 2+: Sections with units, awarded date, duration, location, QR code
+    
+    Args:
+        reg: The LearnerRegistration to generate certificate for
+        save_to_storage: If True, save PDF to storage. If False, return PDF bytes without saving.
+    
+    Returns:
+        If save_to_storage=False, returns PDF bytes. Otherwise returns None.
+    """
+    with timing.trace("certificate.generate_and_attach", registration_id=reg.id):
+        return _generate_and_attach_certificate(reg, save_to_storage)
+
+
+def _generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: bool) -> bytes | None:
+    pdf_data = render_certificate_spec(load_certificate_render_spec(reg))
+
     # If save_to_storage is False, return PDF bytes without saving
     if not save_to_storage:
         logger.info(f"Certificate PDF generated for registration {reg.id} (not saving to storage)")
@@ -4507,7 +4556,8 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
             raise ValueError(error_msg)
     
     try:
-        reg.certificate_file.save(filename, ContentFile(pdf_data), save=True)
+        with timing.span("storage_upload"):
+            reg.certificate_file.save(filename, ContentFile(pdf_data), save=True)
     except TypeError as e:
         if "expected string or bytes-like object, got 'NoneType'" in str(e):
             error_msg = (
@@ -4531,12 +4581,90 @@ def generate_and_attach_certificate(reg: LearnerRegistration, save_to_storage: b
     return None
 
 
+# Bump when the drawing code changes in a way PAGE1_CONFIG/TRANSCRIPT_CONFIG don't capture,
+# so previously cached renders are not served any more.
+CERTIFICATE_RENDER_VERSION = 2
+
+
+def _certificate_spec_fingerprint(spec: CertificateRenderSpec) -> str:
+    """
+    Hash of exactly what render_certificate_spec draws (the spec itself) plus the
+    template file and layout configuration.
+    """
+    from dataclasses import asdict
+    from .certificate_cache import RenderedCertificateCache
+
+    template_path = _template_pdf_path()
+    try:
+        template_mtime = os.path.getmtime(template_path)
+    except OSError:
+        template_mtime = None
+
+    return RenderedCertificateCache.fingerprint({
+        "version": CERTIFICATE_RENDER_VERSION,
+        "layout": repr((CERTIFICATE_SCALE_FACTOR, PAGE1_CONFIG, TRANSCRIPT_CONFIG)),
+        "template": [template_path, template_mtime],
+        "spec": asdict(spec),
+    })
+
+
+def _certificate_fingerprint(reg: LearnerRegistration) -> str | None:
+    """
+    Render cache key for a registration's certificate.
+    Returns None when the registration has no certificate number yet (rendering
+    assigns one, so the result cannot be keyed in advance).
+    """
+    if not reg.certificate_number:
+        return None
+    return _certificate_spec_fingerprint(load_certificate_render_spec(reg))
+
+
 def generate_certificate_pdf(reg: LearnerRegistration) -> bytes:
     """
     Generate certificate PDF and return the bytes without saving to storage.
     This is used for on-demand generation to avoid filling up storage space.
+    Renders are cached by _certificate_spec_fingerprint, so repeated views/downloads
+    of an unchanged certificate are served from the rendered certificate cache.
     """
-    return generate_and_attach_certificate(reg, save_to_storage=False)
+    from .certificate_cache import rendered_certificate_cache
+
+    with timing.trace("certificate.generate", registration_id=reg.id) as current:
+        spec = load_certificate_render_spec(reg)
+        fingerprint = _certificate_spec_fingerprint(spec)
+        with timing.span("cache_lookup"):
+            cached = rendered_certificate_cache.get(reg.id, fingerprint)
+        current.attrs["cache"] = "hit" if cached else "miss"
+        if cached:
+            return cached
+
+        pdf_bytes = render_certificate_spec(spec)
+        with timing.span("cache_store"):
+            rendered_certificate_cache.put(reg.id, fingerprint, pdf_bytes)
+        return pdf_bytes
+
+
+def open_certificate_pdf(reg: LearnerRegistration):
+    """
+    Like generate_certificate_pdf but returns a binary file object, streaming
+    straight from the rendered certificate cache when possible.
+    """
+    from .certificate_cache import rendered_certificate_cache
+
+    fingerprint = _certificate_fingerprint(reg)
+    if fingerprint:
+        path = rendered_certificate_cache.path_for(reg.id, fingerprint)
+        if path:
+            try:
+                return open(path, "rb")
+            except OSError:
+                pass
+    return BytesIO(generate_certificate_pdf(reg))
+
+
+def invalidate_certificate_cache(reg_ids) -> None:
+    """Forget cached renders for these registrations (e.g. after a learner rename)."""
+    from .certificate_cache import rendered_certificate_cache
+    rendered_certificate_cache.invalidate(reg_ids)
 
 def regenerate_certificates_for_user(user):
     """
@@ -4639,6 +4767,17 @@ def edit_learner(request, reg_id: int):
     )
 
 
+LEARNERS_PAGE_SIZE = 50
+LEARNERS_ORDERING = ("full_name", "email", "id")
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 @login_required
 def learners_list(request):
     if not request.user.is_superuser:
@@ -4646,40 +4785,36 @@ def learners_list(request):
 
     q = (request.GET.get("q") or "").strip()
 
+    # Per-learner figures as correlated subqueries: no GROUP BY over the whole
+    # user table and no query per row, so a page reads only its own rows
+    # (walking customuser_name_email_idx in order)
+    issued = LearnerRegistration.objects.filter(learner=OuterRef("pk"), certificate_issued_at__isnull=False)
     learners = (
         CustomUser.objects
-        .filter(roles__name=Role.Names.LEARNER)
+        .filter(Exists(CustomUser.roles.through.objects.filter(customuser=OuterRef("pk"), role__name=Role.Names.LEARNER)))
         .annotate(
-            issued_total=Count(
-                "course_registrations",
-                filter=Q(course_registrations__certificate_issued_at__isnull=False),
-                distinct=True,
-            )
+            issued_total=Coalesce(
+                Subquery(issued.order_by().values("learner").annotate(n=Count("id")).values("n")[:1]),
+                0,
+            ),
+            most_recent_reg_id=Subquery(issued.order_by("-certificate_issued_at", "-id").values("id")[:1]),
         )
-        .order_by("full_name", "email")
     )
 
     if q:
         learners = learners.filter(Q(full_name__icontains=q) | Q(email__icontains=q))
 
-    # Get the most recent issued registration for each learner
-    from superadmin.models import LearnerRegistration
-    learners_with_regs = []
-    for learner in learners:
-        most_recent_reg = (
-            LearnerRegistration.objects
-            .filter(learner=learner, certificate_issued_at__isnull=False)
-            .order_by("-certificate_issued_at")
-            .first()
-        )
-        learners_with_regs.append({
-            'learner': learner,
-            'most_recent_reg_id': most_recent_reg.id if most_recent_reg else None,
-        })
+    page_obj = keyset_page(
+        learners,
+        LEARNERS_ORDERING,
+        after=_int_or_none(request.GET.get("after")),
+        before=_int_or_none(request.GET.get("before")),
+        size=LEARNERS_PAGE_SIZE,
+    )
 
     return render(request, "superadmin/learners_list.html", {
-        "learners_with_regs": learners_with_regs,
-        "learners": learners,  # Keep for backward compatibility
+        "learners": page_obj.items,
+        "page_obj": page_obj,
         "q": q,
     })
 
@@ -5314,7 +5449,7 @@ def _load_font(size=36):
         "C:/Windows/Fonts/arial.ttf",                      # Windows
     ):
         try:
-            return ImageFont.truetype(path, size=size)
+            return get_cached_font(path, size)
         except Exception:
             continue
     return ImageFont.load_default()
@@ -5473,8 +5608,8 @@ def create_payment_session(request, course_id: int):
         return redirect("superadmin:register_learners", course_id=course_id)
     
     # Get pricing with discount
-    from pricing.views import get_discounted_price
-    final_price, base_price, discount_percentage, currency = get_discounted_price(business, course, 'affiliate')
+    from pricing.pricebook import PriceBook
+    final_price, base_price, discount_percentage, currency = PriceBook.for_pairs([(business, course)]).price(business, course, 'affiliate')
     
     # Calculate total amount
     total_amount = final_price * number_of_learners
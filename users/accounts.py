@@ -0,0 +1,114 @@
+"""
+Bulk account creation.
+
+create_user hashes each password inline, and a password hash is deliberately
+slow (hundreds of thousands of PBKDF2 rounds). Creating thousands of learner
+accounts one create_user at a time therefore spent most of its time hashing,
+serially, on the request thread.
+
+create_accounts takes the accounts to create, hashes their passwords up
+front (on a process pool once there are enough of them to be worth it), and
+writes all users in one bulk_create plus one insert for their role links.
+Every account gets its own make_password call, so its own salt, even when
+passwords repeat (e.g. the legacy import placeholder).
+
+The pool's workers are spawned, not forked: forking a threaded server
+process that holds a database connection (possibly mid-transaction) is
+unsafe. Callers that hold a transaction open should hash first
+(hash_passwords) and pass the results in as NewAccount.password_hash.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+
+@dataclass
+class NewAccount:
+    email: str
+    full_name: str = ""
+    password: str | None = None     # None -> unusable password
+    is_active: bool = True
+    password_hash: str | None = None  # already hashed: used instead of password
+
+
+def _init_hash_worker(settings_module):
+    # Spawned (non-forked) workers start without Django configured
+    if settings_module and not settings.configured:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+        import django
+        django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, *, workers: int | None = None) -> list:
+    """
+    make_password for each of `passwords` (None gives an unusable password),
+    spread over a pool of spawned processes when there are at least
+    PASSWORD_HASH_PARALLEL_MIN of them and more than one worker.
+    """
+    passwords = list(passwords)
+    if workers is None:
+        workers = getattr(settings, "PASSWORD_HASH_WORKERS", 0) or os.cpu_count() or 1
+    min_parallel = getattr(settings, "PASSWORD_HASH_PARALLEL_MIN", 32)
+
+    if workers > 1 and len(passwords) >= max(min_parallel, 2):
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(passwords)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_hash_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE"),),
+        ) as pool:
+            return list(pool.map(_hash_password, passwords, chunksize=8))
+    return [make_password(password) for password in passwords]
+
+
+def create_accounts(accounts, *, roles=()) -> dict:
+    """
+    Create users for `accounts` (NewAccount, emails not yet registered) with
+    one bulk insert, give each of them `roles`, and return them keyed by
+    lowercased email.
+    """
+    # Imported here so spawned hashing workers can import this module before django.setup()
+    from .models import CustomUser, generate_username
+
+    accounts = list(accounts)
+    if not accounts:
+        return {}
+    unhashed = [account for account in accounts if account.password_hash is None]
+    hashed = dict(zip(map(id, unhashed), hash_passwords([account.password for account in unhashed])))
+    hashes = [account.password_hash or hashed[id(account)] for account in accounts]
+    users = [
+        CustomUser(
+            email=CustomUser.objects.normalize_email(account.email),
+            full_name=account.full_name,
+            username=generate_username(account.email),
+            password=password_hash,
+            is_active=account.is_active,
+        )
+        for account, password_hash in zip(accounts, hashes)
+    ]
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        # Re-read so every user has its pk whatever the database backend
+        created = {
+            user.email.lower(): user
+            for user in CustomUser.objects.filter(email__in=[user.email for user in users])
+        }
+        if roles:
+            CustomUser.roles.through.objects.bulk_create(
+                [
+                    CustomUser.roles.through(customuser_id=user.pk, role_id=role.pk)
+                    for user in created.values()
+                    for role in roles
+                ],
+                ignore_conflicts=True,
+            )
+    return created
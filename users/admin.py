@@ -28,4 +28,24 @@ from .models import EmailSubscription
 class EmailSubscriptionAdmin(admin.ModelAdmin):
     list_display = ("email", "is_active", "created_at")
     list_filter = ("is_active", "created_at")
-    search_fields = ("email",)
\ No newline at end of file
+    search_fields = ("email",)
+
+from .models import OutboxEmail, OutboxAttachment
+
+
+class OutboxAttachmentInline(admin.TabularInline):
+    model = OutboxAttachment
+    extra = 0
+    fields = ("filename", "mimetype", "content_id", "file")
+    readonly_fields = fields
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("subject", "to", "last_error")
+    readonly_fields = ("message_id", "sent_at", "created_at", "locked_until")
+    # May contain generated passwords and password reset links
+    exclude = ("body", "alternatives")
+    inlines = [OutboxAttachmentInline]
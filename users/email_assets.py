@@ -0,0 +1,118 @@
+"""
+Email Assets
+Process-level cache of the inline images used by transactional emails.
+
+Every email builder used to look the LICQual logo up with the staticfiles
+finders, read it from disk and base64-encode a fresh MIMEImage for each
+message. inline_logo() does that once per process and keeps the bytes and the
+encoded MIME part (with its Content-ID / Content-Disposition headers); each
+email gets a cheap copy of the prebuilt part.
+
+Email templates need no separate cache here: with no explicit loaders in
+TEMPLATES, Django's cached template loader already compiles each template
+once per process.
+"""
+import copy
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from email.mime.image import MIMEImage
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+logger = logging.getLogger(__name__)
+
+LOGO_CID = "licqual-logo"
+
+# Known names of the logo under static/, in order of preference
+LOGO_STATIC_PATHS = (
+    "images/LICQual-Logo.jpg",
+    "images/LICQual Logo .jpg",
+    "images/LICQual Logo.jpg",
+    "images/licqual-logo.jpg",
+    "images/ictqual-logo.jpg",
+)
+
+
+def image_subtype(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"GIF"):
+        return "gif"
+    return "jpeg"
+
+
+@dataclass(frozen=True)
+class InlineImage:
+    path: str
+    data: bytes
+    subtype: str
+    content_id: str
+    filename: str
+    _part: MIMEImage = field(repr=False, compare=False)
+
+    @classmethod
+    def load(cls, path: str, content_id: str, filename: str | None = None) -> "InlineImage":
+        with open(path, "rb") as f:
+            data = f.read()
+        subtype = image_subtype(data)
+        filename = filename or f"{content_id}.{'jpg' if subtype == 'jpeg' else subtype}"
+        part = MIMEImage(data, _subtype=subtype)
+        part.add_header("Content-ID", f"<{content_id}>")
+        part.add_header("Content-Disposition", "inline", filename=filename)
+        return cls(path=path, data=data, subtype=subtype, content_id=content_id, filename=filename, _part=part)
+
+    def mime_part(self) -> MIMEImage:
+        """A copy of the prebuilt MIME part to attach to one message (the encoded payload is shared)."""
+        part = copy.copy(self._part)
+        part._headers = list(self._part._headers)
+        return part
+
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _find_logo_path() -> str | None:
+    # Direct paths first (also works before collectstatic), then the staticfiles finders
+    base_dir = getattr(settings, "BASE_DIR", None)
+    if base_dir:
+        for folder in ("static", "staticfiles"):
+            for static_path in LOGO_STATIC_PATHS:
+                path = os.path.join(base_dir, folder, static_path)
+                if os.path.exists(path):
+                    return path
+    for static_path in LOGO_STATIC_PATHS:
+        path = finders.find(static_path)
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def inline_logo() -> InlineImage | None:
+    """The LICQual logo as a cached inline image, or None if it cannot be found/read."""
+    with _lock:
+        if "logo" in _cache:
+            return _cache["logo"]
+        logo = None
+        path = _find_logo_path()
+        if path:
+            try:
+                logo = InlineImage.load(path, LOGO_CID)
+                if not logo.data:
+                    logger.warning(f"Logo file exists but is empty: {path}")
+                    logo = None
+            except OSError as e:
+                logger.error(f"Could not load logo for emails: {e}", exc_info=True)
+        else:
+            logger.warning(f"Logo file not found. Tried: {list(LOGO_STATIC_PATHS)}")
+        _cache["logo"] = logo
+        return logo
+
+
+def clear_cache() -> None:
+    """Forget cached assets (e.g. after replacing the logo file)."""
+    with _lock:
+        _cache.clear()
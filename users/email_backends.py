@@ -1,28 +1,139 @@
-from django.core.mail.backends.base import BaseEmailBackend
+"""
+Email backends.
+
+SESEmailBackend sends through Amazon SES (send_raw_email). One backend
+connection can take a whole batch: messages are sent from a small thread pool,
+paced by a process-wide token bucket so the account's SES send rate
+(AWS_SES_MAX_SEND_RATE recipients per second) is not exceeded, and throttling
+errors are retried with exponential backoff. The outcome of every message is
+kept as a SendResult on backend.results.
+
+Bulk callers should build their messages first and hand them over in one go:
+
+    results = send_email_batch(messages, fail_silently=True)
+
+users/fake_ses.py provides an in-memory SES stand-in for tests.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
 import boto3
 from botocore.exceptions import ClientError
 from decouple import config
-import logging
-import email
-import boto3
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
 
 logger = logging.getLogger(__name__)
 
+# SES error codes that mean "slow down" rather than "this message is bad"
+THROTTLING_ERROR_CODES = {"Throttling", "ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded"}
+
+
+@dataclass
+class SendResult:
+    message: object
+    message_id: str | None = None
+    error: Exception | None = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`; acquire(n) blocks until n tokens are available.
+    A rate of 0 (or less) disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate or 0)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> None:
+        if self.rate <= 0:
+            return
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# SES limits are per account, so every backend in the process shares one bucket
+# and (per credentials) one boto3 client - boto3 clients are thread-safe.
+_shared_lock = threading.Lock()
+_rate_limiters = {}
+_ses_clients = {}
+
+
+def _rate_limiter(rate: float) -> TokenBucket:
+    with _shared_lock:
+        bucket = _rate_limiters.get(rate)
+        if bucket is None:
+            bucket = _rate_limiters[rate] = TokenBucket(rate)
+        return bucket
+
+
+def _ses_client(region: str, access_key_id: str, secret_access_key: str):
+    key = (region, access_key_id)
+    with _shared_lock:
+        client = _ses_clients.get(key)
+        if client is None:
+            client = _ses_clients[key] = boto3.client(
+                'ses',
+                region_name=region,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+            )
+        return client
+
+
+def is_throttling_error(error: Exception) -> bool:
+    if not isinstance(error, ClientError):
+        return False
+    details = error.response.get('Error', {})
+    if details.get('Code') not in THROTTLING_ERROR_CODES:
+        return False
+    # SES also reports an exhausted daily quota as Throttling; retrying won't help
+    return 'daily message quota' not in (details.get('Message') or '').lower()
+
+
 class SESEmailBackend(BaseEmailBackend):
-    def __init__(self, **kwargs):
+    def __init__(self, client=None, max_send_rate=None, max_workers=None, max_retries=None, retry_base_delay=None, **kwargs):
         super().__init__(**kwargs)
         logger.debug("Initializing SESEmailBackend...")
-        self.client = None
+        self.client = client
+        self.max_send_rate = float(max_send_rate if max_send_rate is not None else getattr(settings, 'AWS_SES_MAX_SEND_RATE', 14))
+        self.max_workers = max(1, int(max_workers if max_workers is not None else getattr(settings, 'AWS_SES_SEND_WORKERS', 4)))
+        self.max_retries = max(0, int(max_retries if max_retries is not None else getattr(settings, 'AWS_SES_MAX_RETRIES', 4)))
+        self.retry_base_delay = float(retry_base_delay if retry_base_delay is not None else getattr(settings, 'AWS_SES_RETRY_BASE_DELAY', 0.5))
+        self.results = []
 
     def open(self):
         logger.debug("Opening SES client connection...")
         if self.client is None:
             try:
-                self.client = boto3.client(
-                    'ses',
-                    region_name=config('AWS_SES_REGION', default='eu-west-2'),
-                    aws_access_key_id=config('AWS_SES_ACCESS_KEY_ID'),
-                    aws_secret_access_key=config('AWS_SES_SECRET_ACCESS_KEY')
+                self.client = _ses_client(
+                    config('AWS_SES_REGION', default='eu-west-2'),
+                    config('AWS_SES_ACCESS_KEY_ID'),
+                    config('AWS_SES_SECRET_ACCESS_KEY'),
                 )
                 logger.debug("SES client opened. region=%s endpoint=%s",
                             self.client.meta.region_name, getattr(self.client.meta, "endpoint_url", None))
@@ -34,50 +145,110 @@ class SESEmailBackend(BaseEmailBackend):
         return True
 
     def close(self):
+        # The underlying boto3 client is shared by the process and stays open
         logger.debug("Closing SES client connection...")
         self.client = None
         logger.debug("SES client closed.")
 
     def send_messages(self, email_messages):
+        """Send the batch; returns the number sent. Per-message outcomes are in self.results."""
+        results = self.send_messages_with_results(email_messages)
+        if not self.fail_silently:
+            for result in results:
+                if result.error is not None:
+                    raise result.error
+        return sum(1 for result in results if result.ok)
+
+    def send_messages_with_results(self, email_messages) -> list:
+        """Send the batch and return one SendResult per message (never raises for a single message)."""
+        email_messages = list(email_messages)
         logger.debug("Processing %d email messages...", len(email_messages))
+        if not email_messages:
+            self.results = []
+            return self.results
         if not self.open():
             logger.error("Cannot send messages: SES client not initialized.")
             raise ValueError("SES client not initialized.")
 
-        sent_count = 0
-        for message in email_messages:
+        bucket = _rate_limiter(self.max_send_rate)
+        workers = min(self.max_workers, len(email_messages))
+        if workers == 1:
+            results = [self._send_one(message, bucket) for message in email_messages]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ses-send") as pool:
+                results = list(pool.map(lambda message: self._send_one(message, bucket), email_messages))
+
+        self.results = results
+        logger.debug("Sent %d of %d emails successfully.", sum(1 for r in results if r.ok), len(results))
+        return results
+
+    def _send_one(self, message, bucket: TokenBucket) -> SendResult:
+        result = SendResult(message=message)
+        try:
+            logger.debug("Preprocessing email: subject=%s, to=%s", message.subject, message.to)
+            # Convert EmailMessage to raw MIME for SES raw sending
+            raw_message = message.message().as_string()
+            destinations = list(message.to) + list(message.cc or []) + list(message.bcc or [])
+        except Exception as e:
+            logger.error("Unexpected error: %s", str(e))
+            result.error = e
+            return result
+
+        while True:
+            # SES counts every recipient against the send rate
+            bucket.acquire(max(1, len(destinations)))
+            result.attempts += 1
             try:
-                logger.debug("Preprocessing email: subject=%s, to=%s", message.subject, message.to)
-                # Convert EmailMessage to raw MIME for SES raw sending
-                raw_message = message.message().as_string()
-                destinations = {'ToAddresses': message.to}
-                if getattr(message, 'cc', None):
-                    destinations['CcAddresses'] = message.cc
-                    logger.debug("CC: %s", message.cc)
-                if getattr(message, 'bcc', None):
-                    destinations['BccAddresses'] = message.bcc
-                    logger.debug("BCC: %s", message.bcc)
-
-                logger.debug("Sending SES API raw request...")
                 response = self.client.send_raw_email(
                     Source=message.from_email,
-                    Destinations=message.to + (message.cc or []) + (message.bcc or []),
+                    Destinations=destinations,
                     RawMessage={'Data': raw_message}
                 )
-                logger.debug("Email sent, Message ID: %s", response['MessageId'])
-                sent_count += 1
+                result.message_id = response['MessageId']
+                logger.debug("Email sent, Message ID: %s", result.message_id)
+                return result
             except ClientError as e:
+                if is_throttling_error(e) and result.attempts <= self.max_retries:
+                    delay = self.retry_base_delay * (2 ** (result.attempts - 1))
+                    delay += random.uniform(0, delay)  # jitter, so pooled senders don't retry in lockstep
+                    logger.info("SES throttled sending to %s; retrying in %.2fs", message.to, delay)
+                    time.sleep(delay)
+                    continue
                 logger.error("SES API error: %s", e.response['Error']['Message'])
-                print(f"Error sending email: {e.response['Error']['Message']}")
-                if not self.fail_silently:
-                    raise e
+                result.error = e
+                return result
             except Exception as e:
                 logger.error("Unexpected error: %s", str(e))
-                print(f"Unexpected error: {str(e)}")
-                if not self.fail_silently:
-                    raise e
-        logger.debug("Sent %d emails successfully.", sent_count)
-        return sent_count
+                result.error = e
+                return result
+
+
+def send_email_batch(email_messages, *, fail_silently=False, connection=None) -> list:
+    """
+    Send many messages over one backend connection and return a SendResult per
+    message. Backends without batch support send message by message on the
+    same open connection.
+    """
+    email_messages = list(email_messages)
+    if not email_messages:
+        return []
+    connection = connection or get_connection(fail_silently=fail_silently)
+    if hasattr(connection, 'send_messages_with_results'):
+        return connection.send_messages_with_results(email_messages)
+
+    results = []
+    with connection:
+        for message in email_messages:
+            result = SendResult(message=message, attempts=1)
+            try:
+                if not connection.send_messages([message]):
+                    result.error = RuntimeError("Message was not sent.")
+            except Exception as e:
+                if not fail_silently:
+                    raise
+                result.error = e
+            results.append(result)
+    return results
 
 
 class ReadableConsoleEmailBackend(BaseEmailBackend):
@@ -0,0 +1,73 @@
+"""
+In-memory stand-in for the SES client, for tests and local runs.
+
+    EMAIL_BACKEND = 'users.fake_ses.FakeSESEmailBackend'
+
+FakeSESEmailBackend is the real SESEmailBackend (thread pool, rate limit,
+retries) talking to the process-wide fake_ses client instead of AWS. Sent
+messages are recorded on fake_ses.sent; fake_ses can also be told to throttle
+the next few calls or to reject given recipients.
+"""
+import email
+import itertools
+import threading
+
+from botocore.exceptions import ClientError
+
+from .email_backends import SESEmailBackend
+
+
+class FakeSESClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sent = []  # dicts: message_id, source, destinations, subject, raw
+            self.calls = 0
+            self.throttle_remaining = 0
+            self.rejected_recipients = set()
+            self._ids = itertools.count(1)
+
+    def throttle_next(self, count: int) -> None:
+        """Answer the next `count` calls with a Throttling error."""
+        with self._lock:
+            self.throttle_remaining = count
+
+    def reject(self, *addresses) -> None:
+        """Answer any message to these recipients with MessageRejected."""
+        with self._lock:
+            self.rejected_recipients.update(a.lower() for a in addresses)
+
+    def send_raw_email(self, *, Source, Destinations, RawMessage):
+        with self._lock:
+            self.calls += 1
+            if self.throttle_remaining > 0:
+                self.throttle_remaining -= 1
+                raise _client_error("Throttling", "Maximum sending rate exceeded.")
+            rejected = [d for d in Destinations if d.lower() in self.rejected_recipients]
+            if rejected:
+                raise _client_error("MessageRejected", f"Email address is not verified: {', '.join(rejected)}")
+            message_id = f"fake-{next(self._ids):06d}"
+            self.sent.append({
+                "message_id": message_id,
+                "source": Source,
+                "destinations": list(Destinations),
+                "subject": email.message_from_string(RawMessage["Data"]).get("Subject"),
+                "raw": RawMessage["Data"],
+            })
+        return {"MessageId": message_id}
+
+
+def _client_error(code: str, message: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, "SendRawEmail")
+
+
+fake_ses = FakeSESClient()
+
+
+class FakeSESEmailBackend(SESEmailBackend):
+    def open(self):
+        self.client = fake_ses
+        return True
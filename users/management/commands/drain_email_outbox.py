@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import drain_outbox, purge_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send due emails from the email outbox (retrying failures and dead-lettering after too many)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep draining, sleeping --interval seconds when the outbox is empty'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds between polls with --loop (default 5)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows claimed per batch (default EMAIL_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='First delete finished emails and stored files older than EMAIL_OUTBOX_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            counts = purge_outbox()
+            self.stdout.write(f"Purged {counts['emails']} email(s) and {counts['blobs']} stored file(s)")
+
+        while True:
+            counts = drain_outbox(batch_size=options['batch_size'])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"sent {counts['sent']}, retrying {counts['retrying']}, dead-lettered {counts['dead']}"
+                )
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
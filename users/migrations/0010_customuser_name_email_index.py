@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0009_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['full_name', 'email', 'id'], name='customuser_name_email_idx'),
+        ),
+    ]
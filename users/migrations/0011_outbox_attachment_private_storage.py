@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:30
+
+import users.storage_backends
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_customuser_name_email_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxattachment',
+            name='file',
+            field=models.FileField(max_length=255, storage=users.storage_backends.PrivateMediaStorage(), upload_to='email_outbox/'),
+        ),
+    ]
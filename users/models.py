@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db.models.functions import Lower
 import uuid
 from django.utils import timezone
+from .storage_backends import PrivateMediaStorage
 
 
 class CustomUserManager(BaseUserManager):
@@ -58,6 +59,17 @@ class Role(models.Model):
         return self.get_name_display()
 
 
+def generate_username(email: str) -> str:
+    """A random unique-enough username derived from the email (users log in by email)."""
+    base_username = (email.split('@', 1)[0] if email else 'user')[:30]
+    # 150 char limit; reserve 1 + 12 for "_" + suffix
+    suffix = str(uuid.uuid4())[:12]
+    candidate = f"{base_username}_{suffix}"
+    if len(candidate) > 150:
+        candidate = f"{base_username[:(150 - 13)]}_{suffix}"
+    return candidate
+
+
 class CustomUser(AbstractUser):
     # Make it explicit for Django internals and admin
     EMAIL_FIELD = 'email'
@@ -111,6 +123,10 @@ class CustomUser(AbstractUser):
                 name='customuser_email_ci_unique',
             ),
         ]
+        indexes = [
+            # Keyset pagination of the superadmin learners list
+            models.Index(fields=['full_name', 'email', 'id'], name='customuser_name_email_idx'),
+        ]
 
     def has_role(self, role_name: str) -> bool:
         return self.roles.filter(name=role_name).exists()
@@ -118,18 +134,8 @@ class CustomUser(AbstractUser):
     def save(self, *args, **kwargs):
         # Ensure a unique username is present for AbstractUser requirements
         if not self.username:
-            base_username = (self.email.split('@', 1)[0] if self.email else 'user')[:30]
-
-            def make_username():
-                # 150 char limit; reserve 1 + 12 for "_" + suffix
-                suffix = str(uuid.uuid4())[:12]
-                candidate = f"{base_username}_{suffix}"
-                if len(candidate) > 150:
-                    candidate = f"{base_username[:(150 - 13)]}_{suffix}"
-                return candidate
-
             for _ in range(5):
-                self.username = make_username()
+                self.username = generate_username(self.email)
                 try:
                     with transaction.atomic():
                         super().save(*args, **kwargs)
@@ -166,7 +172,8 @@ from django.dispatch import receiver
 def _rebuild_certs_if_name_changed(sender, instance, **kwargs):
     """
     If a user's full_name changed anywhere (admin or custom views),
-    rebuild all issued certificates so the rendered name is current.
+    drop cached certificate renders so the next view/download uses the new name.
+    Certificates are rendered on demand, so nothing is regenerated here.
     """
     if not instance.pk:
         return  # new user
@@ -179,20 +186,14 @@ def _rebuild_certs_if_name_changed(sender, instance, **kwargs):
     if (old.full_name or "") != (instance.full_name or ""):
         # Import here to avoid import cycles
         from superadmin.models import LearnerRegistration
-        from superadmin.views import generate_and_attach_certificate
+        from superadmin.views import invalidate_certificate_cache
 
-        issued_regs = (
+        issued_reg_ids = list(
             LearnerRegistration.objects
-            .select_related("course", "business", "learner")
             .filter(learner=instance, certificate_issued_at__isnull=False)
+            .values_list("id", flat=True)
         )
-        for r in issued_regs:
-            if r.certificate_file:
-                try:
-                    r.certificate_file.delete(save=False)
-                except Exception:
-                    pass
-            generate_and_attach_certificate(r)
+        invalidate_certificate_cache(issued_reg_ids)
 
 
 
@@ -213,4 +214,71 @@ class EmailSubscription(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+class OutboxEmail(models.Model):
+    """
+    A transactional email waiting to be delivered (see users/outbox.py).
+    Views enqueue rows in their own transaction; drain_email_outbox sends them,
+    retrying with backoff and dead-lettering after max_attempts failures.
+    """
+    class Status:
+        PENDING = "pending"
+        SENDING = "sending"
+        SENT = "sent"
+        DEAD = "dead"
+        CHOICES = (
+            (PENDING, "Pending"),
+            (SENDING, "Sending"),
+            (SENT, "Sent"),
+            (DEAD, "Dead-lettered"),
+        )
+
+    kind = models.CharField(max_length=50, blank=True, db_index=True)
+    subject = models.CharField(max_length=998)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.TextField(blank=True)
+    alternatives = models.JSONField(default=list, blank=True)  # [[content, mimetype], ...]
+    mixed_subtype = models.CharField(max_length=20, default="mixed")
+
+    status = models.CharField(max_length=20, choices=Status.CHOICES, default=Status.PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=6)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    message_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx")]
+
+    def __str__(self):
+        return f"{self.kind or 'email'} to {', '.join(self.to)} ({self.status})"
+
+
+class OutboxAttachment(models.Model):
+    """
+    An attachment of an OutboxEmail. The content lives in storage under its
+    SHA-256, so the same file (a logo, a certificate resent) is stored once.
+    """
+    email = models.ForeignKey('users.OutboxEmail', on_delete=models.CASCADE, related_name='attachments')
+    filename = models.CharField(max_length=255, blank=True)
+    mimetype = models.CharField(max_length=100, default="application/octet-stream")
+    content_id = models.CharField(max_length=255, blank=True)  # set for inline (cid:) parts
+    sha256 = models.CharField(max_length=64)
+    file = models.FileField(upload_to="email_outbox/", storage=PrivateMediaStorage(), max_length=255)
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["email", "position"]
+
+    def __str__(self):
+        return self.filename or self.sha256
@@ -0,0 +1,325 @@
+"""
+Email Outbox
+Transactional email (registration, issuance, share, welcome, password reset)
+is not sent from the request. Views build their EmailMessage as before and
+call enqueue_email(), which stores it as an OutboxEmail row in the caller's
+transaction, so the email exists exactly when the change it reports does.
+Attachments are stored by reference (content-addressed files, see
+OutboxAttachment and store_blob).
+
+Delivery happens in drain_outbox(), run by the drain_email_outbox Celery task
+(queued when the enqueuing transaction commits) and by the
+drain_email_outbox management command (cron / long-running worker):
+    - due rows are claimed with a lease, so several drainers can run at once
+      and rows claimed by a crashed drainer become due again;
+    - each claimed batch goes to the email backend in one send_email_batch()
+      call (SES sends it concurrently, paced and retried on throttling);
+    - a failed row is retried with exponential backoff and dead-lettered
+      (status "dead") once it has failed max_attempts times.
+
+Emails carry generated passwords and password reset links, so a row keeps its
+content only while it may still be sent: once it is sent or dead-lettered its
+body, alternatives and attachment rows are cleared, leaving the envelope
+(kind, subject, recipients, status, error) for support. purge_outbox(), run
+daily by the purge_email_outbox Celery task, deletes finished rows older than
+EMAIL_OUTBOX_RETENTION_DAYS and the stored files nothing references any more.
+
+Settings:
+    EMAIL_OUTBOX_MAX_ATTEMPTS        attempts before a row is dead-lettered
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS  first retry delay; doubles per attempt
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS   cap on the retry delay
+    EMAIL_OUTBOX_LEASE_SECONDS       how long a claimed row stays claimed
+    EMAIL_OUTBOX_BATCH_SIZE          rows claimed per batch
+    EMAIL_OUTBOX_RETENTION_DAYS      age at which finished rows and unused files are purged
+"""
+import hashlib
+import logging
+from datetime import timedelta
+from email import encoders
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.utils import timezone
+
+from .email_backends import send_email_batch
+from .models import OutboxAttachment, OutboxEmail
+from .storage_backends import PrivateMediaStorage
+
+logger = logging.getLogger(__name__)
+
+# Blobs include learner certificates: private ACL, never a public URL
+blob_storage = PrivateMediaStorage()
+
+
+def enqueue_email(message, *, kind: str = "") -> OutboxEmail:
+    """
+    Store `message` (an EmailMessage / EmailMultiAlternatives) for delivery and
+    queue a drain once the current transaction commits.
+    """
+    return enqueue_emails([message], kind=kind)[0]
+
+
+def enqueue_emails(messages, *, kind: str = "") -> list:
+    """
+    enqueue_email for many messages at once: one bulk insert for the rows and
+    one for their attachments, each distinct attachment stored once.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    max_attempts = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 6)
+    with transaction.atomic():
+        rows = OutboxEmail.objects.bulk_create([
+            OutboxEmail(
+                kind=kind,
+                subject=message.subject,
+                from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                to=list(message.to),
+                cc=list(message.cc),
+                bcc=list(message.bcc),
+                reply_to=list(message.reply_to),
+                headers=dict(message.extra_headers),
+                body=message.body or "",
+                alternatives=[[content, mimetype] for content, mimetype in getattr(message, "alternatives", [])],
+                mixed_subtype=message.mixed_subtype,
+                max_attempts=max_attempts,
+            )
+            for message in messages
+        ])
+        stored = {}  # sha256 -> storage name, so a logo shared by every message is saved once
+        attachments = [
+            _attachment_row(row, position, attachment, stored)
+            for row, message in zip(rows, messages)
+            for position, attachment in enumerate(message.attachments)
+        ]
+        OutboxAttachment.objects.bulk_create(attachments)
+        transaction.on_commit(_kick_drain)
+    return rows
+
+
+def _attachment_row(row: OutboxEmail, position: int, attachment, stored: dict) -> OutboxAttachment:
+    if isinstance(attachment, MIMEBase):
+        # Inline parts (e.g. the cid: logo) are attached as ready-made MIME objects
+        content = attachment.get_payload(decode=True) or b""
+        mimetype = attachment.get_content_type()
+        filename = attachment.get_filename() or ""
+        content_id = (attachment.get("Content-ID") or "").strip("<>")
+    else:
+        filename, content, mimetype = attachment
+        content_id = ""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        mimetype = mimetype or "application/octet-stream"
+
+    digest = hashlib.sha256(content).hexdigest()
+    if digest not in stored:
+        stored[digest], _ = store_blob(content, digest=digest)
+    return OutboxAttachment(
+        email=row,
+        filename=filename or "",
+        mimetype=mimetype,
+        content_id=content_id,
+        sha256=digest,
+        file=stored[digest],
+        position=position,
+    )
+
+
+def store_blob(content: bytes, digest: str | None = None) -> tuple[str, str]:
+    """
+    Save `content` in storage under its SHA-256 (once) and return (storage name,
+    digest). Anything stored here can be attached to outbox emails without
+    another copy, e.g. a certificate PDF the issuance pipeline already stored.
+    """
+    digest = digest or hashlib.sha256(content).hexdigest()
+    name = f"email_outbox/{digest[:2]}/{digest}"
+    if not blob_storage.exists(name):
+        name = blob_storage.save(name, ContentFile(content))
+    return name, digest
+
+
+def _kick_drain() -> None:
+    from .tasks import drain_email_outbox
+
+    try:
+        drain_email_outbox.delay()
+    except Exception as e:
+        # The periodic drain_email_outbox command picks the row up instead
+        logger.warning(f"Could not queue email outbox drain: {e}")
+
+
+def build_message(row: OutboxEmail) -> EmailMultiAlternatives:
+    """Rebuild the EmailMultiAlternatives stored in an outbox row."""
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        alternatives=[tuple(alternative) for alternative in row.alternatives],
+    )
+    message.mixed_subtype = row.mixed_subtype
+    for attachment in row.attachments.all():
+        with attachment.file.open("rb") as f:
+            content = f.read()
+        if attachment.content_id:
+            maintype, _, subtype = attachment.mimetype.partition("/")
+            part = MIMEBase(maintype, subtype or "octet-stream")
+            part.set_payload(content)
+            encoders.encode_base64(part)
+            part.add_header("Content-ID", f"<{attachment.content_id}>")
+            part.add_header("Content-Disposition", "inline", filename=attachment.filename or attachment.content_id)
+            message.attach(part)
+        else:
+            message.attach(attachment.filename, content, attachment.mimetype)
+    return message
+
+
+def claim_due(limit: int) -> list:
+    """
+    Claim up to `limit` due rows for this drainer: pending rows whose retry
+    time has come, plus rows whose lease expired while sending.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "EMAIL_OUTBOX_LEASE_SECONDS", 300))
+    due = (
+        OutboxEmail.objects
+        .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+        | OutboxEmail.objects.filter(status=OutboxEmail.Status.SENDING, locked_until__lt=now)
+    )
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # Re-check due-ness in the UPDATE and tag the claim with its lease expiry,
+        # so rows another drainer claimed in between (no row locks on SQLite) are skipped
+        locked_until = now + lease
+        due.filter(id__in=ids).update(status=OutboxEmail.Status.SENDING, locked_until=locked_until)
+    return list(
+        OutboxEmail.objects
+        .filter(id__in=ids, status=OutboxEmail.Status.SENDING, locked_until=locked_until)
+        .prefetch_related("attachments")
+        .order_by("id")
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 60)
+    cap = getattr(settings, "EMAIL_OUTBOX_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+CONTENT_FIELDS = ["body", "alternatives"]
+
+
+def _clear_content(row: OutboxEmail) -> None:
+    """Drop the content of a finished row (its attachment rows are deleted by the caller)."""
+    row.body = ""
+    row.alternatives = []
+
+
+def _record_failure(row: OutboxEmail, error, now) -> None:
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    row.locked_until = None
+    update_fields = ["attempts", "last_error", "locked_until", "status", "next_attempt_at"]
+    if row.attempts >= row.max_attempts:
+        row.status = OutboxEmail.Status.DEAD
+        _clear_content(row)
+        row.attachments.all().delete()
+        update_fields += CONTENT_FIELDS
+        logger.error(f"Outbox email {row.pk} ({row.kind}) to {', '.join(row.to)} dead-lettered after {row.attempts} attempts: {error}")
+    else:
+        row.status = OutboxEmail.Status.PENDING
+        row.next_attempt_at = now + retry_delay(row.attempts)
+        logger.warning(f"Outbox email {row.pk} ({row.kind}) failed (attempt {row.attempts}), retrying: {error}")
+    row.save(update_fields=update_fields)
+
+
+def drain_outbox(*, batch_size: int | None = None, max_batches: int | None = None, connection=None) -> dict:
+    """Send due outbox rows until none are left (or max_batches); returns counts."""
+    batch_size = batch_size or getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 100)
+    counts = {"sent": 0, "retrying": 0, "dead": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = claim_due(batch_size)
+        if not rows:
+            break
+        batches += 1
+
+        now = timezone.now()
+        sendable = []
+        for row in rows:
+            try:
+                sendable.append((row, build_message(row)))
+            except Exception as e:
+                _record_failure(row, e, now)
+                counts["dead" if row.status == OutboxEmail.Status.DEAD else "retrying"] += 1
+
+        try:
+            results = send_email_batch([message for _, message in sendable], fail_silently=True, connection=connection)
+        except Exception as e:
+            # The backend could not even be opened: every row in the batch failed
+            results = [e] * len(sendable)
+
+        now = timezone.now()
+        sent = []
+        for (row, _), result in zip(sendable, results):
+            error = result if isinstance(result, Exception) else result.error
+            if error is None:
+                row.status = OutboxEmail.Status.SENT
+                row.attempts += 1
+                row.sent_at = now
+                row.locked_until = None
+                row.last_error = ""
+                row.message_id = result.message_id or ""
+                _clear_content(row)
+                row.save(update_fields=["status", "attempts", "sent_at", "locked_until", "last_error", "message_id", *CONTENT_FIELDS])
+                sent.append(row.pk)
+                counts["sent"] += 1
+            else:
+                _record_failure(row, error, now)
+                counts["dead" if row.status == OutboxEmail.Status.DEAD else "retrying"] += 1
+        OutboxAttachment.objects.filter(email_id__in=sent).delete()
+    return counts
+
+
+def purge_outbox(*, days: int | None = None) -> dict:
+    """
+    Delete sent and dead-lettered rows created more than `days` (default
+    EMAIL_OUTBOX_RETENTION_DAYS) ago, then the files under email_outbox/ that
+    are as old and no attachment references. Returns counts.
+    """
+    days = days if days is not None else getattr(settings, "EMAIL_OUTBOX_RETENTION_DAYS", 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    _, deleted = (
+        OutboxEmail.objects
+        .filter(status__in=[OutboxEmail.Status.SENT, OutboxEmail.Status.DEAD], created_at__lt=cutoff)
+        .delete()
+    )
+    emails = deleted.get(OutboxEmail._meta.label, 0)
+    blobs = 0
+    try:
+        prefixes, _ = blob_storage.listdir("email_outbox")
+    except (FileNotFoundError, NotImplementedError):
+        prefixes = []
+    for prefix in prefixes:
+        _, names = blob_storage.listdir(f"email_outbox/{prefix}")
+        for digest in names:
+            name = f"email_outbox/{prefix}/{digest}"
+            # Files are shared by content: an old file may have been attached again since
+            if blob_storage.get_modified_time(name) >= cutoff or OutboxAttachment.objects.filter(file=name).exists():
+                continue
+            blob_storage.delete(name)
+            blobs += 1
+    return {"emails": emails, "blobs": blobs}
@@ -16,6 +16,15 @@ if USE_REMOTE:
             custom_domain = None  # let settings.AWS_S3_CUSTOM_DOMAIN handle host
         
         BaseStorage = MediaRootS3Boto3Storage
+
+        class PrivateMediaRootS3Boto3Storage(S3Boto3Storage):
+            default_acl = "private"
+            file_overwrite = False
+            querystring_auth = True  # .url() is a short-lived signed link, never a public one
+            querystring_expire = 300
+            custom_domain = None  # a custom domain would drop the signature
+
+        PrivateBaseStorage = PrivateMediaRootS3Boto3Storage
     except ImportError:
         # Fallback to local storage if storages is not installed
         USE_REMOTE = False
@@ -32,9 +41,11 @@ if not USE_REMOTE:
                 full_location.mkdir(parents=True, exist_ok=True)
                 super().__init__(location=str(full_location), base_url=base_url)
             else:
-                super().__init__(location=settings.MEDIA_ROOT, base_url=base_url)
+                # Left unset, FileSystemStorage follows MEDIA_ROOT (including overrides in tests)
+                super().__init__(base_url=base_url)
     
     BaseStorage = LocalMediaStorage
+    PrivateBaseStorage = LocalMediaStorage
 
 class CertTemplateStorage(BaseStorage):
     location = "certificate_templates"
@@ -50,3 +61,6 @@ class IsoTemplateStorage(BaseStorage):
 
 class IsoQrStorage(BaseStorage):
     location = "iso_qr"
+
+class PrivateMediaStorage(PrivateBaseStorage):
+    """Files only served through permission-checked views (e.g. certificate job archives)."""
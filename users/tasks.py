@@ -0,0 +1,22 @@
+# users/tasks.py
+"""
+Background email delivery: drains the email outbox and purges what it no
+longer needs (see users/outbox.py).
+"""
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def drain_email_outbox() -> dict:
+    """Send every due outbox email."""
+    from .outbox import drain_outbox
+
+    return drain_outbox()
+
+
+@shared_task(ignore_result=True)
+def purge_email_outbox() -> dict:
+    """Delete old finished outbox rows and unused stored files (run daily by Celery beat)."""
+    from .outbox import purge_outbox
+
+    return purge_outbox()
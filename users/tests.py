@@ -1,3 +1,218 @@
-from django.test import TestCase
+import email
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from email.mime.image import MIMEImage
+from unittest import mock
 
-# Create your tests here.
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users import accounts as accounts_service
+from users import email_assets
+from users.accounts import NewAccount
+from users.email_backends import TokenBucket, send_email_batch
+from users.fake_ses import fake_ses
+from users.models import OutboxEmail, Role
+from users.outbox import blob_storage, drain_outbox, enqueue_email, purge_outbox, store_blob
+
+
+@override_settings(
+    EMAIL_BACKEND="users.fake_ses.FakeSESEmailBackend",
+    AWS_SES_MAX_SEND_RATE=0,
+    AWS_SES_RETRY_BASE_DELAY=0,
+)
+class SESBatchSendingTests(TestCase):
+    def setUp(self):
+        fake_ses.reset()
+        self.addCleanup(fake_ses.reset)
+
+    def _messages(self, count):
+        return [
+            EmailMessage(subject=f"Message {i}", body="Hello", from_email="noreply@example.com", to=[f"learner{i}@example.com"])
+            for i in range(count)
+        ]
+
+    def test_batch_reports_a_result_per_message(self):
+        messages = self._messages(6)
+        fake_ses.reject("learner3@example.com")
+
+        results = send_email_batch(messages, fail_silently=True)
+
+        self.assertEqual([r.message for r in results], messages)
+        self.assertEqual([r.ok for r in results], [True, True, True, False, True, True])
+        self.assertEqual(results[3].error.response["Error"]["Code"], "MessageRejected")
+        self.assertEqual(len(fake_ses.sent), 5)
+        self.assertEqual(len({r.message_id for r in results if r.ok}), 5)
+
+    def test_throttled_sends_are_retried(self):
+        fake_ses.throttle_next(3)
+
+        results = send_email_batch(self._messages(2))
+
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(sum(r.attempts for r in results), 5)
+        self.assertEqual(fake_ses.calls, 5)
+
+    @override_settings(AWS_SES_MAX_RETRIES=1)
+    def test_throttling_gives_up_after_max_retries(self):
+        fake_ses.throttle_next(10)
+
+        (result,) = send_email_batch(self._messages(1), fail_silently=True)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(fake_ses.sent, [])
+
+    def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # The first token is there already; the other five take 1/50 s each
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+@override_settings(
+    EMAIL_BACKEND="users.fake_ses.FakeSESEmailBackend",
+    AWS_SES_MAX_SEND_RATE=0,
+    AWS_SES_RETRY_BASE_DELAY=0,
+    AWS_SES_MAX_RETRIES=0,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        fake_ses.reset()
+        self.addCleanup(fake_ses.reset)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def _message(self, to="learner@example.com"):
+        msg = EmailMultiAlternatives(subject="Certificate Issued", body="Plain", from_email="noreply@example.com", to=[to])
+        msg.mixed_subtype = "related"
+        msg.attach_alternative("<p>Hello <img src='cid:logo'></p>", "text/html")
+        logo = MIMEImage(b"GIF89a-logo", _subtype="gif")
+        logo.add_header("Content-ID", "<logo>")
+        logo.add_header("Content-Disposition", "inline", filename="logo.gif")
+        msg.attach(logo)
+        msg.attach("Certificate.pdf", b"%PDF-1.4 certificate", "application/pdf")
+        return msg
+
+    def test_enqueued_email_is_delivered_with_its_attachments(self):
+        row = enqueue_email(self._message(), kind="certificate_issued")
+        self.assertEqual(fake_ses.sent, [])
+
+        counts = drain_outbox()
+
+        self.assertEqual(counts, {"sent": 1, "retrying": 0, "dead": 0})
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboxEmail.Status.SENT)
+        self.assertEqual(row.message_id, fake_ses.sent[0]["message_id"])
+        parts = {
+            part.get_filename(): part
+            for part in email.message_from_string(fake_ses.sent[0]["raw"]).walk()
+            if part.get_filename()
+        }
+        self.assertEqual(parts["Certificate.pdf"].get_payload(decode=True), b"%PDF-1.4 certificate")
+        self.assertEqual(parts["logo.gif"]["Content-ID"], "<logo>")
+        # Sent: the content (e.g. a generated password) is not kept
+        self.assertEqual((row.body, row.alternatives, row.attachments.count()), ("", [], 0))
+
+    def test_attachments_are_stored_once(self):
+        first = enqueue_email(self._message("a@example.com"))
+        second = enqueue_email(self._message("b@example.com"))
+        self.assertEqual(
+            sorted(a.file.name for a in first.attachments.all()),
+            sorted(a.file.name for a in second.attachments.all()),
+        )
+
+    def test_failures_are_retried_then_dead_lettered(self):
+        fake_ses.reject("bounce@example.com")
+        row = enqueue_email(self._message("bounce@example.com"))
+
+        self.assertEqual(drain_outbox(), {"sent": 0, "retrying": 1, "dead": 0})
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboxEmail.Status.PENDING)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(drain_outbox(), {"sent": 0, "retrying": 0, "dead": 0})
+
+        OutboxEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), {"sent": 0, "retrying": 0, "dead": 1})
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.Status.DEAD, 2))
+        self.assertIn("not verified", row.last_error)
+        self.assertEqual((row.body, row.alternatives, row.attachments.count()), ("", [], 0))
+
+    def test_purge_deletes_old_finished_rows_and_unused_files(self):
+        old = enqueue_email(self._message("old@example.com"))
+        drain_outbox()
+        pending = enqueue_email(self._message("pending@example.com"))
+        [pdf] = [a.file.name for a in pending.attachments.all() if a.filename == "Certificate.pdf"]
+        orphan, _ = store_blob(b"%PDF-1.4 nobody attaches this")
+        self.assertEqual(purge_outbox(), {"emails": 0, "blobs": 0})
+
+        OutboxEmail.objects.filter(pk__in=[old.pk, pending.pk]).update(created_at=timezone.now() - timezone.timedelta(days=31))
+        with mock.patch.object(blob_storage, "get_modified_time", return_value=timezone.now() - timezone.timedelta(days=31)):
+            self.assertEqual(purge_outbox(), {"emails": 1, "blobs": 1})
+
+        self.assertEqual(list(OutboxEmail.objects.values_list("pk", flat=True)), [pending.pk])
+        self.assertFalse(blob_storage.exists(orphan))
+        self.assertTrue(blob_storage.exists(pdf))
+
+    def test_expired_claims_are_picked_up_again(self):
+        row = enqueue_email(self._message())
+        OutboxEmail.objects.filter(pk=row.pk).update(
+            status=OutboxEmail.Status.SENDING,
+            locked_until=timezone.now() - timezone.timedelta(seconds=1),
+        )
+        self.assertEqual(drain_outbox()["sent"], 1)
+
+
+class EmailAssetCacheTests(TestCase):
+    def setUp(self):
+        email_assets.clear_cache()
+        self.addCleanup(email_assets.clear_cache)
+
+    def test_logo_is_read_once_and_parts_are_independent(self):
+        with mock.patch("users.email_assets.InlineImage.load", wraps=email_assets.InlineImage.load) as load:
+            logo = email_assets.inline_logo()
+            self.assertIs(email_assets.inline_logo(), logo)
+        self.assertEqual(load.call_count, 1)
+        self.assertIsNotNone(logo)
+
+        first, second = logo.mime_part(), logo.mime_part()
+        first.add_header("X-Test", "1")
+        self.assertIsNone(second["X-Test"])
+        self.assertEqual(second["Content-ID"], f"<{email_assets.LOGO_CID}>")
+        self.assertEqual(second.get_payload(decode=True), logo.data)
+
+
+class BulkAccountCreationTests(TestCase):
+    @override_settings(PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_PARALLEL_MIN=2)
+    def test_passwords_are_hashed_on_a_pool_and_users_bulk_created(self):
+        role = Role.objects.create(name=Role.Names.LEARNER)
+        accounts = [
+            NewAccount(email="One@Example.com", full_name="One", password="first-secret"),
+            NewAccount(email="two@example.com", full_name="Two", password="second-secret"),
+            NewAccount(email="three@example.com", full_name="Three", password="first-secret"),
+            NewAccount(email="four@example.com", full_name="Four"),
+        ]
+        with mock.patch("users.accounts.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool, \
+                self.assertNumQueries(5):  # savepoint, users, re-read, role links, release
+            users = accounts_service.create_accounts(accounts, roles=[role])
+        pool.assert_called_once()
+
+        self.assertEqual(set(users), {"one@example.com", "two@example.com", "three@example.com", "four@example.com"})
+        self.assertTrue(users["one@example.com"].check_password("first-secret"))
+        self.assertTrue(users["three@example.com"].check_password("first-secret"))
+        # Same password, separately salted
+        self.assertNotEqual(users["one@example.com"].password, users["three@example.com"].password)
+        self.assertTrue(users["two@example.com"].check_password("second-secret"))
+        self.assertFalse(users["four@example.com"].has_usable_password())
+        self.assertTrue(all(user.username and user.is_learner for user in users.values()))
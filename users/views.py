@@ -5,13 +5,16 @@ from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import render, redirect
 from django.urls import reverse, reverse_lazy
+import os
 import uuid
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.urls import reverse
 from .models import CustomUser, PasswordResetToken
+from .email_assets import inline_logo
+from .outbox import enqueue_email
 from .forms import ForgotPasswordForm, PasswordResetConfirmForm
 from .forms import EmailAuthenticationForm
 from django.contrib.auth import logout
@@ -65,7 +68,7 @@ def _send_password_reset_email(request, user: CustomUser, token: str) -> None:
         f"Click this link to reset your password:\n{reset_url}\n\n"
         f"This link expires in {settings.PASSWORD_RESET_TIMEOUT // 3600} hour(s).\n"
     )
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+    enqueue_email(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email]), kind="password_reset")
 
 
 def _send_password_reset_success_email(user: CustomUser) -> None:
@@ -75,14 +78,14 @@ def _send_password_reset_success_email(user: CustomUser) -> None:
         "Your password was changed successfully. If you did not make this change, "
         "please contact support immediately.\n"
     )
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+    enqueue_email(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email]), kind="password_reset_success")
 
 
 
 
-def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> None:
+def build_welcome_email(user: CustomUser, raw_password: str | None = None):
     """
-    Send a welcome email to the user.
+    Build the welcome email for the user.
     - If `raw_password` is provided (brand-new user), include it in the email.
     - Otherwise omit the password for existing users.
     """
@@ -94,10 +97,12 @@ def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> Non
     except Exception:
         portal_url = None
 
-    # Build a public, absolute logo URL for email clients
+    logo = inline_logo()
+
+    # Build a public, absolute logo URL for email clients (only needed when the logo can't be inlined)
     logo_url = getattr(settings, "EMAIL_LOGO_URL", "") or ""
     
-    if not logo_url:
+    if not logo_url and not logo:
         # Use the Django static URL - try multiple possible filenames
         from django.templatetags.static import static
         static_filenames = [
@@ -150,138 +155,15 @@ def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> Non
                         break
 
     # Always try to embed the logo inline - email clients often block external images
-    # Locate the static file on disk
-    logo_cid = None
-    img_bytes = None
-    from django.contrib.staticfiles import finders
-    import os
-    
-    # Try multiple possible logo filenames
-    logo_filenames = [
-        "images/LICQual-Logo.jpg",  # New filename with hyphen
-        "images/LICQual Logo .jpg",
-        "images/LICQual Logo.jpg",
-        "images/licqual-logo.jpg",
-        "images/ictqual-logo.jpg",
-    ]
-    
-    # Also try direct path in static folder
-    base_dir = getattr(settings, 'BASE_DIR', None)
-    if base_dir:
-        static_dirs = [
-            os.path.join(base_dir, 'static', 'images'),
-            os.path.join(base_dir, 'staticfiles', 'images'),
-        ]
-        for static_dir in static_dirs:
-            for filename in ['LICQual-Logo.jpg', 'LICQual Logo .jpg', 'LICQual Logo.jpg', 'licqual-logo.jpg', 'ictqual-logo.jpg']:
-                direct_path = os.path.join(static_dir, filename)
-                if os.path.exists(direct_path):
-                    logo_filenames.insert(0, direct_path)
-                    break
-    
-    logo_fs_path = None
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    for filename in logo_filenames:
-        # If it's already a full path, use it directly
-        if os.path.isabs(filename) or os.path.exists(filename):
-            if os.path.exists(filename):
-                logo_fs_path = filename
-                logger.info(f"Found logo at direct path: {logo_fs_path}")
-                break
-        else:
-            # Try using finders
-            found_path = finders.find(filename)
-            if found_path and os.path.exists(found_path):
-                logo_fs_path = found_path
-                logger.info(f"Found logo via finders: {logo_fs_path}")
-                break
-            elif found_path:
-                logger.debug(f"Finder returned path but file doesn't exist: {found_path}")
-    
-    if logo_fs_path and os.path.exists(logo_fs_path):
-        try:
-            logger.info(f"Attempting to read logo file: {logo_fs_path}")
-            with open(logo_fs_path, "rb") as f:
-                img_bytes = f.read()
-            # Verify we actually got image data
-            if img_bytes and len(img_bytes) > 0:
-                logger.info(f"Successfully read logo file: {len(img_bytes)} bytes")
-                # Build absolute URL if we have SITE_URL but logo_url is not absolute yet
-                if not logo_url or not (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
-                    site = getattr(settings, "SITE_URL", None) or getattr(settings, "PORTAL_URL", None)
-                    if site:
-                        # Find which filename was used
-                        found_filename = None
-                        for filename in ['LICQual-Logo.jpg', 'LICQual Logo .jpg', 'LICQual Logo.jpg', 'licqual-logo.jpg', 'ictqual-logo.jpg']:
-                            if filename in logo_fs_path:
-                                found_filename = filename
-                                break
-                        if not found_filename:
-                            found_filename = os.path.basename(logo_fs_path)
-                        
-                        static_url = getattr(settings, 'STATIC_URL', '/static/')
-                        if not static_url.startswith('http'):
-                            static_url = static_url.lstrip('/')
-                            if not static_url.startswith('/'):
-                                static_url = '/' + static_url
-                        logo_url = f"{site.rstrip('/')}{static_url}images/{found_filename}"
-                        # URL encode spaces in filename
-                        logo_url = logo_url.replace(' ', '%20')
-                        logger.info(f"Built absolute logo URL: {logo_url}")
-                
-                # Set CID as fallback only if URL is not available
-                if not logo_url or not (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
-                    logo_cid = "licqual-logo"
-                else:
-                    logo_cid = None  # Prefer URL over CID
-            else:
-                logger.warning(f"Logo file exists but is empty: {logo_fs_path}")
-                img_bytes = None
-                logo_cid = None
-        except Exception as e:
-            # Log error but continue - logo will just not appear
-            logger.error(f"Could not load logo for welcome email: {e}", exc_info=True)
-            logo_cid = None
-            img_bytes = None
-    else:
-        # Log warning if logo file not found
-        logger.warning(f"Logo file not found. Tried: {logo_filenames}")
-
-    # Prepare base64 encoded image as fallback
-    import base64
-    logo_base64 = None
-    if img_bytes and len(img_bytes) > 0:
-        try:
-            # Detect image type for data URI first
-            if img_bytes.startswith(b'\xff\xd8'):
-                img_mime_type = "image/jpeg"
-            elif img_bytes.startswith(b'\x89PNG'):
-                img_mime_type = "image/png"
-            elif img_bytes.startswith(b'GIF'):
-                img_mime_type = "image/gif"
-            else:
-                img_mime_type = "image/jpeg"  # Default to JPEG
-            
-            # Encode to base64
-            encoded = base64.b64encode(img_bytes).decode('utf-8')
-            logo_base64 = f"data:{img_mime_type};base64,{encoded}"
-            
-            # Log success for debugging
-            logger.info(f"Successfully encoded logo as base64 ({len(img_bytes)} bytes, type: {img_mime_type})")
-        except Exception as e:
-            logger.warning(f"Could not encode logo as base64: {e}", exc_info=True)
-            logo_base64 = None
+    # (bytes and MIME part come from the process-level email asset cache)
     final_logo_url = ""
     if logo_url and (logo_url.startswith("http://") or logo_url.startswith("https://") or logo_url.startswith("//")):
         final_logo_url = logo_url
-        logger.info(f"Using hosted logo URL: {final_logo_url}")
 
     # Prefer CID when available: it's the most reliable across clients (no external fetch).
-    prefer_cid = bool(img_bytes)
-    if prefer_cid:
-        logo_cid = "licqual-logo"
+    logo_cid = None
+    if logo:
+        logo_cid = logo.content_id
         final_logo_url = ""
 
     ctx = {
@@ -307,8 +189,7 @@ def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> Non
 
     # Use EmailMultiAlternatives and attach inline image correctly
     from django.core.mail import EmailMultiAlternatives
-    from email.mime.image import MIMEImage
-    
+
     msg = EmailMultiAlternatives(
         subject="Welcome to LICQUAL",
         body=plain_body,
@@ -322,41 +203,17 @@ def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> Non
     msg.attach_alternative(html_body, "text/html")
 
     # Attach inline image if available
-    if logo_cid and img_bytes:
-        try:
-            # Detect image type from bytes
-            if img_bytes.startswith(b'\xff\xd8'):
-                img_type = "jpeg"
-            elif img_bytes.startswith(b'\x89PNG'):
-                img_type = "png"
-            elif img_bytes.startswith(b'GIF'):
-                img_type = "gif"
-            else:
-                img_type = "jpeg"  # Default to JPEG
-            
-            img = MIMEImage(img_bytes, _subtype=img_type)
-            # Content-ID must match exactly what's in the HTML template (without cid: prefix)
-            img.add_header("Content-ID", f"<{logo_cid}>")
-            img.add_header("Content-Disposition", "inline", filename="licqual-logo.jpg")
-            msg.attach(img)
-            logger.info("Attached logo as CID inline image")
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Could not attach logo image to email: {e}")
-
-
-    # Use fail_silently=True to prevent registration failures if email backend is not configured
-    try:
-        msg.send(fail_silently=False)
-    except Exception as e:
-        # Log error but don't fail the welcome email if backend is not configured
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Failed to send welcome email to {user.email}: {e}")
-        # Re-raise only if it's not a configuration issue
-        if "not initialized" not in str(e).lower() and "credentials" not in str(e).lower():
-            raise
+    if logo_cid:
+        msg.attach(logo.mime_part())
+
+    return msg
+
+
+def send_welcome_email(user: CustomUser, raw_password: str | None = None) -> None:
+    """
+    Queue the welcome email (see build_welcome_email) in the email outbox.
+    """
+    enqueue_email(build_welcome_email(user, raw_password), kind="welcome")
 
 
 